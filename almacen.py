@@ -0,0 +1,1492 @@
+"""
+Backends de almacenamiento para asistencia y empleados.
+
+- AlmacenCSV: los archivos de siempre; la asistencia se escribe como diario append-only
+  (segmentos inmutables) que se compacta periódicamente sobre la base.
+- AlmacenSQLite: base embebida en modo WAL con índices por fecha, equipo y empleado;
+  las consultas filtradas solo tocan las filas que coinciden.
+- AlmacenParquet: historial columnar particionado por mes (y opcionalmente por equipo);
+  las consultas abren solo las particiones y columnas que necesitan. Requiere pyarrow.
+
+Todos exponen la misma interfaz; `datos.py` elige uno y le añade la caché de proceso.
+Migración desde los CSV actuales:  python almacen.py migrar --db asistencia.db
+Conversión a Parquet:              python almacen.py convertir [--por-equipo]
+Verificación y reparación:         python almacen.py verificar [--almacen csv]
+
+Escrituras concurrentes: toda reescritura de un archivo ocurre bajo un bloqueo del
+sistema operativo (`bloqueo_archivo`) y se publica con temporal + fsync + os.replace,
+así un lector o un backup nunca ven un archivo a medias. Los lotes de asistencia que
+llegan a la vez desde varias sesiones se agrupan en una sola escritura (`CommitAgrupado`).
+
+Integridad (ver `integridad.py`): cada archivo CSV se publica con su suma y el respaldo de esa
+versión: los segmentos, una copia; la base y los empleados, el cambio que la produjo (con una
+copia entera cada pocas versiones); los resúmenes, nada, porque se recalculan. `reparar()`
+compara sumas sin parsear y rehace solo los archivos dañados; los .bak (para deshacer la última
+operación destructiva) son enlaces duros, no copias.
+"""
+import pandas as pd
+import os
+import csv
+import io
+import json
+import shutil
+import sqlite3
+import threading
+import time as time_mod
+import uuid
+from urllib.parse import quote
+from metricas import medir, contar, instrumentar
+from archivos import bloqueo_archivo, firma_archivo, ruta_temporal
+from integridad import Respaldo, suma_archivo, ruta_suma, leer_suma, escribir_suma
+from esquema import COLS_ASISTENCIA, COLS_EMPLEADOS, COLS_AGREGADAS, COLS_CATEGORICAS, tipar_asistencia, fecha, asignar_registros
+
+CLAVES_RESUMEN = {False: ["Fecha", "Equipo", "Estado"], True: ["Fecha", "Equipo", "Nombre", "Estado"]}
+CLAVES_REPORTADOS = ["Fecha", "Equipo", "Cedula", "Nombre"]
+MAX_SEGMENTOS_DIARIO = 50
+SUFIJO_CAMBIOS = "_cambios.csv"  # segmentos del diario con ediciones/borrados en vez de filas nuevas
+
+def suma_segmento(nombre):
+    """Suma que lleva en el nombre un segmento ("<timestamp>_<id>_<suma>.csv"); None en los anteriores a las sumas."""
+    partes = nombre[:-len(SUFIJO_CAMBIOS if nombre.endswith(SUFIJO_CAMBIOS) else ".csv")].split("_")
+    return partes[2] if len(partes) == 3 else None
+
+# --- 1. UTILIDADES DE ARCHIVO (AUTOCURACIÓN Y BACKUPS) ---
+
+@instrumentar("garantizar_columnas")
+def garantizar_columnas(df, columnas_requeridas):
+    """Asegura que las columnas existan en memoria para evitar crash."""
+    if df is None or df.empty:
+        return pd.DataFrame(columns=columnas_requeridas)
+
+    for col in columnas_requeridas:
+        if col not in df.columns:
+            df[col] = ""
+    return df
+
+def copiar_atomico(origen, destino):
+    tmp = ruta_temporal(destino)
+    shutil.copy(origen, tmp)
+    os.replace(tmp, destino)
+
+def crear_backup(archivo):
+    """
+    Guarda la versión actual como .bak antes de modificar el archivo original. Es un enlace duro,
+    no una copia: los archivos se publican siempre con os.replace (inodo nuevo), así que el enlace
+    conserva intacta la versión anterior. Si el sistema de archivos no admite enlaces, se copia.
+    """
+    if os.path.exists(archivo) and os.path.getsize(archivo) > 0:
+        try:
+            with bloqueo_archivo(archivo):
+                tmp = ruta_temporal(f"{archivo}.bak")
+                try: os.link(archivo, tmp)
+                except OSError: shutil.copy(archivo, tmp)
+                os.replace(tmp, f"{archivo}.bak")
+        except OSError: pass
+
+def publicar_verificado(tmp, archivo, respaldo, cambio=None):
+    """
+    Publica `tmp` como `archivo` dejando antes su respaldo (la copia, o `cambio` sobre la versión
+    anterior; ver `Respaldo.guardar`) y su suma: si el proceso se corta a medias, la verificación
+    encuentra la versión nueva y la completa desde el respaldo. Sin `respaldo`, solo la suma (lo que
+    se puede recalcular). Requiere el bloqueo.
+    """
+    suma = suma_archivo(tmp)
+    if respaldo is not None: respaldo.guardar(tmp, os.path.basename(archivo), suma, cambio)
+    escribir_suma(ruta_suma(archivo), suma)
+    os.replace(tmp, archivo)
+    return suma
+
+def registrar_suma(archivo, respaldo):
+    """Archivo anterior a las sumas: se registra una vez tal como está. Requiere el bloqueo."""
+    suma = suma_archivo(archivo)
+    if respaldo is not None: respaldo.guardar(archivo, os.path.basename(archivo), suma)
+    escribir_suma(ruta_suma(archivo), suma)
+
+def recuperar_desde_backup(archivo, respaldo=None):
+    """Fuerza la restauración desde el archivo .bak. Con `respaldo`, se publica con su suma como cualquier escritura."""
+    backup = f"{archivo}.bak"
+    if os.path.exists(backup) and os.path.getsize(backup) > 0:
+        try:
+            with bloqueo_archivo(archivo):
+                if respaldo is None: copiar_atomico(backup, archivo)
+                else:
+                    tmp = ruta_temporal(archivo)
+                    shutil.copy(backup, tmp)
+                    publicar_verificado(tmp, archivo, respaldo)
+            return True
+        except OSError: return False
+    return False
+
+def reponer(archivo, respaldo=None):
+    """
+    Archivo que falta o no se puede leer: se repone la versión de su suma desde el respaldo y,
+    si no hay respaldo válido, la del .bak. True si después hay algo que leer.
+    """
+    with bloqueo_archivo(archivo):
+        suma = leer_suma(archivo)
+        if respaldo is not None and suma and respaldo.revisar(archivo, os.path.basename(archivo), suma) != "dañado": return True
+    return recuperar_desde_backup(archivo, respaldo)
+
+class EstructuraDesconocida(ValueError):
+    """El archivo tiene datos, pero ni su cabecera ni su número de columnas corresponden a lo esperado."""
+
+ERRORES_LECTURA = (OSError, UnicodeDecodeError, pd.errors.ParserError, pd.errors.EmptyDataError, EstructuraDesconocida)
+
+def leer_csv(archivo, columnas_esperadas):
+    """
+    Un solo parseo: la cabecera se mira antes de leer. Si no trae las columnas esperadas pero sí
+    al menos tantas (archivo sin cabecera o con otros nombres), se lee por posición; las añadidas
+    después (`COLS_AGREGADAS`) no cuentan, porque los archivos antiguos no las tienen. Si a una
+    cabecera conocida le faltan columnas, se añaden vacías; si no comparte ninguna, se lanza
+    EstructuraDesconocida en vez de devolver filas en blanco.
+    """
+    with open(archivo, 'r', encoding='utf-8-sig', newline='') as f: cabecera = [c.strip() for c in next(csv.reader(f), [])]
+    minimas = [c for c in columnas_esperadas if c not in COLS_AGREGADAS]
+    if not set(minimas).issubset(cabecera) and len(cabecera) >= len(minimas):
+        con_cabecera = cabecera[0].lower() == columnas_esperadas[0].lower()
+        df = pd.read_csv(archivo, header=None, skiprows=int(con_cabecera), dtype=str, keep_default_na=False)
+        df = df.rename(columns=dict(enumerate(columnas_esperadas)))
+    elif cabecera and not set(columnas_esperadas) & set(cabecera): raise EstructuraDesconocida(archivo)
+    else:
+        df = pd.read_csv(archivo, dtype=str, keep_default_na=False)
+        df.columns = df.columns.str.strip()
+    contar(bytes_leidos=os.path.getsize(archivo))
+    return garantizar_columnas(df, columnas_esperadas)
+
+@instrumentar("leer_csv_inteligente")
+def leer_csv_inteligente(archivo, columnas_esperadas, respaldo=None, estricto=False):
+    """
+    Lectura blindada. Si el archivo falta, está vacío o no se puede leer, se repone (ver `reponer`)
+    y se lee otra vez; si tampoco, devuelve un DataFrame vacío pero con la estructura correcta.
+    Con `estricto`, un archivo con datos que no se pudo leer lanza el error: quien va a reescribirlo
+    no debe hacerlo encima de un vacío. Cualquier otro error no se oculta.
+    """
+    error = None
+    for intento in range(2):
+        try:
+            if os.path.getsize(archivo) > 0: return leer_csv(archivo, columnas_esperadas)
+            error = None
+        except FileNotFoundError: error = None
+        except ERRORES_LECTURA as e: error = e
+        if intento or not reponer(archivo, respaldo): break
+    if estricto and error is not None: raise error
+    return pd.DataFrame(columns=columnas_esperadas)
+
+def escribir_csv_durable(df, archivo):
+    """Escribe el CSV completo y fuerza el volcado a disco antes de devolver."""
+    with medir("escribir_csv"), open(archivo, 'w', newline='', encoding='utf-8') as f:
+        df.to_csv(f, index=False)
+        f.flush()
+        os.fsync(f.fileno())
+        contar(filas_escritas=len(df), bytes_escritos=f.tell())
+
+def escribir_csv_atomico(df, archivo):
+    """Temporal + fsync + rename: los lectores ven el archivo anterior o el nuevo, nunca uno a medias."""
+    tmp = ruta_temporal(archivo)
+    escribir_csv_durable(df, tmp)
+    os.replace(tmp, archivo)
+
+def escribir_csv_verificado(df, archivo, respaldo, cambio=None):
+    """Como `escribir_csv_atomico`, con la suma y el respaldo del contenido nuevo (ver `publicar_verificado`)."""
+    tmp = ruta_temporal(archivo)
+    escribir_csv_durable(df, tmp)
+    return publicar_verificado(tmp, archivo, respaldo, cambio)
+
+@instrumentar("guardar_csv_seguro")
+def guardar_csv_seguro(df, archivo, respaldo, cambio=None):
+    """Deja la versión anterior en .bak y guarda la nueva con su suma, todo bajo el bloqueo del archivo."""
+    with bloqueo_archivo(archivo):
+        crear_backup(archivo)
+        return escribir_csv_verificado(df, archivo, respaldo, cambio)
+
+class CommitAgrupado:
+    """
+    Group commit: cada lote se encola y el primer hilo que obtiene el turno escribe
+    todos los pendientes en una sola operación; los demás solo esperan su confirmación.
+    """
+    def __init__(self, escribir):
+        self._escribir = escribir
+        self._pendientes = []
+        self._lock_cola = threading.Lock()
+        self._lock_turno = threading.Lock()
+
+    def enviar(self, df):
+        lote = {"df": df, "hecho": False, "error": None}
+        with self._lock_cola: self._pendientes.append(lote)
+        with self._lock_turno:
+            if not lote["hecho"]:
+                with self._lock_cola: grupo, self._pendientes = self._pendientes, []
+                try: self._escribir(pd.concat([l["df"] for l in grupo], ignore_index=True))
+                except Exception as e:
+                    for l in grupo: l["error"] = e
+                finally:
+                    for l in grupo: l["hecho"] = True
+        if lote["error"] is not None: raise lote["error"]
+
+def describir_df(df):
+    """Rango de fechas, equipos y número de registros de un historial (o de su resumen) en memoria."""
+    if df.empty: return {"registros": 0, "fecha_min": None, "fecha_max": None, "equipos": []}
+    fechas = df['Fecha'][df['Fecha'] != ""]
+    registros = int(df['Cantidad'].sum()) if 'Cantidad' in df.columns else len(df)
+    return {"registros": registros, "fecha_min": fechas.min() if len(fechas) else None,
+            "fecha_max": fechas.max() if len(fechas) else None, "equipos": list(df['Equipo'].unique())}
+
+def resumir(df, por_nombre=False):
+    """Conteo de registros por (Fecha, Equipo, Estado), o por (Fecha, Equipo, Nombre, Estado)."""
+    claves = CLAVES_RESUMEN[por_nombre]
+    if df.empty: return pd.DataFrame({c: pd.Series(dtype=str) for c in claves} | {"Cantidad": pd.Series(dtype="int64")})
+    return df.groupby(claves, sort=False).size().reset_index(name="Cantidad")
+
+def sumar_resumenes(partes, por_nombre=False):
+    """Combina resúmenes parciales (base + lotes nuevos) sumando las cantidades."""
+    partes = [p for p in partes if not p.empty]
+    if not partes: return resumir(pd.DataFrame(), por_nombre)
+    if len(partes) == 1: return partes[0]
+    df = pd.concat(partes, ignore_index=True).groupby(CLAVES_RESUMEN[por_nombre], sort=False)['Cantidad'].sum().reset_index()
+    return df[df['Cantidad'] != 0].reset_index(drop=True)  # filas editadas o borradas restan
+
+def leer_resumen(archivo, por_nombre=False):
+    df = pd.read_csv(archivo, dtype=str, keep_default_na=False)
+    df['Cantidad'] = df['Cantidad'].astype("int64")
+    return df[CLAVES_RESUMEN[por_nombre] + ["Cantidad"]]
+
+def indice_reportados(df, cantidad=None):
+    """
+    Quién reportó qué día en un trozo del historial: {fecha: conteo por (Equipo, Cedula, Nombre)}.
+    `cantidad` (+1/-1 por fila) es para los diarios de cambios; por defecto cada fila suma 1.
+    """
+    if df.empty: return {}
+    cantidad = pd.Series(1, index=df.index) if cantidad is None else cantidad
+    conteo = cantidad.groupby([df[c] for c in CLAVES_REPORTADOS], sort=False).sum()
+    return {f: g.droplevel(0) for f, g in conteo.groupby(level=0, sort=False)}
+
+def sumar_reportados(partes):
+    """Une los conteos de un día de varios trozos; quedan los empleados con algún registro vivo."""
+    partes = [p for p in partes if p is not None and len(p)]
+    if not partes: return pd.DataFrame(columns=CLAVES_REPORTADOS[1:])
+    total = partes[0] if len(partes) == 1 else pd.concat(partes).groupby(level=[0, 1, 2], sort=False).sum()
+    return total[total > 0].index.to_frame(index=False, name=CLAVES_REPORTADOS[1:])
+
+def plegar(texto):
+    """Minúsculas Unicode para buscar en nombres: igual en los tres almacenes (el LIKE de SQLite solo pliega ASCII)."""
+    return None if texto is None else str(texto).lower()
+
+def filtrar_asistencia(df, desde=None, hasta=None, equipos=None, nombre=None, contiene=None):
+    """
+    Filtro en memoria equivalente a las consultas indexadas. Sobre un frame tipado compara
+    datetime64 y códigos de categoría; sobre texto, fechas ISO (comparables como cadenas).
+    `contiene` busca dentro del nombre, sin distinguir mayúsculas.
+    """
+    if df.empty: return df
+    return df[mascara_asistencia(df, desde, hasta, equipos, nombre, contiene)]
+
+def mascara_asistencia(df, desde=None, hasta=None, equipos=None, nombre=None, contiene=None):
+    """La máscara booleana de `filtrar_asistencia`, para recorrer el resultado sin copiarlo."""
+    tipado = pd.api.types.is_datetime64_any_dtype(df['Fecha'])
+    mascara = pd.Series(True, index=df.index)
+    if desde: mascara &= df['Fecha'] >= (fecha(desde) if tipado else str(desde))
+    if hasta: mascara &= df['Fecha'] <= (fecha(hasta) if tipado else str(hasta))
+    if equipos: mascara &= df['Equipo'].isin(list(equipos))
+    if nombre: mascara &= df['Nombre'] == nombre
+    if contiene: mascara &= df['Nombre'].astype(str).str.lower().str.contains(plegar(contiene), regex=False)
+    return mascara
+
+def operaciones_cambio(actual, df_editados, registros_borrados):
+    """
+    Diario de cambios por `Registro`: '-' con la fila tal como está en `actual` y '+' con la nueva.
+    Se ignoran los registros que ya no existen (borrados por otra sesión mientras se editaban).
+    """
+    tocados = actual[actual['Registro'].isin(set(df_editados['Registro']) | set(registros_borrados))]
+    nuevos = df_editados[df_editados['Registro'].isin(tocados['Registro'])]
+    return pd.concat([tocados[COLS_ASISTENCIA].assign(Operacion="-"), nuevos[COLS_ASISTENCIA].assign(Operacion="+")], ignore_index=True)
+
+def aplicar_cambios(df, cambios):
+    """
+    Aplica un diario de cambios: '-' retira la fila y '+' la escribe en su sitio (o al final si no estaba).
+    Cuenta la última operación de cada registro: editar y luego borrar deja la fila borrada.
+    """
+    if cambios.empty: return df
+    ultimas = cambios.drop_duplicates('Registro', keep='last')
+    columnas = [c for c in COLS_ASISTENCIA if c != 'Registro']
+    nuevos = ultimas[ultimas['Operacion'] == "+"].set_index('Registro')[columnas]
+    df = df[~df['Registro'].isin(ultimas.loc[ultimas['Operacion'] == "-", 'Registro'])].copy()
+    en_sitio = df['Registro'].isin(nuevos.index)
+    df.loc[en_sitio, columnas] = nuevos.loc[df.loc[en_sitio, 'Registro']].to_numpy()
+    faltan = nuevos[~nuevos.index.isin(df['Registro'])].reset_index()
+    return pd.concat([df, faltan[COLS_ASISTENCIA]], ignore_index=True) if not faltan.empty else df.reset_index(drop=True)
+
+def resumen_cambios(cambios, por_nombre=False):
+    """Conteos que suma ('+') y resta ('-') un diario de cambios."""
+    positivos = resumir(cambios[cambios['Operacion'] == "+"], por_nombre)
+    negativos = resumir(cambios[cambios['Operacion'] == "-"], por_nombre)
+    return [positivos, negativos.assign(Cantidad=-negativos['Cantidad'])]
+
+# --- 2. BACKEND CSV (DIARIO APPEND-ONLY) ---
+
+class EmpleadosCSV:
+    """Empleados en un CSV plano, con backup, suma y bloqueo. Lo comparten los backends de archivos."""
+
+    def __init__(self, archivo_empleados):
+        self.archivo_empleados = archivo_empleados
+        self.respaldo_empleados = Respaldo(f"{archivo_empleados}.respaldo", self.rehacer_empleados)
+
+    def preparar_empleados(self):
+        with bloqueo_archivo(self.archivo_empleados):
+            if not os.path.exists(self.archivo_empleados):
+                if not reponer(self.archivo_empleados, self.respaldo_empleados):
+                    escribir_csv_verificado(pd.DataFrame(columns=COLS_EMPLEADOS), self.archivo_empleados, self.respaldo_empleados)
+            elif leer_suma(self.archivo_empleados) is None: registrar_suma(self.archivo_empleados, self.respaldo_empleados)
+
+    def firma_empleados(self):
+        return firma_archivo(self.archivo_empleados)
+
+    def cargar_empleados(self):
+        return leer_csv_inteligente(self.archivo_empleados, COLS_EMPLEADOS, self.respaldo_empleados)
+
+    @staticmethod
+    def con_equipo(df_todos, equipo, df_nuevo):
+        """El personal con el de `equipo` sustituido por `df_nuevo`, que va al final."""
+        if not df_todos.empty: df_todos = df_todos[df_todos['Equipo'] != equipo]
+        return pd.concat([df_todos, df_nuevo[COLS_EMPLEADOS]], ignore_index=True)
+
+    def reemplazar_equipo(self, equipo, df_nuevo):
+        # Lectura-modificación-escritura bajo bloqueo: dos equipos guardando a la vez no se pisan
+        with bloqueo_archivo(self.archivo_empleados):
+            df_todos = self.cargar_empleados()
+            # Si lo leído es la versión de su suma, la nueva se respalda como ese equipo y nada más
+            desde, cambio = leer_suma(self.archivo_empleados), None
+            if desde and self.respaldo_empleados.comprobar(self.archivo_empleados, desde):
+                cambio = {"desde": desde, "equipo": equipo, "filas": df_nuevo[COLS_EMPLEADOS].to_csv(index=False)}
+            suma = guardar_csv_seguro(self.con_equipo(df_todos, equipo, df_nuevo), self.archivo_empleados, self.respaldo_empleados, cambio)
+            self.respaldo_empleados.podar({(os.path.basename(self.archivo_empleados), suma)})
+
+    def rehacer_empleados(self, anterior, cambio, destino):
+        """Repite un `reemplazar_equipo` sobre la versión `anterior` (ver `Respaldo.reconstruir`)."""
+        filas = pd.read_csv(io.StringIO(cambio["filas"]), dtype=str, keep_default_na=False)
+        escribir_csv_durable(self.con_equipo(leer_csv(anterior, COLS_EMPLEADOS), cambio["equipo"], filas), destino)
+
+    def restaurar_empleados(self):
+        return recuperar_desde_backup(self.archivo_empleados, self.respaldo_empleados)
+
+    def reparar_empleados(self, completa=False):
+        """
+        Compara el archivo de empleados con su suma y, si no coincide, lo repone desde su respaldo.
+        Devuelve (reparados, dañados sin respaldo válido), como `reparar` en cada almacén.
+        """
+        nombre = os.path.basename(self.archivo_empleados)
+        with bloqueo_archivo(self.archivo_empleados):
+            suma = leer_suma(self.archivo_empleados)
+            estado = self.respaldo_empleados.revisar(self.archivo_empleados, nombre, suma, completa) if suma else "bien"
+        return ([nombre] if estado == "reparado" else [], [nombre] if estado == "dañado" else [])
+
+class AlmacenCSV(EmpleadosCSV):
+    """Asistencia en base CSV + diario de segmentos; empleados en un CSV plano."""
+    consultas_indexadas = False
+
+    def __init__(self, archivo_asistencia, archivo_empleados):
+        super().__init__(archivo_empleados)
+        self.archivo_asistencia = archivo_asistencia
+        self.carpeta_diario = f"{archivo_asistencia}.diario"
+        self.marca_compactacion = os.path.join(self.carpeta_diario, "_compactando.json")
+        self.base_compactada = f"{archivo_asistencia}.compactado"
+        # Resúmenes de la base; se reescriben en cada compactación junto con ella
+        self.archivos_resumen = {False: f"{archivo_asistencia}.resumen.csv", True: f"{archivo_asistencia}.resumen_nombre.csv"}
+        self._commit = CommitAgrupado(self._escribir_lote)
+        # Respaldos verificados: cada segmento del diario se copia; la base, como los segmentos que se
+        # compactaron en ella (con una copia entera cada MAX_CADENA versiones). Los resúmenes, no: se recalculan
+        self.respaldo = Respaldo(f"{archivo_asistencia}.respaldo", self.rehacer_base)
+        self.respaldo_diario = Respaldo(f"{self.carpeta_diario}.respaldo")
+        # Índice de reportados: el de la base se rehace al compactar; el de cada segmento, al aparecer
+        self._reportados_base = (None, {})
+        self._reportados_segmentos = {}
+
+    def preparar(self):
+        """Verifica integridad al inicio."""
+        if not os.path.exists(self.carpeta_diario): os.makedirs(self.carpeta_diario)
+        # Compactación interrumpida por un cierre inesperado. Bajo bloqueo: otro proceso
+        # puede estar compactando ahora mismo y su temporal no es un huérfano.
+        with bloqueo_archivo(self.archivo_asistencia):
+            try: self.finalizar_compactacion()
+            except: pass
+        # Temporales huérfanos de procesos caídos (los recientes pueden ser escrituras en curso)
+        for n in os.listdir(self.carpeta_diario):
+            ruta = os.path.join(self.carpeta_diario, n)
+            try:
+                if n.endswith('.tmp') and time_mod.time() - os.path.getmtime(ruta) > 3600: os.remove(ruta)
+            except OSError: pass
+        # Si faltan archivos, intentar recuperar de su respaldo o del backup, o crear nuevos
+        self.preparar_empleados()
+        with bloqueo_archivo(self.archivo_asistencia):
+            if not os.path.exists(self.archivo_asistencia) and not reponer(self.archivo_asistencia, self.respaldo):
+                escribir_csv_verificado(pd.DataFrame(columns=COLS_ASISTENCIA), self.archivo_asistencia, self.respaldo)
+            for ruta in self.archivos_con_suma():  # anteriores a las sumas: se registran una vez
+                if os.path.exists(ruta) and leer_suma(ruta) is None:
+                    registrar_suma(ruta, self.respaldo if ruta == self.archivo_asistencia else None)
+            self.reparar()
+            self.podar_diario()
+        # Historial anterior a la columna Registro (o restaurado de un .bak antiguo): se numera una vez
+        if not self.tiene_registro():
+            with bloqueo_archivo(self.archivo_asistencia):
+                if not self.tiene_registro(): self.compactar(minimo=0)
+
+    def tiene_registro(self):
+        try:
+            with open(self.archivo_asistencia, 'r', encoding='utf-8') as f: return "Registro" in f.readline()
+        except OSError: return True
+
+    # Diario
+
+    def ruta_segmento(self, seg):
+        return os.path.join(self.carpeta_diario, seg)
+
+    def copia_segmento(self, seg):
+        """Copia del segmento en el respaldo ("" si es anterior a las sumas y no tiene)."""
+        return self.respaldo_diario.copia(seg, suma_segmento(seg)) if suma_segmento(seg) else ""
+
+    def segmentos_respaldados(self):
+        """Segmentos cuya copia hace falta para rehacer alguna versión respaldada de la base."""
+        return {s for cambio in self.respaldo.cambios() for s in cambio.get("segmentos", [])}
+
+    def podar_diario(self):
+        """Copias de segmentos que ya no están en el diario ni las necesita el respaldo de la base. Requiere el bloqueo."""
+        conservar = [*self.listar_segmentos(), *self.segmentos_respaldados()]
+        self.respaldo_diario.podar({(s, suma_segmento(s)) for s in conservar}, antiguedad=3600)
+
+    def listar_segmentos(self):
+        """Segmentos del diario en orden de escritura (el nombre empieza por el timestamp)."""
+        if not os.path.isdir(self.carpeta_diario): return []
+        return sorted(n for n in os.listdir(self.carpeta_diario) if n.endswith('.csv'))
+
+    def anexar_segmento(self, df, sufijo=".csv"):
+        """
+        Guarda un lote como segmento nuevo: temporal + rename, nunca queda a medias. La suma va en
+        el nombre y la copia se deja antes de publicarlo: el lote copia sus filas, no el historial.
+        """
+        os.makedirs(self.carpeta_diario, exist_ok=True)
+        tmp = ruta_temporal(os.path.join(self.carpeta_diario, uuid.uuid4().hex))
+        escribir_csv_durable(df, tmp)
+        suma = suma_archivo(tmp)
+        nombre = f"{time_mod.time_ns():020d}_{uuid.uuid4().hex[:8]}_{suma}{sufijo}"
+        self.respaldo_diario.guardar(tmp, nombre, suma)
+        os.replace(tmp, os.path.join(self.carpeta_diario, nombre))
+
+    def leer_marca_compactacion(self):
+        """
+        Devuelve el conjunto de segmentos incluidos en la compactación en curso, o None.
+        Se guardan por nombre y no como "hasta X": un proceso puede publicar un segmento
+        con timestamp anterior después de que otro haya hecho el listado.
+        """
+        if not os.path.exists(self.marca_compactacion): return None
+        try:
+            with open(self.marca_compactacion, 'r') as f: return set(json.load(f).get("segmentos", []))
+        except: return None
+
+    def versiones_anteriores(self):
+        """(nombre, suma) publicados antes de la compactación en curso: su respaldo se conserva una vuelta más."""
+        try:
+            with open(self.marca_compactacion, 'r') as f: return {tuple(v) for v in json.load(f).get("anteriores", [])}
+        except (OSError, ValueError, TypeError): return set()
+
+    def finalizar_compactacion(self):
+        """
+        Completa (o descarta) una compactación interrumpida. Es idempotente:
+        sin marca, la base nueva no llegó a confirmarse; con marca, se aplica y se limpian los segmentos.
+        """
+        incluidos = self.leer_marca_compactacion()
+        rutas = [*self.archivos_con_suma(), *map(ruta_suma, self.archivos_con_suma())]
+        if incluidos is None:
+            for ruta in rutas:
+                if os.path.exists(f"{ruta}.compactado"): os.remove(f"{ruta}.compactado")
+            return
+        for ruta in rutas:
+            if os.path.exists(f"{ruta}.compactado"): os.replace(f"{ruta}.compactado", ruta)
+        for seg in self.listar_segmentos():
+            if seg in incluidos: os.remove(os.path.join(self.carpeta_diario, seg))
+        anteriores = self.versiones_anteriores()
+        os.remove(self.marca_compactacion)
+        self.respaldo.podar(self.versiones_vigentes() | anteriores)
+        respaldados = self.segmentos_respaldados()
+        for seg in incluidos:
+            if suma_segmento(seg) and seg not in respaldados: self.respaldo_diario.olvidar(seg, suma_segmento(seg))
+
+    def reemplazar_base(self, df, segmentos, cambio=None):
+        """
+        Sustituye la base por `df`, que ya contiene `segmentos`, y los retira del diario. Requiere el bloqueo.
+        Base y resúmenes nuevos se publican con su suma, y la base con su respaldo (`cambio` si se puede
+        rehacer, ver `compactar`), todo antes de confirmar.
+        """
+        contenidos = {self.archivo_asistencia: df, **{r: resumir(df, p) for p, r in self.archivos_resumen.items()}}
+        for ruta, contenido in contenidos.items():
+            escribir_csv_durable(contenido, f"{ruta}.compactado")
+            suma = suma_archivo(f"{ruta}.compactado")
+            if ruta == self.archivo_asistencia: self.respaldo.guardar(f"{ruta}.compactado", os.path.basename(ruta), suma, cambio)
+            escribir_suma(f"{ruta_suma(ruta)}.compactado", suma)
+        os.makedirs(self.carpeta_diario, exist_ok=True)
+        tmp = ruta_temporal(self.marca_compactacion)
+        with open(tmp, 'w') as f:
+            json.dump({"segmentos": list(segmentos), "anteriores": sorted(self.versiones_vigentes())}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.marca_compactacion)  # punto de confirmación
+        self.finalizar_compactacion()
+
+    def leer_segmentos(self, segmentos, columnas_esperadas, ubicar=None):
+        """
+        Une los segmentos de filas nuevas en un único parseo (se descarta la cabecera de cada uno).
+        `ubicar` da la ruta de cada segmento; por defecto, la del diario.
+        """
+        segmentos = [s for s in segmentos if not s.endswith(SUFIJO_CAMBIOS)]
+        if not segmentos: return pd.DataFrame(columns=columnas_esperadas)
+        ubicar = ubicar or self.ruta_segmento
+        cuerpos = []
+        for seg in segmentos:
+            try:
+                with open(ubicar(seg), 'r', encoding='utf-8') as f:
+                    f.readline()
+                    cuerpos.append(f.read())
+            except FileNotFoundError: pass  # ya compactado por otra sesión
+        texto = ",".join(COLS_ASISTENCIA) + "\n" + "".join(cuerpos)
+        contar(bytes_leidos=len(texto))
+        df = pd.read_csv(io.StringIO(texto), dtype=str, keep_default_na=False)
+        return garantizar_columnas(df, columnas_esperadas)
+
+    def leer_cambios(self, segmentos, ubicar=None):
+        """Segmentos de ediciones y borrados (filas '-'/'+' por Registro), en orden de escritura."""
+        ubicar = ubicar or self.ruta_segmento
+        partes = []
+        for seg in segmentos:
+            if not seg.endswith(SUFIJO_CAMBIOS): continue
+            try: partes.append(pd.read_csv(ubicar(seg), dtype=str, keep_default_na=False))
+            except FileNotFoundError: pass
+        if not partes: return pd.DataFrame(columns=COLS_ASISTENCIA + ["Operacion"])
+        return pd.concat(partes, ignore_index=True)
+
+    def _leer(self, segmentos, columnas_esperadas, estricto=False, base=None, ubicar=None):
+        """Base + `segmentos`. Con `base` y `ubicar`, desde otros archivos (las copias, al rehacer una versión)."""
+        respaldo = None
+        if base is None:
+            en_curso = self.leer_marca_compactacion() is not None and os.path.exists(self.base_compactada)
+            base, respaldo = self.base_compactada if en_curso else self.archivo_asistencia, self.respaldo
+        df_base = leer_csv_inteligente(base, columnas_esperadas, respaldo, estricto)
+        df_diario = self.leer_segmentos(segmentos, columnas_esperadas, ubicar)
+        if df_diario.empty: df = df_base
+        elif df_base.empty: df = df_diario
+        else:
+            with medir("pd.concat"): df = pd.concat([df_base, df_diario], ignore_index=True)
+        cambios = self.leer_cambios(segmentos, ubicar)
+        if cambios.empty: return df
+        return garantizar_columnas(aplicar_cambios(garantizar_columnas(df, COLS_ASISTENCIA), cambios), columnas_esperadas)
+
+    def segmentos_vigentes(self):
+        """Segmentos que aún no forman parte de la base (respeta una compactación en curso)."""
+        segs = self.listar_segmentos()
+        incluidos = self.leer_marca_compactacion()
+        if incluidos: segs = [s for s in segs if s not in incluidos]
+        return segs
+
+    def compactar(self, minimo=1):
+        """Vuelca los segmentos del diario en la base. Conserva el contenido, no necesita .bak."""
+        with bloqueo_archivo(self.archivo_asistencia):
+            self.finalizar_compactacion()
+            segs = self.listar_segmentos()
+            if len(segs) < minimo: return  # otro proceso compactó mientras esperábamos
+            # Un archivo dañado sin copia válida no se vuelca en la base (su suma nueva lo daría por bueno):
+            # el diario conserva los lotes hasta repararlo
+            if self.revisar([self.archivo_asistencia], segs)[1]: return
+            # Una base que no se pudo leer tampoco: reescribirla sería publicar su pérdida
+            try: leido = self._leer(segs, COLS_ASISTENCIA, estricto=True)
+            except ERRORES_LECTURA: return
+            df = asignar_registros(leido)
+            # Sin filas que numerar, la base nueva se rehace con la anterior y las copias de los segmentos:
+            # se respalda como ese cambio y no como una copia del historial
+            desde = leer_suma(self.archivo_asistencia)
+            rehacible = df is leido and desde and all(os.path.exists(self.copia_segmento(s)) for s in segs)
+            self.reemplazar_base(df[COLS_ASISTENCIA], segs, {"desde": desde, "segmentos": segs} if rehacible else None)
+
+    def rehacer_base(self, anterior, cambio, destino):
+        """Repite una compactación sobre la versión `anterior` con las copias de sus segmentos (ver `Respaldo.reconstruir`)."""
+        df = self._leer(cambio["segmentos"], COLS_ASISTENCIA, estricto=True, base=anterior, ubicar=self.copia_segmento)
+        escribir_csv_durable(df[COLS_ASISTENCIA], destino)
+
+    # Interfaz común
+
+    def firma_asistencia(self):
+        """La base, una compactación en curso y el listado del diario determinan el historial."""
+        return (firma_archivo(self.archivo_asistencia), firma_archivo(self.base_compactada),
+                firma_archivo(self.marca_compactacion), tuple(self.listar_segmentos()))
+
+    def cargar_asistencia(self, columnas_esperadas=COLS_ASISTENCIA):
+        """
+        Historial completo: base compactada + segmentos pendientes del diario.
+        Se lee sin bloqueo; si una compactación cambia los archivos a mitad de lectura, se repite.
+        """
+        for _ in range(3):
+            firma = self.firma_asistencia()
+            df = self._leer(self.segmentos_vigentes(), columnas_esperadas)
+            if self.firma_asistencia() == firma: return df
+        with bloqueo_archivo(self.archivo_asistencia):
+            return self._leer(self.segmentos_vigentes(), columnas_esperadas)
+
+    def describir_asistencia(self):
+        return describir_df(self.cargar_resumen())
+
+    def _resumen_base(self, por_nombre):
+        ruta = self.archivos_resumen[por_nombre]
+        if os.path.exists(ruta): return leer_resumen(ruta, por_nombre)
+        # Base anterior a los resúmenes (o restaurada desde .bak): se calcula una vez y se guarda
+        with bloqueo_archivo(self.archivo_asistencia):
+            df = resumir(leer_csv_inteligente(self.archivo_asistencia, COLS_ASISTENCIA, self.respaldo), por_nombre)
+            escribir_csv_verificado(df, ruta, None)
+        return df
+
+    def cargar_resumen(self, por_nombre=False):
+        """Resumen de la base + conteo de los segmentos del diario (pocas filas): no recorre el historial."""
+        for _ in range(3):
+            firma = self.firma_asistencia()
+            segs = self.segmentos_vigentes()
+            base = self._resumen_base(por_nombre)
+            nuevos = resumir(self.leer_segmentos(segs, COLS_ASISTENCIA), por_nombre)
+            df = sumar_resumenes([base, nuevos, *resumen_cambios(self.leer_cambios(segs), por_nombre)], por_nombre)
+            if self.firma_asistencia() == firma: return df
+        return df
+
+    def _indice_base(self):
+        en_curso = self.leer_marca_compactacion() is not None and os.path.exists(self.base_compactada)
+        ruta = self.base_compactada if en_curso else self.archivo_asistencia
+        firma = (ruta, firma_archivo(ruta))
+        if self._reportados_base[0] != firma:
+            self._reportados_base = (firma, indice_reportados(leer_csv_inteligente(ruta, COLS_ASISTENCIA)))
+        return self._reportados_base[1]
+
+    def _indice_segmento(self, seg):
+        indice = self._reportados_segmentos.get(seg)
+        if indice is None:
+            if seg.endswith(SUFIJO_CAMBIOS):
+                cambios = self.leer_cambios([seg])
+                indice = indice_reportados(cambios, pd.Series((cambios['Operacion'] == "+") * 2 - 1, index=cambios.index))
+            else: indice = indice_reportados(self.leer_segmentos([seg], COLS_ASISTENCIA))
+            self._reportados_segmentos[seg] = indice
+        return indice
+
+    def reportados(self, dia):
+        """
+        Empleados (Equipo, Cedula, Nombre) con registro el `dia`. Los segmentos son inmutables, así
+        que cada uno se indexa una vez: tras guardar un lote solo se lee el suyo, no el historial.
+        """
+        dia = str(dia)
+        for _ in range(3):
+            firma = self.firma_asistencia()
+            segs = self.segmentos_vigentes()
+            partes = [self._indice_base().get(dia)] + [self._indice_segmento(s).get(dia) for s in segs]
+            if self.firma_asistencia() == firma: break
+        self._reportados_segmentos = {s: i for s, i in self._reportados_segmentos.items() if s in segs}
+        return sumar_reportados(partes)
+
+    def _escribir_lote(self, df):
+        self.anexar_segmento(asignar_registros(df)[COLS_ASISTENCIA])
+        if len(self.listar_segmentos()) >= MAX_SEGMENTOS_DIARIO: self.compactar(MAX_SEGMENTOS_DIARIO)
+
+    def agregar_asistencia(self, df):
+        """Anexa el lote al diario: el coste depende de las filas guardadas, no del historial."""
+        self._commit.enviar(df)
+
+    def modificar_asistencia(self, df_editados, registros_borrados):
+        """Ediciones y borrados van al diario como un segmento de cambios; la base no se reescribe."""
+        with bloqueo_archivo(self.archivo_asistencia):
+            cambios = operaciones_cambio(self._leer(self.segmentos_vigentes(), COLS_ASISTENCIA), df_editados, registros_borrados)
+            if cambios.empty: return 0
+            self.anexar_segmento(cambios, SUFIJO_CAMBIOS)
+            if len(self.listar_segmentos()) >= MAX_SEGMENTOS_DIARIO: self.compactar(MAX_SEGMENTOS_DIARIO)
+        return cambios['Registro'].nunique()
+
+    def reemplazar_asistencia(self, df):
+        with bloqueo_archivo(self.archivo_asistencia):
+            self.compactar()  # el .bak debe contener el historial completo
+            crear_backup(self.archivo_asistencia)
+            self.reemplazar_base(asignar_registros(df)[COLS_ASISTENCIA], [])
+
+    def borrar_asistencia(self):
+        with bloqueo_archivo(self.archivo_asistencia):
+            self.compactar()
+            crear_backup(self.archivo_asistencia)
+            self.reemplazar_base(pd.DataFrame(columns=COLS_ASISTENCIA), self.listar_segmentos())
+
+    def restaurar_asistencia(self):
+        with bloqueo_archivo(self.archivo_asistencia):
+            anteriores = self.versiones_vigentes()  # la versión que se descarta conserva su respaldo
+            ok = recuperar_desde_backup(self.archivo_asistencia, self.respaldo)
+            if ok:  # el resumen ya no corresponde a la base restaurada
+                for ruta in self.archivos_resumen.values():
+                    for archivo in (ruta_suma(ruta), ruta):
+                        if os.path.exists(archivo): os.remove(archivo)
+                self.respaldo.podar(self.versiones_vigentes() | anteriores)
+            return ok
+
+    # Integridad
+
+    def archivos_con_suma(self):
+        return [self.archivo_asistencia, *self.archivos_resumen.values()]
+
+    def versiones_vigentes(self):
+        """(nombre, suma) de la base publicada: el respaldo que hay que conservar (los resúmenes no tienen)."""
+        suma = leer_suma(self.archivo_asistencia)
+        return {(os.path.basename(self.archivo_asistencia), suma)} if suma else set()
+
+    def revisar(self, rutas, segmentos, completa=False):
+        """
+        Compara cada archivo con su suma y repone desde su respaldo los que no coinciden. Requiere el
+        bloqueo. Devuelve (reparados, dañados sin respaldo válido); lo anterior a las sumas no se revisa.
+        """
+        archivos = [(r, os.path.basename(r), leer_suma(r), self.respaldo) for r in rutas]
+        archivos += [(os.path.join(self.carpeta_diario, s), s, suma_segmento(s), self.respaldo_diario) for s in segmentos]
+        reparados, danados = [], []
+        for ruta, nombre, suma, respaldo in archivos:
+            if not suma: continue
+            estado = respaldo.revisar(ruta, nombre, suma, completa)
+            if estado == "reparado":
+                reparados.append(nombre)
+                self._reportados_segmentos.pop(nombre, None)
+            elif estado == "dañado": danados.append(nombre)
+        return reparados, danados
+
+    def reparar(self, completa=False):
+        """
+        Verifica empleados, base, resúmenes y segmentos por su suma (sin parsear) y repone solo los
+        dañados. Un resumen dañado se borra: se recalcula desde la base al leerlo.
+        """
+        reparados, danados = self.reparar_empleados(completa)
+        with bloqueo_archivo(self.archivo_asistencia):
+            self.finalizar_compactacion()
+            rep, dan = self.revisar(self.archivos_con_suma(), self.listar_segmentos(), completa)
+            for ruta in self.archivos_resumen.values():
+                if os.path.basename(ruta) in dan:
+                    for archivo in (ruta_suma(ruta), ruta):
+                        if os.path.exists(archivo): os.remove(archivo)
+                    dan.remove(os.path.basename(ruta))
+                    rep.append(os.path.basename(ruta))
+        return reparados + rep, danados + dan
+
+# --- 3. BACKEND SQLITE (WAL + ÍNDICES) ---
+
+ESQUEMA_SQLITE = """
+CREATE TABLE IF NOT EXISTS asistencia (
+    id INTEGER PRIMARY KEY, Fecha TEXT NOT NULL, Equipo TEXT NOT NULL, Nombre TEXT NOT NULL,
+    Cedula TEXT, Estado TEXT, Observacion TEXT, Soporte TEXT, Registro TEXT);
+CREATE INDEX IF NOT EXISTS ix_asistencia_fecha ON asistencia (Fecha, Equipo, Nombre);
+CREATE INDEX IF NOT EXISTS ix_asistencia_equipo ON asistencia (Equipo, Fecha);
+CREATE INDEX IF NOT EXISTS ix_asistencia_nombre ON asistencia (Nombre, Fecha);
+CREATE INDEX IF NOT EXISTS ix_asistencia_reportados ON asistencia (Fecha, Equipo, Cedula, Nombre);
+CREATE TABLE IF NOT EXISTS asistencia_bak AS SELECT * FROM asistencia WHERE 0;
+CREATE TABLE IF NOT EXISTS empleados (Equipo TEXT NOT NULL, Nombre TEXT, Cedula TEXT);
+CREATE INDEX IF NOT EXISTS ix_empleados_equipo ON empleados (Equipo);
+CREATE TABLE IF NOT EXISTS empleados_bak AS SELECT * FROM empleados WHERE 0;
+CREATE TABLE IF NOT EXISTS resumen_diario (
+    Fecha TEXT, Equipo TEXT, Estado TEXT, Cantidad INTEGER NOT NULL,
+    PRIMARY KEY (Fecha, Equipo, Estado)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS resumen_nombre (
+    Fecha TEXT, Equipo TEXT, Nombre TEXT, Estado TEXT, Cantidad INTEGER NOT NULL,
+    PRIMARY KEY (Nombre, Fecha, Equipo, Estado)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS meta (clave TEXT PRIMARY KEY, valor INTEGER NOT NULL);
+INSERT OR IGNORE INTO meta VALUES ('version_asistencia', 0), ('version_empleados', 0), ('resumen_al_dia', 0);
+"""
+TABLAS_RESUMEN = {False: "resumen_diario", True: "resumen_nombre"}
+_ESQUEMA_LISTO = set()  # bases cuyo esquema y migraciones ya se aplicaron en este proceso
+_LOCK_ESQUEMA = threading.Lock()
+
+class AlmacenSQLite:
+    """Asistencia y empleados en una base SQLite compartida por todas las sesiones."""
+    consultas_indexadas = True
+
+    def __init__(self, ruta):
+        self.ruta = ruta
+        self._local = threading.local()  # sqlite3 no comparte conexiones entre hilos
+        self._commit = CommitAgrupado(self._escribir_lote)
+
+    def _conexion(self):
+        """
+        Conexión del hilo. Streamlit corre cada rerun en un hilo nuevo, así que abrirla debe ser
+        barato: solo el PRAGMA por conexión; esquema y migraciones quedan en `_preparar_esquema`.
+        """
+        con = getattr(self._local, "con", None)
+        if con is None:
+            self._preparar_esquema()
+            con = sqlite3.connect(self.ruta, timeout=30)
+            con.execute("PRAGMA synchronous=NORMAL")
+            con.create_function("plegar", 1, plegar, deterministic=True)
+            self._local.con = con
+        return con
+
+    def _preparar_esquema(self):
+        """WAL (queda guardado en la base), tablas y migraciones: una vez por base y proceso."""
+        ruta = os.path.abspath(self.ruta)
+        if ruta in _ESQUEMA_LISTO: return
+        with _LOCK_ESQUEMA:
+            if ruta in _ESQUEMA_LISTO: return
+            con = sqlite3.connect(self.ruta, timeout=30)
+            try:
+                con.execute("PRAGMA journal_mode=WAL")
+                con.executescript(ESQUEMA_SQLITE)
+                self._migrar_registro(con)
+            finally: con.close()
+            _ESQUEMA_LISTO.add(ruta)
+
+    @staticmethod
+    def _migrar_registro(con):
+        """Bases creadas antes de la columna Registro: se añade y se numeran las filas existentes."""
+        if "Registro" not in [c[1] for c in con.execute("PRAGMA table_info(asistencia)")]:
+            con.execute("BEGIN IMMEDIATE")
+            try:
+                if "Registro" not in [c[1] for c in con.execute("PRAGMA table_info(asistencia)")]:
+                    for tabla in ["asistencia", "asistencia_bak"]:
+                        con.execute(f"ALTER TABLE {tabla} ADD COLUMN Registro TEXT")
+                        con.execute(f"UPDATE {tabla} SET Registro = lower(hex(randomblob(16)))")
+                con.commit()
+            except:
+                con.rollback()
+                raise
+        con.execute("CREATE INDEX IF NOT EXISTS ix_asistencia_registro ON asistencia (Registro)")
+
+    @staticmethod
+    def _donde(desde=None, hasta=None, equipos=None, nombre=None, contiene=None):
+        """Cláusula WHERE y parámetros para los filtros del dashboard y del editor."""
+        condiciones, parametros = [], []
+        if desde: condiciones.append("Fecha >= ?"); parametros.append(str(desde))
+        if hasta: condiciones.append("Fecha <= ?"); parametros.append(str(hasta))
+        if equipos:
+            equipos = list(equipos)
+            condiciones.append(f"Equipo IN ({', '.join('?' * len(equipos))})"); parametros += equipos
+        if nombre: condiciones.append("Nombre = ?"); parametros.append(nombre)
+        if contiene:  # % y _ se buscan tal cual
+            condiciones.append("plegar(Nombre) LIKE ? ESCAPE '\\'")
+            parametros.append("%" + plegar(contiene).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+        return (f"WHERE {' AND '.join(condiciones)}" if condiciones else ""), parametros
+
+    @instrumentar("sqlite_consulta")
+    def _consulta(self, sql, parametros=(), columnas=None):
+        df = pd.read_sql_query(sql, self._conexion(), params=parametros, dtype=str)
+        df = df.fillna("")
+        return garantizar_columnas(df, columnas) if columnas else df
+
+    def _version(self, clave):
+        return self._conexion().execute("SELECT valor FROM meta WHERE clave = ?", (clave,)).fetchone()[0]
+
+    @staticmethod
+    def _incrementar(con, clave):
+        con.execute("UPDATE meta SET valor = valor + 1 WHERE clave = ?", (clave,))
+
+    @staticmethod
+    def _insertar(con, tabla, df, columnas):
+        filas = df[columnas].fillna("").astype(str).itertuples(index=False, name=None)
+        contar(filas_escritas=len(df))
+        con.executemany(f"INSERT INTO {tabla} ({', '.join(columnas)}) VALUES ({', '.join('?' * len(columnas))})", filas)
+
+    def preparar(self):
+        self._preparar_esquema()
+        con = self._conexion()
+        if con.execute("SELECT valor FROM meta WHERE clave = 'resumen_al_dia'").fetchone()[0] == 0:
+            with con:  # base creada antes de existir los resúmenes
+                self._recalcular_resumen(con)
+                con.execute("UPDATE meta SET valor = 1 WHERE clave = 'resumen_al_dia'")
+
+    @staticmethod
+    def _recalcular_resumen(con):
+        for por_nombre, tabla in TABLAS_RESUMEN.items():
+            claves = ", ".join(CLAVES_RESUMEN[por_nombre])
+            con.execute(f"DELETE FROM {tabla}")
+            con.execute(f"INSERT INTO {tabla} ({claves}, Cantidad) SELECT {claves}, COUNT(*) FROM asistencia GROUP BY {claves}")
+
+    @staticmethod
+    def _sumar_resumen(con, df, signo=1):
+        """Actualización incremental: upsert de los conteos del lote (con signo -1, de las filas que salen)."""
+        for por_nombre, tabla in TABLAS_RESUMEN.items():
+            claves = CLAVES_RESUMEN[por_nombre]
+            resumen = resumir(df.fillna("").astype(str), por_nombre)
+            resumen['Cantidad'] *= signo
+            con.executemany(
+                f"INSERT INTO {tabla} ({', '.join(claves)}, Cantidad) VALUES ({', '.join('?' * (len(claves) + 1))}) "
+                f"ON CONFLICT ({', '.join(claves)}) DO UPDATE SET Cantidad = Cantidad + excluded.Cantidad",
+                resumen.itertuples(index=False, name=None))
+            if signo < 0: con.execute(f"DELETE FROM {tabla} WHERE Cantidad = 0")
+
+    # Interfaz común
+
+    def firma_asistencia(self):
+        return ("sqlite", self.ruta, self._version('version_asistencia'))
+
+    def firma_empleados(self):
+        return ("sqlite", self.ruta, self._version('version_empleados'))
+
+    def cargar_asistencia(self, columnas_esperadas=COLS_ASISTENCIA):
+        return self._consulta(f"SELECT {', '.join(COLS_ASISTENCIA)} FROM asistencia ORDER BY id", columnas=columnas_esperadas)
+
+    def reportados(self, dia):
+        """Resuelto solo con el índice (Fecha, Equipo, Cedula, Nombre): no toca la tabla ni otros días."""
+        return self._consulta("SELECT DISTINCT Equipo, Cedula, Nombre FROM asistencia WHERE Fecha = ?",
+                              (str(dia),), CLAVES_REPORTADOS[1:])
+
+    def consultar_asistencia(self, desde=None, hasta=None, equipos=None, columnas_esperadas=COLS_ASISTENCIA):
+        """Filtro resuelto por los índices: solo se leen (y se tipan) las filas que coinciden."""
+        donde, parametros = self._donde(desde, hasta, equipos)
+        df = self._consulta(f"SELECT {', '.join(COLS_ASISTENCIA)} FROM asistencia {donde} ORDER BY id", parametros, columnas_esperadas)
+        return tipar_asistencia(df)[columnas_esperadas]
+
+    def describir_asistencia(self):
+        con = self._conexion()
+        n, fmin, fmax = con.execute("SELECT COUNT(*), MIN(NULLIF(Fecha, '')), MAX(Fecha) FROM asistencia").fetchone()
+        equipos = [r[0] for r in con.execute("SELECT Equipo FROM asistencia GROUP BY Equipo ORDER BY MIN(id)")]
+        return {"registros": n, "fecha_min": fmin, "fecha_max": fmax, "equipos": equipos}
+
+    def _escribir_lote(self, df):
+        df = asignar_registros(df)
+        with self._conexion() as con:
+            self._insertar(con, "asistencia", df, COLS_ASISTENCIA)
+            self._sumar_resumen(con, df[COLS_ASISTENCIA])
+            self._incrementar(con, 'version_asistencia')
+
+    def pagina_asistencia(self, desde=None, hasta=None, equipos=None, contiene=None, inicio=0, filas=100):
+        """Una página del historial (texto) y el total que cumple el filtro; LIMIT/OFFSET sobre los índices."""
+        donde, parametros = self._donde(desde, hasta, equipos, contiene=contiene)
+        total = self._conexion().execute(f"SELECT COUNT(*) FROM asistencia {donde}", parametros).fetchone()[0]
+        df = self._consulta(f"SELECT {', '.join(COLS_ASISTENCIA)} FROM asistencia {donde} ORDER BY id LIMIT ? OFFSET ?",
+                            parametros + [filas, inicio], COLS_ASISTENCIA)
+        return df, total
+
+    def iterar_asistencia(self, desde=None, hasta=None, equipos=None, filas=50_000):
+        """El filtro del dashboard por bloques de texto, para exportar sin materializar el resultado."""
+        donde, parametros = self._donde(desde, hasta, equipos)
+        sql = f"SELECT {', '.join(COLS_ASISTENCIA)} FROM asistencia {donde} ORDER BY id"
+        for df in pd.read_sql_query(sql, self._conexion(), params=parametros, dtype=str, chunksize=filas): yield df.fillna("")
+
+    def consultar_resumen(self, desde=None, hasta=None, equipos=None, nombre=None, por_nombre=False):
+        donde, parametros = self._donde(desde, hasta, equipos, nombre)
+        columnas = ", ".join(CLAVES_RESUMEN[por_nombre] + ["Cantidad"])
+        df = pd.read_sql_query(f"SELECT {columnas} FROM {TABLAS_RESUMEN[por_nombre]} {donde}", self._conexion(), params=parametros)
+        return df.fillna("")
+
+    def agregar_asistencia(self, df):
+        """Los lotes simultáneos de varias sesiones comparten una única transacción."""
+        self._commit.enviar(df)
+
+    def modificar_asistencia(self, df_editados, registros_borrados):
+        """UPDATE/DELETE por Registro en una transacción; el resumen resta las filas anteriores y suma las nuevas."""
+        registros = list(set(df_editados['Registro']) | set(registros_borrados))
+        con = self._conexion()
+        con.execute("BEGIN IMMEDIATE")
+        with con:
+            partes = [pd.read_sql_query(f"SELECT {', '.join(COLS_ASISTENCIA)} FROM asistencia WHERE Registro IN ({', '.join('?' * len(lote))})",
+                                        con, params=lote, dtype=str).fillna("")
+                      for lote in (registros[i:i + 500] for i in range(0, len(registros), 500))]
+            actual = pd.concat(partes, ignore_index=True) if partes else pd.DataFrame(columns=COLS_ASISTENCIA)
+            cambios = operaciones_cambio(actual, df_editados, registros_borrados)
+            if cambios.empty: return 0
+            antes, despues = cambios[cambios['Operacion'] == "-"], cambios[cambios['Operacion'] == "+"]
+            self._sumar_resumen(con, antes[COLS_ASISTENCIA], signo=-1)
+            borrados = set(antes['Registro']) - set(despues['Registro'])
+            con.executemany("DELETE FROM asistencia WHERE Registro = ?", [(r,) for r in borrados])
+            columnas = [c for c in COLS_ASISTENCIA if c != 'Registro']
+            con.executemany(f"UPDATE asistencia SET {', '.join(f'{c} = ?' for c in columnas)} WHERE Registro = ?",
+                            despues[columnas + ['Registro']].fillna("").astype(str).itertuples(index=False, name=None))
+            self._sumar_resumen(con, despues[COLS_ASISTENCIA])
+            self._incrementar(con, 'version_asistencia')
+        return cambios['Registro'].nunique()
+
+    def _respaldar_y_reemplazar(self, tabla, df, columnas, clave, donde=""):
+        with self._conexion() as con:
+            con.execute(f"DELETE FROM {tabla}_bak")
+            con.execute(f"INSERT INTO {tabla}_bak SELECT * FROM {tabla}")
+            con.execute(f"DELETE FROM {tabla} {donde[0] if donde else ''}", donde[1] if donde else ())
+            if df is not None: self._insertar(con, tabla, df, columnas)
+            if tabla == "asistencia": self._recalcular_resumen(con)
+            self._incrementar(con, clave)
+
+    def reemplazar_asistencia(self, df):
+        self._respaldar_y_reemplazar("asistencia", asignar_registros(df), COLS_ASISTENCIA, 'version_asistencia')
+
+    def borrar_asistencia(self):
+        self._respaldar_y_reemplazar("asistencia", None, COLS_ASISTENCIA, 'version_asistencia')
+
+    def _restaurar(self, tabla, clave):
+        con = self._conexion()
+        if con.execute(f"SELECT COUNT(*) FROM {tabla}_bak").fetchone()[0] == 0: return False
+        with con:
+            con.execute(f"DELETE FROM {tabla}")
+            con.execute(f"INSERT INTO {tabla} SELECT * FROM {tabla}_bak")
+            if tabla == "asistencia": self._recalcular_resumen(con)
+            self._incrementar(con, clave)
+        return True
+
+    def restaurar_asistencia(self):
+        return self._restaurar("asistencia", 'version_asistencia')
+
+    def cargar_empleados(self):
+        return self._consulta(f"SELECT {', '.join(COLS_EMPLEADOS)} FROM empleados ORDER BY rowid", columnas=COLS_EMPLEADOS)
+
+    def reemplazar_equipo(self, equipo, df_nuevo):
+        self._respaldar_y_reemplazar("empleados", df_nuevo, COLS_EMPLEADOS, 'version_empleados',
+                                     donde=("WHERE Equipo = ?", (equipo,)))
+
+    def restaurar_empleados(self):
+        return self._restaurar("empleados", 'version_empleados')
+
+    def reparar(self, completa=False):
+        """
+        quick_check de SQLite (integrity_check con `completa`). Si falla, se rehacen los índices, que es
+        donde suele estar el daño; lo que siga dañado se informa. Devuelve (reparados, dañados).
+        """
+        con, nombre = self._conexion(), os.path.basename(self.ruta)
+        def sana(): return con.execute("PRAGMA integrity_check" if completa else "PRAGMA quick_check").fetchone()[0] == "ok"
+        if sana(): return [], []
+        con.execute("REINDEX")
+        return ([nombre], []) if sana() else ([], [nombre])
+
+    def importar(self, df_asistencia, df_empleados):
+        """Carga inicial: reemplaza ambas tablas en una sola transacción."""
+        with self._conexion() as con:
+            con.execute("DELETE FROM asistencia")
+            con.execute("DELETE FROM empleados")
+            self._insertar(con, "asistencia", asignar_registros(garantizar_columnas(df_asistencia, COLS_ASISTENCIA)), COLS_ASISTENCIA)
+            self._insertar(con, "empleados", garantizar_columnas(df_empleados, COLS_EMPLEADOS), COLS_EMPLEADOS)
+            self._recalcular_resumen(con)
+            self._incrementar(con, 'version_asistencia')
+            self._incrementar(con, 'version_empleados')
+
+# --- 4. BACKEND PARQUET (PARTICIONES POR MES) ---
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as pa_ds
+    import pyarrow.parquet as pq
+    ESQUEMA_PARQUET = pa.schema([(c, pa.string()) for c in COLS_ASISTENCIA])
+except ImportError:
+    pa = None
+
+SIN_FECHA = "sin-fecha"  # partición de los registros cuya fecha no es YYYY-MM-DD
+MAX_ARCHIVOS_PARTICION = 20
+
+def particion_mes(fechas):
+    """'YYYY-MM' de cada fecha ISO; las ilegibles van juntas a su propia partición."""
+    fechas = fechas.fillna("").astype(str)
+    return fechas.str.slice(0, 7).where(fechas.str.fullmatch(r"\d{4}-\d{2}-\d{2}"), SIN_FECHA)
+
+def escribir_parquet_durable(df, archivo):
+    """Todas las columnas como texto, igual que el CSV: el tipado se hace al leer (`esquema.py`)."""
+    tabla = pa.Table.from_pandas(df[COLS_ASISTENCIA].fillna("").astype(str), schema=ESQUEMA_PARQUET, preserve_index=False)
+    with medir("escribir_parquet"):
+        pq.write_table(tabla, archivo, compression="zstd")
+        with open(archivo, 'rb') as f: os.fsync(f.fileno())
+        contar(filas_escritas=tabla.num_rows, bytes_escritos=os.path.getsize(archivo))
+
+def escribir_parquet_atomico(df, archivo):
+    tmp = ruta_temporal(archivo)
+    escribir_parquet_durable(df, tmp)
+    os.replace(tmp, archivo)
+
+def tabla_a_pandas(tabla, categoricas=()):
+    """Arrow -> pandas; las columnas repetitivas llegan ya como Categorical, sin un str por fila."""
+    for col in categoricas:
+        if col in tabla.column_names:
+            tabla = tabla.set_column(tabla.column_names.index(col), col, pc.dictionary_encode(tabla[col]))
+    return tabla.to_pandas()
+
+class AlmacenParquet(EmpleadosCSV):
+    """
+    Asistencia en Parquet particionado por mes (y opcionalmente por equipo); empleados en CSV.
+
+        <carpeta>/mes=2026-01[/equipo=<nombre>]/<timestamp>_<uuid>.parquet
+
+    Cada lote guardado es un archivo inmutable nuevo dentro de su partición; cuando una
+    partición acumula muchos, se compacta solo esa. Las consultas descartan particiones por
+    la ruta y el lector de Parquet aplica el resto del filtro con las estadísticas de cada
+    archivo, leyendo únicamente las columnas pedidas.
+    """
+    consultas_indexadas = True
+
+    def __init__(self, carpeta, archivo_empleados):
+        if pa is None: raise ImportError("El almacén Parquet necesita pyarrow (pip install pyarrow).")
+        super().__init__(archivo_empleados)
+        self.carpeta = carpeta
+        self.carpeta_nueva = f"{carpeta}.nuevo"
+        self.carpeta_backup = f"{carpeta}.bak"
+        self.marca_compactacion = os.path.join(carpeta, "_compactando.json")
+        self.archivo_formato = os.path.join(carpeta, "_particion.json")
+        self._commit = CommitAgrupado(self._escribir_lote)
+        # Conteos por archivo: los archivos no cambian nunca, así que se calculan una sola vez
+        self._resumenes = {}
+        self._lock_resumenes = threading.Lock()
+
+    def preparar(self):
+        self.preparar_empleados()
+        with bloqueo_archivo(self.carpeta):
+            # Reemplazo completo interrumpido: la carpeta nueva solo vale si llegó a marcarse como lista
+            if os.path.isdir(self.carpeta_nueva):
+                if not os.path.isdir(self.carpeta) and os.path.exists(os.path.join(self.carpeta_nueva, "_listo")):
+                    os.rename(self.carpeta_nueva, self.carpeta)
+                else: shutil.rmtree(self.carpeta_nueva, ignore_errors=True)
+            os.makedirs(self.carpeta, exist_ok=True)
+            try: self.finalizar_compactacion()
+            except: pass
+            if not self.formato().get("registro"):
+                if self.listar_archivos():  # historial anterior a la columna Registro: se numera una vez
+                    self._publicar(self.cargar_asistencia(), respaldar=False)
+                else: self._guardar_formato(self.carpeta, self.por_equipo())
+        for raiz, _, nombres in os.walk(self.carpeta):
+            for n in nombres:
+                ruta = os.path.join(raiz, n)
+                try:
+                    if n.endswith('.tmp') and time_mod.time() - os.path.getmtime(ruta) > 3600: os.remove(ruta)
+                except OSError: pass
+
+    # Particiones
+
+    def formato(self):
+        try:
+            with open(self.archivo_formato, 'r') as f: return json.load(f)
+        except: return {}
+
+    def por_equipo(self):
+        return bool(self.formato().get("por_equipo"))
+
+    @staticmethod
+    def _guardar_formato(carpeta, por_equipo):
+        with open(os.path.join(carpeta, "_particion.json"), 'w') as f: json.dump({"por_equipo": por_equipo, "registro": True}, f)
+
+    @staticmethod
+    def _particiones(df, por_equipo):
+        """Agrupa filas por carpeta de partición: mes=YYYY-MM[/equipo=<nombre codificado>]."""
+        claves = "mes=" + particion_mes(df['Fecha'])
+        if por_equipo: claves = claves + os.sep + "equipo=" + df['Equipo'].fillna("").astype(str).map(lambda e: quote(e, safe=""))
+        return df.groupby(claves, sort=True)
+
+    @staticmethod
+    def _claves_particion(archivo):
+        return dict(p.split("=", 1) for p in archivo.split(os.sep)[:-1] if "=" in p)
+
+    @classmethod
+    def _podar(cls, archivos, desde=None, hasta=None, equipos=None):
+        """Descarta por la ruta los archivos que no pueden contener filas del rango o de los equipos."""
+        mes_desde = str(desde)[:7] if desde else None
+        mes_hasta = str(hasta)[:7] if hasta else None
+        equipos = {quote(str(e), safe="") for e in equipos} if equipos else None
+        elegidos = []
+        for archivo in archivos:
+            claves = cls._claves_particion(archivo)
+            mes = claves.get("mes", SIN_FECHA)
+            if mes == SIN_FECHA and (desde or hasta): continue
+            if mes_desde and mes < mes_desde: continue
+            if mes_hasta and mes > mes_hasta: continue
+            if equipos is not None and "equipo" in claves and claves["equipo"] not in equipos: continue
+            elegidos.append(archivo)
+        return elegidos
+
+    @staticmethod
+    def _filtro(desde=None, hasta=None, equipos=None, contiene=None):
+        """Predicado que el lector empuja hasta los row groups (min/max de Fecha y Equipo)."""
+        condiciones = []
+        if desde: condiciones.append(pa_ds.field("Fecha") >= str(desde))
+        if hasta: condiciones.append(pa_ds.field("Fecha") <= str(hasta))
+        if equipos: condiciones.append(pa_ds.field("Equipo").isin([str(e) for e in equipos]))
+        if contiene: condiciones.append(pc.match_substring(pc.utf8_lower(pa_ds.field("Nombre")), plegar(contiene)))
+        filtro = None
+        for c in condiciones: filtro = c if filtro is None else filtro & c
+        return filtro
+
+    # Archivos y compactación
+
+    def listar_archivos(self):
+        """Archivos de datos (rutas relativas), en orden de partición y de escritura."""
+        archivos = []
+        for raiz, dirs, nombres in os.walk(self.carpeta):
+            dirs.sort()
+            archivos += [os.path.relpath(os.path.join(raiz, n), self.carpeta) for n in sorted(nombres) if n.endswith('.parquet')]
+        return archivos
+
+    def leer_marca_compactacion(self):
+        if not os.path.exists(self.marca_compactacion): return None
+        try:
+            with open(self.marca_compactacion, 'r') as f: marca = json.load(f)
+            marca["retirados"] = set(marca["retirados"])
+            return marca
+        except: return None
+
+    def archivos_vigentes(self):
+        """
+        Con una sustitución confirmada pero a medio aplicar, ya cuentan los archivos nuevos
+        (aún con nombre temporal si no se han renombrado) y no los que reemplazan.
+        """
+        archivos = self.listar_archivos()
+        marca = self.leer_marca_compactacion()
+        if marca is None: return archivos
+        archivos = [a for a in archivos if a not in marca["retirados"]]
+        archivos += [temporal for temporal, final in marca["publicar"] if final not in archivos]
+        return sorted(archivos)
+
+    def finalizar_compactacion(self):
+        """Idempotente, como en el diario CSV: con marca se publican los archivos nuevos y se borran los sustituidos."""
+        marca = self.leer_marca_compactacion()
+        if marca is None: return
+        for temporal, final in marca["publicar"]:
+            temporal = os.path.join(self.carpeta, temporal)
+            if os.path.exists(temporal): os.replace(temporal, os.path.join(self.carpeta, final))
+        for archivo in marca["retirados"]:
+            try: os.remove(os.path.join(self.carpeta, archivo))
+            except FileNotFoundError: pass
+        os.remove(self.marca_compactacion)
+
+    def _sustituir(self, df, retirados, ordenar=False):
+        """
+        Reescribe las filas de `retirados` (ya modificadas en `df`) como archivos nuevos de sus particiones
+        y los publica de una vez a través de la marca. Requiere el bloqueo.
+        """
+        publicar = []
+        if ordenar and not df.empty: df = df.sort_values(["Fecha", "Equipo"], kind="stable")
+        for particion, grupo in self._particiones(df, self.por_equipo()):
+            os.makedirs(os.path.join(self.carpeta, particion), exist_ok=True)
+            final = os.path.join(particion, f"{time_mod.time_ns():020d}_{uuid.uuid4().hex[:8]}.parquet")
+            temporal = ruta_temporal(os.path.join(self.carpeta, final))
+            escribir_parquet_durable(grupo, temporal)
+            publicar.append([os.path.relpath(temporal, self.carpeta), final])
+        tmp = ruta_temporal(self.marca_compactacion)
+        with open(tmp, 'w') as f:
+            json.dump({"publicar": publicar, "retirados": list(retirados)}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self.marca_compactacion)  # punto de confirmación
+        self.finalizar_compactacion()
+
+    def compactar_particion(self, particion):
+        """Reúne los archivos de una partición en uno, ordenado por fecha (row groups más selectivos). Requiere el bloqueo."""
+        archivos = [a for a in self.listar_archivos() if os.path.dirname(a) == particion]
+        if len(archivos) < 2: return
+        self._sustituir(self._leer_tabla(archivos, COLS_ASISTENCIA).to_pandas(), archivos, ordenar=True)
+
+    def _escribir_carpeta(self, df, carpeta, por_equipo):
+        """Historial completo en una carpeta nueva: un archivo por partición y `_listo` al final."""
+        os.makedirs(carpeta)
+        self._guardar_formato(carpeta, por_equipo)
+        df = df.sort_values(["Fecha", "Equipo"], kind="stable") if not df.empty else df
+        for particion, grupo in self._particiones(df, por_equipo):
+            os.makedirs(os.path.join(carpeta, particion), exist_ok=True)
+            escribir_parquet_durable(grupo, os.path.join(carpeta, particion, f"{time_mod.time_ns():020d}_{uuid.uuid4().hex[:8]}.parquet"))
+        with open(os.path.join(carpeta, "_listo"), 'w') as f:
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _publicar(self, df=None, respaldar=True, por_equipo=None, desde_backup=False):
+        """
+        Sustituye la carpeta entera: se prepara al lado y se intercambia con renames bajo el bloqueo.
+        Con `respaldar`, la carpeta anterior pasa a ser el .bak.
+        """
+        with bloqueo_archivo(self.carpeta):
+            self.finalizar_compactacion()
+            if por_equipo is None: por_equipo = self.por_equipo()
+            shutil.rmtree(self.carpeta_nueva, ignore_errors=True)
+            if desde_backup:
+                shutil.copytree(self.carpeta_backup, self.carpeta_nueva)
+                open(os.path.join(self.carpeta_nueva, "_listo"), 'w').close()
+            else: self._escribir_carpeta(asignar_registros(garantizar_columnas(df, COLS_ASISTENCIA)), self.carpeta_nueva, por_equipo)
+            if respaldar and os.path.isdir(self.carpeta):
+                shutil.rmtree(self.carpeta_backup, ignore_errors=True)
+                os.rename(self.carpeta, self.carpeta_backup)
+            else: shutil.rmtree(self.carpeta, ignore_errors=True)
+            os.rename(self.carpeta_nueva, self.carpeta)
+
+    # Lecturas
+
+    def _leer_tabla(self, archivos, columnas, filtro=None):
+        if not archivos: return ESQUEMA_PARQUET.empty_table().select(columnas)
+        with medir("leer_parquet"):
+            dataset = pa_ds.dataset([os.path.join(self.carpeta, a) for a in archivos], schema=ESQUEMA_PARQUET, format="parquet")
+            tabla = dataset.to_table(columns=columnas, filter=filtro)
+            contar(filas_leidas=tabla.num_rows, bytes_leidos=tabla.nbytes)
+        return tabla
+
+    def _con_reintentos(self, leer):
+        """Lectura sin bloqueo; si una compactación o un reemplazo la cruzan, se repite (la última vez, bajo bloqueo)."""
+        for _ in range(3):
+            firma = self.firma_asistencia()
+            try:
+                valor = leer(self.archivos_vigentes())
+                if self.firma_asistencia() == firma: return valor
+            except OSError: pass
+        with bloqueo_archivo(self.carpeta): return leer(self.archivos_vigentes())
+
+    def _resumen_archivo(self, archivo, por_nombre):
+        clave = (archivo, por_nombre)
+        with self._lock_resumenes: df = self._resumenes.get(clave)
+        if df is None:
+            df = resumir(pq.read_table(os.path.join(self.carpeta, archivo), columns=CLAVES_RESUMEN[por_nombre]).to_pandas(), por_nombre)
+            with self._lock_resumenes: self._resumenes[clave] = df
+        return df
+
+    def _reportados_archivo(self, archivo):
+        clave = (archivo, "reportados")
+        with self._lock_resumenes: indice = self._resumenes.get(clave)
+        if indice is None:
+            indice = indice_reportados(pq.read_table(os.path.join(self.carpeta, archivo), columns=CLAVES_REPORTADOS).to_pandas())
+            with self._lock_resumenes: self._resumenes[clave] = indice
+        return indice
+
+    def _olvidar_resumenes(self, archivos):
+        vigentes = set(archivos)
+        with self._lock_resumenes:
+            for clave in [c for c in self._resumenes if c[0] not in vigentes]: del self._resumenes[clave]
+
+    # Interfaz común
+
+    def firma_asistencia(self):
+        """Los nombres de archivo son únicos e inmutables: el listado basta como firma."""
+        return ("parquet", self.carpeta, firma_archivo(self.marca_compactacion), tuple(self.listar_archivos()))
+
+    def cargar_asistencia(self, columnas_esperadas=COLS_ASISTENCIA):
+        df = self._con_reintentos(lambda archivos: self._leer_tabla(archivos, COLS_ASISTENCIA).to_pandas())
+        return garantizar_columnas(df, columnas_esperadas)
+
+    def consultar_asistencia(self, desde=None, hasta=None, equipos=None, columnas_esperadas=COLS_ASISTENCIA):
+        """Solo se abren las particiones del rango y equipos pedidos, y de ellas solo las columnas necesarias."""
+        columnas = [c for c in COLS_ASISTENCIA if c in columnas_esperadas]
+        filtro = self._filtro(desde, hasta, equipos)
+        tabla = self._con_reintentos(lambda archivos: self._leer_tabla(self._podar(archivos, desde, hasta, equipos), columnas, filtro))
+        df = garantizar_columnas(tabla_a_pandas(tabla, COLS_CATEGORICAS + ["Estado"]), columnas_esperadas)
+        return tipar_asistencia(df)[columnas_esperadas]
+
+    def pagina_asistencia(self, desde=None, hasta=None, equipos=None, contiene=None, inicio=0, filas=100):
+        """Una página del historial (texto) y el total que cumple el filtro; solo se materializa la página."""
+        filtro = self._filtro(desde, hasta, equipos, contiene)
+        tabla = self._con_reintentos(lambda archivos: self._leer_tabla(self._podar(archivos, desde, hasta, equipos), COLS_ASISTENCIA, filtro))
+        return tabla.slice(inicio, filas).to_pandas(), tabla.num_rows
+
+    def iterar_asistencia(self, desde=None, hasta=None, equipos=None, filas=50_000):
+        """El filtro del dashboard por bloques de texto (record batches), para exportar sin materializar el resultado."""
+        archivos = self._podar(self.archivos_vigentes(), desde, hasta, equipos)
+        if not archivos: return
+        dataset = pa_ds.dataset([os.path.join(self.carpeta, a) for a in archivos], schema=ESQUEMA_PARQUET, format="parquet")
+        for lote in dataset.to_batches(columns=COLS_ASISTENCIA, filter=self._filtro(desde, hasta, equipos), batch_size=filas):
+            if lote.num_rows: yield lote.to_pandas()
+
+    def consultar_resumen(self, desde=None, hasta=None, equipos=None, nombre=None, por_nombre=False):
+        """Suma los conteos de los archivos de las particiones pedidas; un lote nuevo solo añade el suyo."""
+        def leer(archivos):
+            self._olvidar_resumenes(archivos)
+            return sumar_resumenes([self._resumen_archivo(a, por_nombre) for a in self._podar(archivos, desde, hasta, equipos)], por_nombre)
+        return filtrar_asistencia(self._con_reintentos(leer), desde, hasta, equipos, nombre).copy()
+
+    def describir_asistencia(self):
+        return describir_df(self.consultar_resumen())
+
+    def reportados(self, dia):
+        """Índice por archivo de la partición del mes, como los resúmenes: un lote nuevo solo añade el suyo."""
+        def leer(archivos):
+            self._olvidar_resumenes(archivos)
+            return sumar_reportados([self._reportados_archivo(a).get(str(dia)) for a in self._podar(archivos, dia, dia)])
+        return self._con_reintentos(leer)
+
+    def _escribir_lote(self, df):
+        # Bajo bloqueo: un reemplazo completo no puede mover la carpeta mientras se anexa
+        df = asignar_registros(df)
+        with bloqueo_archivo(self.carpeta):
+            for particion, grupo in self._particiones(df, self.por_equipo()):
+                carpeta = os.path.join(self.carpeta, particion)
+                os.makedirs(carpeta, exist_ok=True)
+                escribir_parquet_atomico(grupo, os.path.join(carpeta, f"{time_mod.time_ns():020d}_{uuid.uuid4().hex[:8]}.parquet"))
+                if sum(n.endswith('.parquet') for n in os.listdir(carpeta)) >= MAX_ARCHIVOS_PARTICION:
+                    self.compactar_particion(particion)
+
+    def agregar_asistencia(self, df):
+        """Cada lote es un archivo nuevo en su partición; los lotes simultáneos se agrupan."""
+        self._commit.enviar(df)
+
+    def modificar_asistencia(self, df_editados, registros_borrados):
+        """Solo se reescriben los archivos que contienen los registros tocados, no el historial."""
+        registros = pa.array(list(set(df_editados['Registro']) | set(registros_borrados)), pa.string())
+        with bloqueo_archivo(self.carpeta):
+            self.finalizar_compactacion()
+            archivos = [a for a in self.listar_archivos()
+                        if pc.any(pc.is_in(pq.read_table(os.path.join(self.carpeta, a), columns=["Registro"])["Registro"], value_set=registros)).as_py()]
+            actual = self._leer_tabla(archivos, COLS_ASISTENCIA).to_pandas()
+            cambios = operaciones_cambio(actual, df_editados, registros_borrados)
+            if cambios.empty: return 0
+            self._sustituir(aplicar_cambios(actual, cambios), archivos)
+        return cambios['Registro'].nunique()
+
+    def reemplazar_asistencia(self, df):
+        self._publicar(df)
+
+    def borrar_asistencia(self):
+        self._publicar(pd.DataFrame(columns=COLS_ASISTENCIA))
+
+    def restaurar_asistencia(self):
+        with bloqueo_archivo(self.carpeta):
+            if not os.path.isdir(self.carpeta_backup): return False
+            self._publicar(respaldar=False, desde_backup=True)
+            return True
+
+    def reparar(self, completa=False):
+        """
+        Empleados contra su suma. De cada archivo Parquet se lee el pie (metadatos y estadísticas):
+        uno truncado o ilegible se informa como dañado; para volver atrás está el .bak de la carpeta.
+        """
+        reparados, danados = self.reparar_empleados(completa)
+        with bloqueo_archivo(self.carpeta):
+            self.finalizar_compactacion()
+            for archivo in self.listar_archivos():
+                try: pq.read_metadata(os.path.join(self.carpeta, archivo))
+                except (OSError, pa.ArrowException): danados.append(archivo)
+        return reparados, danados
+
+    def importar(self, df_asistencia, por_equipo=False):
+        """Carga inicial desde otro almacén; no deja .bak."""
+        self._publicar(df_asistencia, respaldar=False, por_equipo=por_equipo)
+
+# --- 5. SELECCIÓN Y MIGRACIÓN ---
+
+def crear_almacen(tipo, archivo_asistencia, archivo_empleados, archivo_sqlite, carpeta_parquet):
+    if tipo == "sqlite": return AlmacenSQLite(archivo_sqlite)
+    if tipo == "parquet": return AlmacenParquet(carpeta_parquet, archivo_empleados)
+    return AlmacenCSV(archivo_asistencia, archivo_empleados)
+
+def migrar_csv_a_sqlite(archivo_asistencia, archivo_empleados, archivo_sqlite):
+    """Copia de una sola vez el historial (base + diario) y los empleados a SQLite."""
+    origen = AlmacenCSV(archivo_asistencia, archivo_empleados)
+    destino = AlmacenSQLite(archivo_sqlite)
+    df_asistencia = origen.cargar_asistencia()
+    df_empleados = origen.cargar_empleados()
+    destino.importar(df_asistencia, df_empleados)
+    return len(df_asistencia), len(df_empleados)
+
+def convertir_csv_a_parquet(archivo_asistencia, archivo_empleados, carpeta_parquet, por_equipo=False):
+    """Vuelca el historial CSV (base + diario) a Parquet particionado. Los empleados siguen en su CSV."""
+    df_asistencia = AlmacenCSV(archivo_asistencia, archivo_empleados).cargar_asistencia()
+    AlmacenParquet(carpeta_parquet, archivo_empleados).importar(df_asistencia, por_equipo)
+    return len(df_asistencia)
+
+if __name__ == "__main__":
+    import argparse
+    from datos import ARCHIVO_ASISTENCIA, ARCHIVO_EMPLEADOS, ARCHIVO_SQLITE, CARPETA_PARQUET
+
+    parser = argparse.ArgumentParser(description="Herramientas de almacenamiento de asistencia.")
+    sub = parser.add_subparsers(dest="comando", required=True)
+    p_migrar = sub.add_parser("migrar", help="Migra los CSV actuales a SQLite.")
+    p_migrar.add_argument("--asistencia", default=ARCHIVO_ASISTENCIA)
+    p_migrar.add_argument("--empleados", default=ARCHIVO_EMPLEADOS)
+    p_migrar.add_argument("--db", default=ARCHIVO_SQLITE)
+    p_convertir = sub.add_parser("convertir", help="Convierte el historial CSV a Parquet particionado por mes.")
+    p_convertir.add_argument("--asistencia", default=ARCHIVO_ASISTENCIA)
+    p_convertir.add_argument("--empleados", default=ARCHIVO_EMPLEADOS)
+    p_convertir.add_argument("--carpeta", default=CARPETA_PARQUET)
+    p_convertir.add_argument("--por-equipo", action="store_true", help="Particiona también por equipo.")
+    p_verificar = sub.add_parser("verificar", help="Comprueba las sumas de todos los archivos y repone los dañados desde su respaldo.")
+    p_verificar.add_argument("--almacen", default=os.environ.get("ASISTENCIA_ALMACEN", "csv"))
+    args = parser.parse_args()
+
+    if args.comando == "migrar":
+        n_asis, n_emp = migrar_csv_a_sqlite(args.asistencia, args.empleados, args.db)
+        print(f"✅ Migrados {n_asis} registros de asistencia y {n_emp} empleados a {args.db}")
+    elif args.comando == "convertir":
+        n_asis = convertir_csv_a_parquet(args.asistencia, args.empleados, args.carpeta, args.por_equipo)
+        print(f"✅ Convertidos {n_asis} registros de asistencia a {args.carpeta}")
+    elif args.comando == "verificar":
+        reparados, danados = crear_almacen(args.almacen, ARCHIVO_ASISTENCIA, ARCHIVO_EMPLEADOS, ARCHIVO_SQLITE, CARPETA_PARQUET).reparar(completa=True)
+        for nombre in reparados: print(f"🔧 Reparado desde su respaldo: {nombre}")
+        for nombre in danados: print(f"❌ Dañado y sin respaldo válido: {nombre}")
+        if not reparados and not danados: print("✅ Todos los archivos coinciden con su suma")
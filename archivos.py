@@ -0,0 +1,92 @@
+"""
+Primitivas sobre archivos sin dependencias pesadas (ni pandas ni numpy): carpeta de datos,
+bloqueo entre procesos, firma, temporales y la caché de proceso por firma.
+
+Viven aparte para que la pantalla de ingreso (`configuracion.py`) pueda usarlas sin cargar
+la capa de datos; `almacen.py` y `datos.py` las importan de aquí.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+# Carpeta de datos: la de trabajo, o ASISTENCIA_DATOS si varios procesos comparten una (ver datos.py)
+CARPETA_DATOS = os.environ.get("ASISTENCIA_DATOS", "")
+
+def en_datos(nombre):
+    return os.path.join(CARPETA_DATOS, nombre)
+
+# --- BLOQUEO ENTRE PROCESOS ---
+try:
+    import fcntl
+    def _bloquear(f): fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    def _desbloquear(f): fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+except ImportError:
+    import msvcrt
+    def _bloquear(f):
+        while True:
+            try: return msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+            except OSError: pass  # LK_LOCK se rinde tras ~10 s; seguimos esperando
+    def _desbloquear(f):
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+_BLOQUEOS = {}
+_PROFUNDIDAD = {}
+_LOCK_REGISTRO = threading.Lock()
+
+@contextmanager
+def bloqueo_archivo(archivo):
+    """
+    Exclusión mutua sobre `archivo` entre procesos (flock/msvcrt sobre `archivo.lock`)
+    y entre hilos del mismo proceso. Es reentrante para el hilo que ya lo tiene.
+    """
+    ruta = os.path.abspath(f"{archivo}.lock")
+    with _LOCK_REGISTRO: rlock = _BLOQUEOS.setdefault(ruta, threading.RLock())
+    with rlock:
+        if _PROFUNDIDAD.get(ruta):
+            _PROFUNDIDAD[ruta] += 1
+            try: yield
+            finally: _PROFUNDIDAD[ruta] -= 1
+            return
+        with open(ruta, 'a+') as f:
+            _bloquear(f)
+            _PROFUNDIDAD[ruta] = 1
+            try: yield
+            finally:
+                _PROFUNDIDAD[ruta] = 0
+                _desbloquear(f)
+
+def firma_archivo(archivo):
+    """
+    Huella barata de un archivo: cambia con cualquier escritura. El inodo cubre los reemplazos
+    (os.replace) que otro proceso hace en el mismo instante y con el mismo tamaño, algo que en
+    una carpeta compartida con mtime de poca resolución sí ocurre.
+    """
+    try:
+        info = os.stat(archivo)
+        return (info.st_mtime_ns, info.st_size, info.st_ino)
+    except OSError: return None
+
+def ruta_temporal(archivo):
+    """Temporal único por proceso e hilo, en el mismo directorio (os.replace es atómico ahí)."""
+    return f"{archivo}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+# --- CACHÉ DE PROCESO ---
+
+_CACHE = {}
+_LOCK_CACHE = threading.Lock()
+
+def desde_cache(clave, firma, cargar):
+    """Devuelve el valor cacheado si la firma coincide; si no, lo recalcula con `cargar`."""
+    with _LOCK_CACHE: entrada = _CACHE.get(clave)
+    if entrada is not None and entrada[0] == firma: return entrada[1]
+    valor = cargar()
+    with _LOCK_CACHE: _CACHE[clave] = (firma, valor)
+    return valor
+
+def invalidar_cache(archivo=None):
+    """Descarta las entradas de un archivo (o todas) tras escribir en él."""
+    with _LOCK_CACHE:
+        if archivo is None: _CACHE.clear()
+        else:
+            for clave in [c for c in _CACHE if c[1] == archivo]: del _CACHE[clave]
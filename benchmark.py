@@ -0,0 +1,285 @@
+"""
+Benchmark de las operaciones principales de la app.
+
+Genera datos sintéticos (equipos x empleados x días), los carga en cada almacén y mide,
+en un proceso aparte por combinación, la latencia (p50/p95/p99/máx) y el pico de memoria
+de cada operación, con la caché de proceso fría o caliente. Con varios tamaños de --dias
+imprime además la curva de escalado de cada operación.
+
+    python benchmark.py --equipos 5 --empleados 50 --dias 30,180,365
+    python benchmark.py --almacen csv,sqlite --repeticiones 50 --salida bench.csv
+    python benchmark.py --sin-apptest        # sin el rerun completo de la interfaz
+    python benchmark.py --arranque           # arranque en frío y tiempo hasta el ingreso
+
+El pico de memoria es el de tracemalloc (pandas/numpy); las lecturas de Arrow reservan
+fuera de su alcance, así que en Parquet es una cota inferior.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import secrets
+import sys
+import tempfile
+import time
+import tracemalloc
+import uuid
+from datetime import date, timedelta
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+ESTADOS_PESOS = {"Asiste": 0.86, "Llegada tarde": 0.06, "Ausente": 0.04, "Incapacidad": 0.02, "Vacaciones": 0.02}
+
+# --- 1. DATOS SINTÉTICOS ---
+
+def generar_datos(carpeta, equipos, empleados, dias, semilla=7):
+    """Base de empleados + historial de `dias` días hasta ayer (hoy queda pendiente para la alerta)."""
+    import numpy as np
+    import pandas as pd
+    from esquema import COLS_ASISTENCIA
+
+    rng = np.random.default_rng(semilla)
+    nombres_eq = [f"Equipo {e + 1}" for e in range(equipos)]
+    df_emp = pd.DataFrame({
+        "Equipo": np.repeat(nombres_eq, empleados),
+        "Nombre": [f"Persona {e + 1}-{i + 1}" for e in range(equipos) for i in range(empleados)],
+        "Cedula": [str(10_000_000 + e * 100_000 + i) for e in range(equipos) for i in range(empleados)],
+    })
+    hoy = date.today()
+    fechas = [(hoy - timedelta(days=d)).isoformat() for d in range(dias, 0, -1)]
+    filas = len(fechas) * len(df_emp)
+    df = pd.DataFrame({
+        "Fecha": np.repeat(fechas, len(df_emp)),
+        "Equipo": np.tile(df_emp["Equipo"].to_numpy(), len(fechas)),
+        "Nombre": np.tile(df_emp["Nombre"].to_numpy(), len(fechas)),
+        "Cedula": np.tile(df_emp["Cedula"].to_numpy(), len(fechas)),
+        "Estado": rng.choice(list(ESTADOS_PESOS), size=filas, p=list(ESTADOS_PESOS.values())),
+    })
+    df = df[rng.random(filas) > 0.03].reset_index(drop=True)  # algún día sin reporte
+    df["Observacion"] = ""
+    df["Soporte"] = ""
+    df["Registro"] = [uuid.uuid4().hex for _ in range(len(df))]
+
+    os.makedirs(carpeta, exist_ok=True)
+    df_emp.to_csv(os.path.join(carpeta, "base_datos_empleados.csv"), index=False)
+    df[COLS_ASISTENCIA].to_csv(os.path.join(carpeta, "asistencia_historica.csv"), index=False)
+    return len(df), len(df_emp)
+
+# --- 2. OPERACIONES ---
+
+def operaciones(datos, equipos, empleados, apptest):
+    """(nombre, función, escribe) de cada operación medida. Las de escritura van al final."""
+    import pandas as pd
+
+    hoy = date.today().isoformat()
+    hace_30 = (date.today() - timedelta(days=30)).isoformat()
+    dos_equipos = [f"Equipo {e + 1}" for e in range(min(2, equipos))]
+    lote = pd.DataFrame({"Fecha": hoy, "Equipo": "Equipo 1", "Nombre": [f"Persona 1-{i + 1}" for i in range(empleados)],
+                         "Cedula": [str(10_000_000 + i) for i in range(empleados)], "Estado": "Asiste"})
+    plantilla = lote[["Nombre", "Cedula"]]
+
+    def alerta_pendientes(): return datos.pendientes_del_dia(hoy)
+
+    def dashboard(desde, hasta, equipos_fil):
+        def medir():
+            df = datos.consultar_asistencia(desde, hasta, equipos_fil)
+            return df, datos.consultar_resumen(desde, hasta, equipos_fil)
+        return medir
+
+    ops = [
+        ("cargar_empleados", datos.cargar_empleados, False),
+        ("cargar_asistencia", datos.cargar_asistencia, False),
+        ("alerta_pendientes", alerta_pendientes, False),
+        ("dashboard_30d_2eq", dashboard(hace_30, hoy, dos_equipos), False),
+        ("dashboard_todo", dashboard(None, None, None), False),
+        ("describir_asistencia", datos.describir_asistencia, False),
+        ("verificar_integridad", datos.ALMACEN.reparar, False),
+        ("verificar_completa", lambda: datos.ALMACEN.reparar(completa=True), False),
+    ]
+    if apptest: ops.append(("app_rerun_admin", rerun_app(), False))
+    ops += [
+        ("guardar_asistencia", lambda: datos.guardar_asistencia(lote), True),
+        ("guardar_personal", lambda: datos.guardar_personal(plantilla, "Equipo 1"), True),
+    ]
+    return ops
+
+def rerun_app():
+    """Rerun de app.py como ADMIN con AppTest (login hecho antes de medir). Solo corre la página por defecto (dashboard)."""
+    from streamlit.testing.v1 import AppTest
+    at = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=300)
+    at.run()
+    at.text_input[0].input("1234")
+    at.button[0].click()
+    at.run()
+    if at.exception: raise RuntimeError(at.exception[0].message)
+    return at.run
+
+# --- 3. MEDICIÓN ---
+
+def percentiles(tiempos):
+    import numpy as np
+    ms = np.array(tiempos) * 1000
+    return {"p50_ms": np.percentile(ms, 50), "p95_ms": np.percentile(ms, 95), "p99_ms": np.percentile(ms, 99), "max_ms": ms.max()}
+
+def medir(funcion, repeticiones, antes=None):
+    """Latencias sin tracemalloc (distorsiona los tiempos) y una pasada aparte para el pico de memoria."""
+    tiempos = []
+    for _ in range(repeticiones):
+        if antes: antes()
+        t0 = time.perf_counter()
+        funcion()
+        tiempos.append(time.perf_counter() - t0)
+    if antes: antes()
+    tracemalloc.start()
+    try:
+        funcion()
+        pico = tracemalloc.get_traced_memory()[1]
+    finally: tracemalloc.stop()
+    return {**percentiles(tiempos), "pico_mb": pico / 2 ** 20}
+
+def _trabajador(carpeta, almacen, equipos, empleados, dias, repeticiones, apptest, cola):
+    import warnings
+    warnings.filterwarnings("ignore")
+    os.chdir(carpeta)
+    os.environ["ASISTENCIA_ALMACEN"] = almacen
+    os.environ.setdefault("ASISTENCIA_CLAVE", secrets.token_hex(32))  # datos de prueba: la clave no se conserva
+    sys.path.insert(0, RAIZ)
+    import almacen as mod_almacen
+    import datos
+
+    if almacen == "sqlite": mod_almacen.migrar_csv_a_sqlite(datos.ARCHIVO_ASISTENCIA, datos.ARCHIVO_EMPLEADOS, datos.ARCHIVO_SQLITE)
+    if almacen == "parquet": mod_almacen.convertir_csv_a_parquet(datos.ARCHIVO_ASISTENCIA, datos.ARCHIVO_EMPLEADOS, datos.CARPETA_PARQUET)
+    datos.asegurar_archivos()
+
+    resultados = []
+    for nombre, funcion, escribe in operaciones(datos, equipos, empleados, apptest):
+        modos = [("-", None)] if escribe else [("fria", datos.invalidar_cache), ("caliente", None)]
+        for cache, antes in modos:
+            if cache == "caliente": funcion()  # llena la caché
+            resultados.append({"dias": dias, "almacen": almacen, "cache": cache, "operacion": nombre,
+                               "n": repeticiones, **medir(funcion, repeticiones, antes)})
+    cola.put(resultados)
+
+def ejecutar(equipos, empleados, lista_dias, almacenes, repeticiones, apptest=True):
+    ctx = multiprocessing.get_context("spawn")  # cada combinación en un proceso limpio
+    sys.path.insert(0, RAIZ)
+    resultados = []
+    for dias in lista_dias:
+        base = tempfile.mkdtemp(prefix=f"bench_asistencia_{dias}d_")
+        n_asis, n_emp = generar_datos(os.path.join(base, "origen"), equipos, empleados, dias)
+        print(f"# {dias} días: {n_asis} registros, {n_emp} empleados -> {base}", flush=True)
+        for almacen in almacenes:
+            carpeta = os.path.join(base, almacen)
+            os.makedirs(carpeta)
+            for n in ["base_datos_empleados.csv", "asistencia_historica.csv"]:
+                with open(os.path.join(base, "origen", n), 'rb') as o, open(os.path.join(carpeta, n), 'wb') as d: d.write(o.read())
+            cola = ctx.Queue()
+            p = ctx.Process(target=_trabajador, args=(carpeta, almacen, equipos, empleados, dias, repeticiones, apptest, cola))
+            p.start()
+            parcial = cola.get()
+            p.join()
+            for r in parcial: r["registros"] = n_asis
+            resultados += parcial
+            imprimir(parcial)
+    return resultados
+
+# --- 4. ARRANQUE EN FRÍO ---
+
+def _arranque(carpeta, pausa, cola):
+    """Un proceso nuevo, como el primer visitante tras reiniciar: pantalla de ingreso, ingreso como ADMIN y un rerun."""
+    import warnings
+    warnings.filterwarnings("ignore")
+    t0 = time.perf_counter()
+    from streamlit.testing.v1 import AppTest
+    os.chdir(carpeta)
+    sys.path.insert(0, RAIZ)
+    t1 = time.perf_counter()
+    at = AppTest.from_file(os.path.join(RAIZ, "app.py"), default_timeout=300)
+    at.run()
+    t2 = time.perf_counter()
+    time.sleep(pausa)  # lo que tarda la persona en escribir la contraseña
+    at.text_input[0].input("1234")
+    at.button[0].click()
+    t3 = time.perf_counter()
+    at.run()
+    t4 = time.perf_counter()
+    at.run()
+    t5 = time.perf_counter()
+    if at.exception: raise RuntimeError(at.exception[0].message)
+    cola.put({"pausa_s": pausa, "importar_streamlit_s": t1 - t0, "pantalla_ingreso_s": t2 - t1,
+              "ingreso_s": t4 - t3, "rerun_s": t5 - t4})
+
+def arranque(equipos, empleados, dias, repeticiones, pausas=(0, 2)):
+    """
+    Mediana de cada fase en procesos nuevos. Con pausa 0 el ingreso espera a que termine la
+    precarga de la capa de datos; con una pausa realista ya la encuentra hecha.
+    """
+    ctx = multiprocessing.get_context("spawn")
+    carpeta = tempfile.mkdtemp(prefix="arranque_asistencia_")
+    generar_datos(carpeta, equipos, empleados, dias)
+    print(f"# Arranque en frío ({dias} días, {equipos}x{empleados}) -> {carpeta}")
+    resultados = []
+    for pausa in pausas:
+        filas = []
+        for _ in range(repeticiones):
+            cola = ctx.Queue()
+            p = ctx.Process(target=_arranque, args=(carpeta, pausa, cola))
+            p.start()
+            filas.append(cola.get())
+            p.join()
+        mediana = {k: sorted(f[k] for f in filas)[len(filas) // 2] for k in filas[0]}
+        resultados.append(mediana)
+        print(f"  pausa {pausa:>3}s   importar streamlit {mediana['importar_streamlit_s'] * 1000:8.0f} ms"
+              f"   pantalla de ingreso {mediana['pantalla_ingreso_s'] * 1000:8.0f} ms"
+              f"   ingreso {mediana['ingreso_s'] * 1000:8.0f} ms   rerun {mediana['rerun_s'] * 1000:8.0f} ms", flush=True)
+    return resultados
+
+# --- 5. INFORME ---
+
+def imprimir(resultados):
+    for r in resultados:
+        print(f"{r['almacen']:8} {r['dias']:>5}d {r['operacion']:24} {r['cache']:9} "
+              f"p50 {r['p50_ms']:9.2f}  p95 {r['p95_ms']:9.2f}  p99 {r['p99_ms']:9.2f}  máx {r['max_ms']:9.2f} ms"
+              f"   pico {r['pico_mb']:8.2f} MB", flush=True)
+
+def imprimir_escalado(resultados):
+    """p50 de cada operación (caché caliente) según el tamaño del historial, relativo al más pequeño."""
+    tamaños = sorted({(r["dias"], r["registros"]) for r in resultados})
+    if len(tamaños) < 2: return
+    print("\n# Escalado (p50 ms, caché caliente o escritura; entre paréntesis, veces el tamaño menor)")
+    print(" " * 35 + "".join(f"{f'{d}d/{n}':>22}" for d, n in tamaños))
+    series = {}
+    for r in resultados:
+        if r["cache"] == "fria": continue
+        series.setdefault((r["almacen"], r["operacion"]), {})[r["dias"]] = r["p50_ms"]
+    for (almacen, op), valores in series.items():
+        base = valores.get(tamaños[0][0]) or 1e-9
+        celdas = "".join(f"{f'{valores[d]:.2f} ({valores[d] / base:.1f}x)':>22}" if d in valores else f"{'-':>22}" for d, _ in tamaños)
+        print(f"{almacen:8} {op:26}" + celdas)
+
+def guardar_csv(resultados, ruta):
+    with open(ruta, 'w', newline='') as f:
+        w = csv.DictWriter(f, fieldnames=list(resultados[0]))
+        w.writeheader()
+        w.writerows(resultados)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--equipos", type=int, default=5)
+    parser.add_argument("--empleados", type=int, default=40, help="Empleados por equipo.")
+    parser.add_argument("--dias", default="30,180", help="Uno o varios tamaños de historial, separados por comas.")
+    parser.add_argument("--almacen", default="csv,sqlite,parquet")
+    parser.add_argument("--repeticiones", type=int, default=20)
+    parser.add_argument("--sin-apptest", action="store_true")
+    parser.add_argument("--salida", help="Guarda los resultados en un CSV.")
+    parser.add_argument("--arranque", action="store_true", help="Mide el arranque en frío y el ingreso en lugar de las operaciones.")
+    args = parser.parse_args()
+
+    if args.arranque:
+        res = arranque(args.equipos, args.empleados, int(args.dias.split(",")[-1]), max(3, args.repeticiones // 4))
+        if args.salida: guardar_csv(res, args.salida)
+        sys.exit(0)
+
+    res = ejecutar(args.equipos, args.empleados, [int(d) for d in args.dias.split(",")],
+                   args.almacen.split(","), args.repeticiones, not args.sin_apptest)
+    imprimir_escalado(res)
+    if args.salida: guardar_csv(res, args.salida)
@@ -0,0 +1,121 @@
+"""
+Cola de escritura en segundo plano para los lotes de asistencia.
+
+`encolar` deja el lote en un archivo de la carpeta de cola (temporal + fsync + rename) y
+devuelve enseguida un ticket: desde ese momento el lote es durable aunque el proceso
+muera. Un hilo por proceso los pasa al almacén en orden de llegada y borra cada archivo
+al terminar; si la escritura falla, reintenta sin saltarse el orden.
+
+Lo que quede en la carpeta tras una caída se recupera con `recuperar` (lo llama
+`asegurar_archivos` al arrancar). Un lote recuperado pudo llegar a escribirse antes de
+la caída, así que se descartan sus filas cuyo `Registro` ya está en el historial. Varios
+procesos pueden compartir la carpeta: cada lote se procesa bajo el bloqueo de la cola y
+solo lo escribe quien lo encuentra todavía ahí.
+"""
+import os
+import threading
+import time as time_mod
+import uuid
+from almacen import bloqueo_archivo, escribir_csv_atomico, leer_csv_inteligente
+from esquema import COLS_ASISTENCIA, asignar_registros
+from metricas import medir
+
+ESPERA_REINTENTO = 5  # segundos entre intentos si el almacén falla
+SUFIJO_LOTE = ".csv"
+
+class ColaEscritura:
+    def __init__(self, carpeta, escribir, registros_guardados):
+        """
+        `escribir(df)` persiste un lote; `registros_guardados(registros)` dice cuáles de esos
+        identificadores ya están en el historial (solo se consulta para lotes recuperados).
+        """
+        self.carpeta = carpeta
+        self._escribir = escribir
+        self._registros_guardados = registros_guardados
+        self._pendientes = []  # (ticket, recuperado) en orden de llegada
+        self._estados = {}     # ticket -> (estado, detalle)
+        self._lotes = {}       # ticket -> DataFrame aún no escrito, para que la interfaz no lo dé por pendiente
+        self._cond = threading.Condition()
+        self._hilo = None
+
+    def _ruta(self, ticket): return os.path.join(self.carpeta, ticket + SUFIJO_LOTE)
+
+    def encolar(self, df):
+        """Guarda el lote en la cola de forma durable y devuelve su ticket sin esperar al almacén."""
+        df = asignar_registros(df[COLS_ASISTENCIA].fillna("").astype(str))
+        ticket = f"{time_mod.time_ns():020d}_{uuid.uuid4().hex[:8]}"
+        os.makedirs(self.carpeta, exist_ok=True)
+        with medir("encolar_asistencia"): escribir_csv_atomico(df, self._ruta(ticket))
+        with self._cond:
+            self._pendientes.append((ticket, False))
+            self._estados[ticket] = ("pendiente", "")
+            self._lotes[ticket] = df
+            self._arrancar()
+            self._cond.notify()
+        return ticket
+
+    def recuperar(self):
+        """Encola los lotes que otra ejecución dejó en la carpeta. Barato si no hay ninguno."""
+        if not os.path.isdir(self.carpeta): return 0
+        tickets = sorted(n[:-len(SUFIJO_LOTE)] for n in os.listdir(self.carpeta) if n.endswith(SUFIJO_LOTE))
+        with self._cond:
+            nuevos = [t for t in tickets if t not in self._estados]
+            for t in nuevos:
+                self._pendientes.append((t, True))
+                self._estados[t] = ("pendiente", "")
+            if nuevos:
+                self._pendientes.sort()
+                self._arrancar()
+                self._cond.notify()
+        return len(nuevos)
+
+    def estado(self, ticket):
+        """("pendiente" | "reintentando" | "guardado", detalle)."""
+        with self._cond: return self._estados.get(ticket, ("guardado", ""))
+
+    def en_cola(self):
+        """Lotes aceptados que todavía no llegaron al almacén."""
+        with self._cond: return list(self._lotes.values())
+
+    def esperar(self, timeout=None):
+        """Bloquea hasta vaciar la cola (pruebas, scripts y cierre ordenado). True si se vació."""
+        limite = None if timeout is None else time_mod.monotonic() + timeout
+        with self._cond:
+            while self._pendientes:
+                restante = None if limite is None else limite - time_mod.monotonic()
+                if restante is not None and restante <= 0: return False
+                self._cond.wait(restante)
+        return True
+
+    def _arrancar(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            self._hilo = threading.Thread(target=self._trabajar, name="cola-asistencia", daemon=True)
+            self._hilo.start()
+
+    def _trabajar(self):
+        while True:
+            with self._cond:
+                while not self._pendientes: self._cond.wait()
+                ticket, recuperado = self._pendientes[0]
+            try:
+                self._procesar(ticket, recuperado)
+                estado = ("guardado", "")
+            except Exception as e:
+                with self._cond: self._estados[ticket] = ("reintentando", str(e))
+                time_mod.sleep(ESPERA_REINTENTO)
+                continue
+            with self._cond:
+                self._pendientes.pop(0)
+                self._estados[ticket] = estado
+                self._lotes.pop(ticket, None)
+                self._cond.notify_all()
+
+    def _procesar(self, ticket, recuperado):
+        ruta = self._ruta(ticket)
+        with medir("escribir_lote_cola"), bloqueo_archivo(self.carpeta):
+            if not os.path.exists(ruta): return  # otro proceso ya lo escribió
+            df = leer_csv_inteligente(ruta, COLS_ASISTENCIA)
+            if recuperado and not df.empty:
+                df = df[~df["Registro"].isin(self._registros_guardados(df["Registro"].tolist()))]
+            if not df.empty: self._escribir(df)
+            os.remove(ruta)
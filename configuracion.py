@@ -0,0 +1,324 @@
+"""
+Contraseñas y franjas horarias de cada equipo (config_passwords_v4.json).
+
+Las contraseñas ya no se guardan en texto plano: cada una queda como PBKDF2-SHA256 con
+sal propia ("pbkdf2_sha256$iteraciones$sal$hash") y se compara en tiempo constante. Como
+cada hash lleva su sal, para encontrar el equipo sin probar la contraseña contra todos se
+guarda también una huella de búsqueda (HMAC con una clave que no va en el archivo):
+ingresar es calcular una huella, buscarla en un diccionario y verificar un solo hash.
+
+La clave de las huellas no se guarda en la carpeta de datos: con ella al lado del archivo, una
+copia de la carpeta bastaría para probar contraseñas a velocidad de HMAC en vez de PBKDF2. Se
+lee de la variable de entorno ASISTENCIA_CLAVE o de `st.secrets["clave_indice"]` (64 caracteres
+hexadecimales, p. ej. `python -c "import secrets; print(secrets.token_hex(32))"`); sin ella no se
+entra (ClaveNoConfigurada). Quien venga de una versión anterior puede poner en la variable el
+contenido de config_clave.key en hexadecimal (`xxd -p -c 64 config_clave.key`) y borrar el archivo.
+
+`Configuracion` es una foto de solo lectura del archivo con ese índice y las franjas ya
+convertidas a `time`; `configuracion()` la guarda en la caché de proceso por firma del
+archivo, así solo se vuelve a leer cuando el archivo cambia o tras `guardar_configuracion`.
+
+La pantalla de ingreso solo necesita este módulo: no importa pandas ni la capa de datos.
+
+Cada ingreso abre una sesión: un identificador aleatorio (el navegador lo guarda en una cookie)
+con su registro en `sesiones/` de la carpeta de datos, así cualquier proceso que la comparta
+reconoce un ingreso hecho en otro. Reanudar (`reanudar_sesion`, al reconectar) exige uso en los
+últimos DURACION_SESION segundos y como mucho DURACION_MAXIMA_SESION desde el ingreso; una sesión
+en curso (`continuar_sesion`) no vence: solo termina al cerrarla o al cambiar la contraseña. El
+archivo se nombra con el hash del identificador, no con él.
+
+Si se pierde o se cambia la clave, las huellas dejan de coincidir: se entra con la clave maestra
+y se vuelven a asignar las contraseñas desde CONFIGURACIÓN.
+"""
+import copy
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time as time_mod
+import warnings
+from datetime import datetime
+from archivos import en_datos, bloqueo_archivo, firma_archivo, ruta_temporal, desde_cache, invalidar_cache
+
+try:
+    import streamlit as st
+except ImportError:
+    st = None
+
+ARCHIVO_PASSWORDS = en_datos('config_passwords_v4.json')
+ARCHIVO_CLAVE_ANTERIOR = en_datos('config_clave.key')  # versiones anteriores guardaban aquí la clave
+VARIABLE_CLAVE = "ASISTENCIA_CLAVE"
+CLAVE_MAESTRA = 'Admin26'  # ingreso de ADMIN aunque la configuración se pierda
+
+ALGORITMO = "pbkdf2_sha256"
+ITERACIONES = 600_000
+FORMATO_HORA = "%H:%M"
+FRANJA_COMPLETA = ("00:00", "23:59")
+CARPETA_SESIONES = en_datos('sesiones')
+DURACION_SESION = 30 * 60  # para reanudar: sin actividad; cada uso la extiende
+DURACION_MAXIMA_SESION = 12 * 3600  # para reanudar: un turno largo; también lo que dura la marca de cierre
+RENOVAR_CADA = 60  # la actividad se anota como mucho una vez por minuto
+
+def cifrar(password, iteraciones=ITERACIONES):
+    sal = secrets.token_bytes(16)
+    resumen = hashlib.pbkdf2_hmac("sha256", password.encode(), sal, iteraciones)
+    return f"{ALGORITMO}${iteraciones}${sal.hex()}${resumen.hex()}"
+
+def es_cifrada(valor):
+    return isinstance(valor, str) and valor.startswith(ALGORITMO + "$") and valor.count("$") == 3
+
+def verificar(password, cifrada):
+    """True si `password` corresponde al hash guardado. Compara en tiempo constante."""
+    if not es_cifrada(cifrada): return False
+    _, iteraciones, sal, resumen = cifrada.split("$")
+    try: calculado = hashlib.pbkdf2_hmac("sha256", password.encode(), bytes.fromhex(sal), int(iteraciones))
+    except ValueError: return False
+    return hmac.compare_digest(calculado.hex(), resumen)
+
+class ClaveNoConfigurada(RuntimeError):
+    """Falta la clave de las huellas de ingreso (o no es válida): no se puede autenticar a nadie."""
+
+def huella(password, clave):
+    """Huella de búsqueda: determinista para poder indexarla, pero inútil sin la clave."""
+    return hmac.new(clave, password.encode(), hashlib.sha256).hexdigest()
+
+def leer_hora(texto):
+    try: return datetime.strptime(texto, FORMATO_HORA).time()
+    except (TypeError, ValueError): return None
+
+def preparar(datos, clave):
+    """
+    Deja cada entrada como {"password": hash, "huella", "inicio", "fin"}: convierte el formato
+    antiguo (solo la contraseña) y cifra las que vengan en texto plano. Devuelve (datos, cambió).
+    """
+    datos, cambio = copy.deepcopy(datos), False
+    for equipo, d in datos.items():
+        if not isinstance(d, dict):
+            d = datos[equipo] = {"password": str(d), "inicio": FRANJA_COMPLETA[0], "fin": FRANJA_COMPLETA[1]}
+            cambio = True
+        password = str(d.get("password", ""))
+        if not es_cifrada(password):
+            d["password"], d["huella"] = cifrar(password), huella(password, clave)
+            cambio = True
+    return datos, cambio
+
+def repetidas(datos):
+    """Equipos cuya contraseña ya usa otro (con la misma no se sabría a cuál entrar)."""
+    vistos, repetidos = {}, []
+    for equipo, d in datos.items():
+        h = d.get("huella")
+        if h and h in vistos: repetidos.append((equipo, vistos[h]))
+        elif h: vistos[h] = equipo
+    return repetidos
+
+class Configuracion:
+    """Foto de solo lectura del archivo, con lo que se consulta en cada rerun ya calculado."""
+    def __init__(self, datos):
+        self._datos = datos
+        self.equipos = sorted(k for k in datos if k != "ADMIN")
+        self._indice, self.ambiguas = {}, {}
+        for k, d in datos.items():
+            h = d.get("huella")
+            if not h: continue
+            if h in self._indice: self.ambiguas.setdefault(h, [self._indice[h]]).append(k)
+            else: self._indice[h] = k
+        for h, equipos in self.ambiguas.items():
+            self._indice.pop(h)  # con la misma contraseña no se sabe a cuál entrar: no se entra a ninguno
+            warnings.warn(f"Contraseña repetida en {', '.join(equipos)}: no se podrá ingresar con ella hasta cambiarla.")
+        self._franjas = {k: (leer_hora(d.get("inicio", FRANJA_COMPLETA[0])), leer_hora(d.get("fin", FRANJA_COMPLETA[1])))
+                         for k, d in datos.items()}
+
+    def equipo_de(self, password, clave):
+        """Equipo (o "ADMIN") dueño de la contraseña, o None (también si la comparten varios). Un solo hash por intento."""
+        equipo = self._indice.get(huella(password, clave))
+        if equipo is None or not verificar(password, self._datos[equipo]["password"]): return None
+        return equipo
+
+    def franja(self, usuario):
+        """(inicio, fin) como `time`; None en la que no se pudo leer."""
+        return self._franjas.get(usuario, (None, None))
+
+    def en_horario(self, usuario, hora):
+        if usuario == "ADMIN" or usuario not in self._franjas: return True
+        inicio, fin = self._franjas[usuario]
+        if inicio is None or fin is None: return True
+        return inicio <= hora <= fin
+
+    def version_sesion(self, usuario, clave):
+        """
+        Huella de la contraseña actual del usuario: una sesión abierta con otra ya no vale. None si el
+        usuario no existe; ADMIN sin entrada (ingreso con la clave maestra) usa la clave maestra.
+        """
+        if usuario in self._datos: password = self._datos[usuario]['password']
+        elif usuario == "ADMIN": password = CLAVE_MAESTRA
+        else: return None
+        return hmac.new(clave, f"sesion|{usuario}|{password}".encode(), hashlib.sha256).hexdigest()
+
+    def como_dict(self):
+        return copy.deepcopy(self._datos)
+
+# --- ARCHIVO DE CONFIGURACIÓN E INGRESO ---
+
+def reiniciar_configuracion_default():
+    defaults = {
+        "ADMIN": {"password": "1234", "inicio": "00:00", "fin": "23:59"},
+        "Callcenter Bucaramanga": {"password": "1", "inicio": "06:00", "fin": "14:00"},
+        "Callcenter Medellin": {"password": "2", "inicio": "08:00", "fin": "17:00"},
+        "Callcenter Bogota": {"password": "3", "inicio": "00:00", "fin": "23:59"},
+        "Servicio al cliente": {"password": "4", "inicio": "00:00", "fin": "23:59"}
+    }
+    defaults, _ = preparar(defaults, clave_indice())
+    try: escribir_configuracion(defaults)
+    except: pass
+    return defaults
+
+def clave_indice():
+    """Clave de las huellas de ingreso: ASISTENCIA_CLAVE o st.secrets["clave_indice"]. ClaveNoConfigurada si falta."""
+    texto = os.environ.get(VARIABLE_CLAVE, "")
+    if not texto and st is not None:
+        try: texto = str(st.secrets.get("clave_indice", ""))
+        except Exception: texto = ""  # sin secrets.toml
+    try: clave = bytes.fromhex(texto.strip())
+    except ValueError: raise ClaveNoConfigurada(f"{VARIABLE_CLAVE} no es hexadecimal.") from None
+    if len(clave) < 32:
+        anterior = f" Para conservar las contraseñas, use el contenido de {ARCHIVO_CLAVE_ANTERIOR} en hexadecimal." if os.path.exists(ARCHIVO_CLAVE_ANTERIOR) else ""
+        raise ClaveNoConfigurada(f"Configure {VARIABLE_CLAVE} (o clave_indice en st.secrets) con 64 caracteres hexadecimales.{anterior}")
+    return clave
+
+def configuracion():
+    """Foto de la configuración con el índice de ingreso y las franjas ya leídas; se rehace solo si cambia el archivo."""
+    if not os.path.exists(ARCHIVO_PASSWORDS): reiniciar_configuracion_default()
+    return desde_cache(("config", ARCHIVO_PASSWORDS), firma_archivo(ARCHIVO_PASSWORDS), lambda: Configuracion(leer_configuracion()))
+
+def cargar_configuracion():
+    return configuracion().como_dict()
+
+def leer_configuracion():
+    """Las contraseñas que sigan en texto plano (versiones anteriores) se cifran y el archivo se reescribe una vez."""
+    try:
+        with open(ARCHIVO_PASSWORDS, 'r') as f: data = json.load(f)
+        if not isinstance(data, dict): return reiniciar_configuracion_default()
+    except: return reiniciar_configuracion_default()
+    data, cambio = preparar(data, clave_indice())
+    if cambio: escribir_configuracion(data)
+    return data
+
+def escribir_configuracion(data):
+    with bloqueo_archivo(ARCHIVO_PASSWORDS):
+        tmp = ruta_temporal(ARCHIVO_PASSWORDS)
+        with open(tmp, 'w') as f: json.dump(data, f)
+        os.replace(tmp, ARCHIVO_PASSWORDS)
+    invalidar_cache(ARCHIVO_PASSWORDS)
+
+def guardar_configuracion(diccionario_nuevo):
+    """
+    Entradas con "password" en texto plano (nueva) o ya cifrada (sin cambios). ValueError si dos
+    equipos quedarían con la misma contraseña.
+    """
+    if "ADMIN" not in diccionario_nuevo: diccionario_nuevo["ADMIN"] = {"password": "1234", "inicio": "00:00", "fin": "23:59"}
+    data, _ = preparar(diccionario_nuevo, clave_indice())
+    repetidos = repetidas(data)
+    if repetidos: raise ValueError("Contraseña repetida: " + ", ".join(f"{a} y {b}" for a, b in repetidos))
+    escribir_configuracion(data)
+
+def autenticar(password):
+    """Usuario ("ADMIN" o equipo) de la contraseña, o None: una huella, una búsqueda y un hash."""
+    if hmac.compare_digest(password.encode(), CLAVE_MAESTRA.encode()): return "ADMIN"
+    return configuracion().equipo_de(password, clave_indice())
+
+# --- SESIONES ---
+
+def ruta_sesion(token):
+    return os.path.join(CARPETA_SESIONES, hashlib.sha256(token.encode()).hexdigest())
+
+def _escribir_sesion(token, registro, ahora=None):
+    os.makedirs(CARPETA_SESIONES, exist_ok=True)
+    ruta = ruta_sesion(token)
+    tmp = ruta_temporal(ruta)
+    with open(tmp, 'w') as f: json.dump(registro, f)
+    os.chmod(tmp, 0o600)
+    if ahora is not None: os.utime(tmp, (ahora, ahora))  # la fecha del archivo es el último uso
+    os.replace(tmp, ruta)
+
+def _leer_sesion(token):
+    """(registro, último uso) o (None, None) si no existe o no se puede leer."""
+    try:
+        ruta = ruta_sesion(token)
+        ultimo_uso = os.path.getmtime(ruta)
+        with open(ruta, 'r') as f: registro = json.load(f)
+    except (OSError, ValueError): return None, None
+    return (registro, ultimo_uso) if isinstance(registro, dict) else (None, None)
+
+def _renovar(token, ultimo_uso, ahora):
+    if ahora - ultimo_uso > RENOVAR_CADA:
+        try: os.utime(ruta_sesion(token), (ahora, ahora))
+        except OSError: pass
+
+def version_sesion(usuario):
+    """Lo que una sesión de `usuario` guarda para notar un cambio de contraseña (ver `Configuracion.version_sesion`)."""
+    return configuracion().version_sesion(usuario, clave_indice())
+
+def abrir_sesion(usuario, ahora=None):
+    """Identificador de una sesión nueva de `usuario`, válido en cualquier proceso que comparta la carpeta de datos."""
+    ahora = time_mod.time() if ahora is None else ahora
+    version = version_sesion(usuario)
+    if version is None: return ""  # equipo borrado mientras ingresaba
+    podar_sesiones(ahora)
+    token = secrets.token_urlsafe(32)
+    _escribir_sesion(token, {"usuario": usuario, "version": version, "inicio": int(ahora)}, ahora)
+    return token
+
+def reanudar_sesion(token, ahora=None):
+    """
+    Usuario de la sesión al reconectar (otro proceso, página recargada) si su registro existe, no se
+    cerró, tuvo uso en los últimos DURACION_SESION segundos, no pasó de DURACION_MAXIMA_SESION y la
+    contraseña no cambió; si no, None. Cada uso la renueva.
+    """
+    if not token or not isinstance(token, str): return None
+    ahora = time_mod.time() if ahora is None else ahora
+    registro, ultimo_uso = _leer_sesion(token)
+    if registro is None or registro.get("cerrada"): return None
+    try: usuario, version, inicio = registro["usuario"], str(registro["version"]), float(registro["inicio"])
+    except (KeyError, TypeError, ValueError): return None
+    actual = version_sesion(usuario)
+    if ultimo_uso + DURACION_SESION < ahora or inicio + DURACION_MAXIMA_SESION < ahora: return None
+    if actual is None or not hmac.compare_digest(actual, version):
+        cerrar_sesion(token)
+        return None
+    _renovar(token, ultimo_uso, ahora)
+    return usuario
+
+def continuar_sesion(token, usuario, version, ahora=None):
+    """
+    Para una sesión en curso en este proceso: False si se cerró (en otra pestaña o proceso) o cambió
+    la contraseña de `usuario`. No vence por inactividad ni por duración: quien deja el editor
+    abierto no pierde lo que tenía sin guardar. Si el registro se podó, se vuelve a escribir.
+    """
+    ahora = time_mod.time() if ahora is None else ahora
+    actual = version_sesion(usuario)
+    if not token or actual is None or version is None or not hmac.compare_digest(actual, version): return False
+    registro, ultimo_uso = _leer_sesion(token)
+    if registro is None: _escribir_sesion(token, {"usuario": usuario, "version": version, "inicio": int(ahora)}, ahora)
+    elif registro.get("cerrada") or registro.get("usuario") != usuario: return False
+    else: _renovar(token, ultimo_uso, ahora)
+    return True
+
+def cerrar_sesion(token):
+    """
+    Deja una marca de cierre en el registro: el identificador deja de valer en todos los procesos,
+    también para las pestañas que lo usan ahora mismo. La marca dura DURACION_MAXIMA_SESION.
+    """
+    if not token: return
+    _escribir_sesion(token, {"cerrada": True})
+
+def podar_sesiones(ahora=None):
+    """Registros y marcas de cierre sin uso en DURACION_MAXIMA_SESION: ya no sirven para reanudar ni para avisar."""
+    limite = (time_mod.time() if ahora is None else ahora) - DURACION_MAXIMA_SESION
+    try: nombres = os.listdir(CARPETA_SESIONES)
+    except OSError: return
+    for n in nombres:
+        ruta = os.path.join(CARPETA_SESIONES, n)
+        try:
+            if os.path.getmtime(ruta) < limite: os.remove(ruta)
+        except OSError: pass
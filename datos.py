@@ -0,0 +1,264 @@
+"""
+Capa de acceso a datos compartida por todas las sesiones del proceso.
+
+Los DataFrames parseados se guardan en una caché a nivel de proceso y se
+invalidan por firma de archivo (mtime + tamaño) o al escribir a través de
+las funciones de este módulo, así un clic en un widget no vuelve a leer disco.
+
+El almacenamiento en sí (CSV con diario, SQLite o Parquet) vive en `almacen.py`; se
+elige con la variable de entorno ASISTENCIA_ALMACEN ("csv" por defecto, "sqlite" o "parquet").
+
+Varios procesos (o servidores detrás de un balanceador) comparten los datos apuntando
+ASISTENCIA_DATOS a la misma carpeta: asistencia, empleados, configuración, soportes y cola
+viven ahí. Las escrituras van bajo `bloqueo_archivo` y se publican con os.replace, y las
+cachés se validan por firma del archivo (o por la versión guardada en SQLite), así que lo
+que escribe un proceso lo ven los demás en su siguiente lectura. Entre servidores, la
+carpeta debe admitir bloqueos (NFSv4, SMB); SQLite en modo WAL solo sirve entre procesos de
+la misma máquina, así que entre servidores va "csv" o "parquet".
+"""
+import os
+import copy
+import threading
+import numpy as np
+import pandas as pd
+from esquema import COLS_ASISTENCIA, COLS_EMPLEADOS, tipar_asistencia, a_texto, sin_registro
+from almacen import (
+    garantizar_columnas,
+    filtrar_asistencia, mascara_asistencia, crear_almacen,
+)
+from exportar import exportar, FILAS_POR_BLOQUE
+import soportes
+import importar
+from cola import ColaEscritura
+from archivos import CARPETA_DATOS, en_datos, desde_cache, invalidar_cache
+from configuracion import (  # la configuración y el ingreso no necesitan esta capa; se reexportan por comodidad
+    ARCHIVO_PASSWORDS, configuracion, cargar_configuracion, guardar_configuracion, autenticar, abrir_sesion, reanudar_sesion, continuar_sesion, cerrar_sesion,
+)
+from metricas import instrumentar
+
+# Archivos (relativos a la carpeta de trabajo, o a ASISTENCIA_DATOS si está definida)
+ARCHIVO_ASISTENCIA = en_datos('asistencia_historica.csv')
+ARCHIVO_EMPLEADOS = en_datos('base_datos_empleados.csv')
+CARPETA_SOPORTES = en_datos('soportes_img')
+ARCHIVO_SQLITE = en_datos('asistencia.db')
+CARPETA_PARQUET = en_datos('asistencia_historica.parquet')
+CARPETA_COLA = en_datos('cola_asistencia')
+
+ALMACEN = crear_almacen(os.environ.get("ASISTENCIA_ALMACEN", "csv"), ARCHIVO_ASISTENCIA, ARCHIVO_EMPLEADOS, ARCHIVO_SQLITE, CARPETA_PARQUET)
+
+# --- 1. LECTURAS ---
+
+@instrumentar("cargar_asistencia")
+def cargar_asistencia(columnas_esperadas=COLS_ASISTENCIA):
+    """Historial completo como texto, tal cual está en disco (cacheado). Para editarlo y reescribirlo."""
+    clave = ("asistencia", ARCHIVO_ASISTENCIA, tuple(columnas_esperadas))
+    return desde_cache(clave, ALMACEN.firma_asistencia(), lambda: ALMACEN.cargar_asistencia(columnas_esperadas)).copy()
+
+@instrumentar("consultar_pagina")
+def consultar_pagina(desde=None, hasta=None, equipos=None, contiene=None, pagina=1, filas=100):
+    """
+    Una página del historial como texto (para el editor de mantenimiento) y el total de filas del filtro.
+    Al navegador solo viaja la página; `contiene` busca dentro del nombre.
+    """
+    inicio = (max(pagina, 1) - 1) * filas
+    if ALMACEN.consultas_indexadas: return ALMACEN.pagina_asistencia(desde, hasta, equipos, contiene, inicio, filas)
+    clave = ("asistencia", ARCHIVO_ASISTENCIA, tuple(COLS_ASISTENCIA))
+    df = desde_cache(clave, ALMACEN.firma_asistencia(), lambda: ALMACEN.cargar_asistencia(COLS_ASISTENCIA))
+    df = filtrar_asistencia(df, desde, hasta, equipos, contiene=contiene)
+    return df.iloc[inicio:inicio + filas].copy(), len(df)
+
+@instrumentar("exportar_asistencia")
+def exportar_asistencia(desde=None, hasta=None, equipos=None, formato="csv"):
+    """
+    Bytes del reporte filtrado (ver `exportar.py`), generado por bloques al pedirlo.
+    Pensado para pasarse como función a st.download_button: no cuesta nada si nadie descarga.
+    """
+    if ALMACEN.consultas_indexadas: return exportar(ALMACEN.iterar_asistencia(desde, hasta, equipos, FILAS_POR_BLOQUE), formato)
+    clave = ("asistencia", ARCHIVO_ASISTENCIA, tuple(COLS_ASISTENCIA))
+    df = desde_cache(clave, ALMACEN.firma_asistencia(), lambda: ALMACEN.cargar_asistencia(COLS_ASISTENCIA))
+    posiciones = np.flatnonzero(mascara_asistencia(df, desde, hasta, equipos)) if not df.empty else []
+    return exportar((df.iloc[posiciones[i:i + FILAS_POR_BLOQUE]] for i in range(0, len(posiciones), FILAS_POR_BLOQUE)), formato)
+
+def cargar_asistencia_tipada():
+    """Historial completo tipado (ver `esquema.py`); es la copia que comparten las lecturas del proceso."""
+    clave = ("asistencia_tipada", ARCHIVO_ASISTENCIA)
+    return desde_cache(clave, ALMACEN.firma_asistencia(), lambda: tipar_asistencia(ALMACEN.cargar_asistencia()))
+
+@instrumentar("consultar_asistencia")
+def consultar_asistencia(desde=None, hasta=None, equipos=None, columnas_esperadas=COLS_ASISTENCIA):
+    """
+    Registros tipados filtrados por rango de fechas (YYYY-MM-DD) y equipos.
+    En SQLite usa los índices y en Parquet poda particiones; en CSV filtra la copia tipada cacheada.
+    """
+    if ALMACEN.consultas_indexadas: return ALMACEN.consultar_asistencia(desde, hasta, equipos, columnas_esperadas)
+    return filtrar_asistencia(cargar_asistencia_tipada(), desde, hasta, equipos)[columnas_esperadas]
+
+@instrumentar("consultar_resumen")
+def consultar_resumen(desde=None, hasta=None, equipos=None, nombre=None, por_nombre=False):
+    """
+    Conteos precalculados por (Fecha, Equipo, Estado) —o también por Nombre— para KPIs y gráficos.
+    Se mantienen al guardar, así el dashboard no recorre los registros crudos.
+    """
+    if ALMACEN.consultas_indexadas: return ALMACEN.consultar_resumen(desde, hasta, equipos, nombre, por_nombre)
+    clave = ("resumen_nombre" if por_nombre else "resumen_diario", ARCHIVO_ASISTENCIA)
+    df = desde_cache(clave, ALMACEN.firma_asistencia(), lambda: ALMACEN.cargar_resumen(por_nombre))
+    return filtrar_asistencia(df, desde, hasta, equipos, nombre).copy()
+
+def describir_asistencia():
+    """Rango de fechas, equipos presentes y número de registros, para armar los filtros."""
+    clave = ("rango", ARCHIVO_ASISTENCIA)
+    return copy.deepcopy(desde_cache(clave, ALMACEN.firma_asistencia(), ALMACEN.describir_asistencia))
+
+def calentar():
+    """Deja en la caché lo que piden las primeras pantallas tras el ingreso (la precarga lo hace mientras se escribe la contraseña)."""
+    describir_asistencia()
+    cargar_empleados()
+    consultar_resumen()
+    if not ALMACEN.consultas_indexadas: cargar_asistencia_tipada()
+
+@instrumentar("cargar_empleados")
+def cargar_empleados():
+    """Base de empleados completa (cacheada)."""
+    clave = ("empleados", ARCHIVO_EMPLEADOS)
+    return desde_cache(clave, ALMACEN.firma_empleados(), ALMACEN.cargar_empleados).copy()
+
+_PREPARADO = False
+_LOCK_PREPARAR = threading.Lock()
+
+def asegurar_archivos():
+    """
+    Verifica integridad y retoma los lotes que quedaron en la cola de escritura. Trabaja solo
+    la primera vez en el proceso; las demás llamadas (una por rerun) no tocan disco.
+    """
+    global _PREPARADO
+    if _PREPARADO: return
+    with _LOCK_PREPARAR:
+        if _PREPARADO: return
+        if not os.path.exists(CARPETA_SOPORTES): os.makedirs(CARPETA_SOPORTES)
+        ALMACEN.preparar()
+        invalidar_cache()
+        COLA.recuperar()
+        _PREPARADO = True
+
+# --- 2. ESCRITURAS ---
+
+@instrumentar("guardar_personal")
+def guardar_personal(df_nuevo, equipo_actual):
+    df_nuevo = garantizar_columnas(df_nuevo, COLS_EMPLEADOS)
+    df_nuevo['Equipo'] = equipo_actual
+    ALMACEN.reemplazar_equipo(equipo_actual, df_nuevo)
+    invalidar_cache(ARCHIVO_EMPLEADOS)
+
+@instrumentar("guardar_asistencia")
+def guardar_asistencia(df_registro):
+    """Anexa el lote al historial: el coste depende de las filas guardadas, no del historial."""
+    df_registro = garantizar_columnas(df_registro.copy(), COLS_ASISTENCIA)
+    ALMACEN.agregar_asistencia(df_registro)
+    invalidar_cache(ARCHIVO_ASISTENCIA)
+
+def _registros_guardados(registros):
+    return set(cargar_asistencia(["Registro"])["Registro"]) & set(registros)
+
+COLA = ColaEscritura(CARPETA_COLA, guardar_asistencia, _registros_guardados)
+
+def encolar_asistencia(df_registro):
+    """
+    Como `guardar_asistencia`, pero vuelve en cuanto el lote está a salvo en la cola (ver `cola.py`);
+    la escritura en el historial ocurre en segundo plano. Devuelve el ticket para `estado_lote`.
+    """
+    return COLA.encolar(garantizar_columnas(df_registro.copy(), COLS_ASISTENCIA))
+
+def estado_lote(ticket): return COLA.estado(ticket)
+
+def asistencia_en_cola(desde=None, hasta=None, equipos=None):
+    """Filas aceptadas que aún no están en el historial, para no darlas por pendientes mientras tanto."""
+    lotes = COLA.en_cola()
+    if not lotes: return pd.DataFrame(columns=COLS_ASISTENCIA)
+    return filtrar_asistencia(pd.concat(lotes, ignore_index=True), desde, hasta, equipos)
+
+def reportados_del_dia(dia):
+    """(Equipo, Cedula, Nombre) con registro ese día, según el índice del almacén (cacheado por firma)."""
+    clave = ("reportados", ARCHIVO_ASISTENCIA, str(dia))
+    return desde_cache(clave, ALMACEN.firma_asistencia(), lambda: ALMACEN.reportados(dia))
+
+@instrumentar("pendientes_del_dia")
+def pendientes_del_dia(dia, equipos=None):
+    """
+    Empleados sin registro el `dia` (todos o los de `equipos`), contando lo que sigue en la cola de
+    escritura. Cuesta en proporción a la plantilla y a los registros de ese día, no al historial.
+    """
+    df_emp = cargar_empleados()
+    if equipos: df_emp = df_emp[df_emp['Equipo'].isin(list(equipos))]
+    hechos = reportados_del_dia(dia)
+    en_cola = asistencia_en_cola(dia, dia, equipos)
+    if not en_cola.empty: hechos = pd.concat([hechos, en_cola[list(hechos.columns)]], ignore_index=True)
+    return sin_registro(df_emp, hechos)
+
+@instrumentar("importar_asistencia")
+def importar_asistencia(df, simular=False):
+    """
+    Importación masiva (ver `importar.py`): valida contra la base de empleados, descarta lo que ya
+    tiene registro (guardado o en cola) y guarda las filas válidas en una sola escritura.
+    Con `simular` solo valida. Devuelve (aceptadas, rechazadas).
+    """
+    df = importar.normalizar(df)
+    fechas = df.loc[importar.fecha_valida(df), 'Fecha']
+    existentes = pd.DataFrame(columns=["Fecha", "Equipo", "Nombre", "Cedula"])
+    if len(fechas):
+        desde, hasta, equipos = fechas.min(), fechas.max(), list(df['Equipo'].unique())
+        guardados = a_texto(consultar_asistencia(desde, hasta, equipos, list(existentes.columns)))
+        existentes = pd.concat([guardados, asistencia_en_cola(desde, hasta, equipos)[list(existentes.columns)]], ignore_index=True)
+    aceptadas, rechazadas = importar.validar(df, cargar_empleados(), existentes)
+    if not simular and not aceptadas.empty: guardar_asistencia(aceptadas)
+    return aceptadas, rechazadas
+
+@instrumentar("modificar_asistencia")
+def modificar_asistencia(df_editados, registros_borrados=()):
+    """
+    Aplica ediciones y borrados fila a fila, por `Registro`. No reescribe ni reenvía el historial.
+    Devuelve cuántos registros cambiaron (los que otra sesión ya borró se ignoran).
+    """
+    df_editados = garantizar_columnas(df_editados.copy(), COLS_ASISTENCIA)
+    n = ALMACEN.modificar_asistencia(df_editados[COLS_ASISTENCIA], list(registros_borrados))
+    invalidar_cache(ARCHIVO_ASISTENCIA)
+    return n
+
+@instrumentar("guardar_soporte")
+def guardar_soporte(uploaded_file, nombre_persona, fecha):
+    """
+    Guarda el archivo en el almacén por contenido (ver `soportes.py`) y devuelve su ruta, relativa
+    a la carpeta de datos para que valga en cualquier servidor; None si falla.
+    """
+    if uploaded_file is not None:
+        try: return os.path.relpath(soportes.guardar(uploaded_file, CARPETA_SOPORTES), CARPETA_DATOS or ".")
+        except: return None
+    return None
+
+def ubicar_soporte(ruta):
+    """Ruta guardada en el historial -> ruta en este proceso."""
+    return os.path.join(CARPETA_DATOS, ruta)
+
+def miniatura_soporte(ruta):
+    """Vista previa reducida del soporte, o None si hay que mostrar el original."""
+    return soportes.miniatura(ruta, CARPETA_SOPORTES)
+
+def borrar_historial_completo():
+    ALMACEN.borrar_asistencia()
+    invalidar_cache(ARCHIVO_ASISTENCIA)
+
+def restaurar_asistencia():
+    """Vuelve al historial anterior a la última operación destructiva."""
+    ok = ALMACEN.restaurar_asistencia()
+    invalidar_cache(ARCHIVO_ASISTENCIA)
+    return ok
+
+def restaurar_empleados():
+    ok = ALMACEN.restaurar_empleados()
+    invalidar_cache(ARCHIVO_EMPLEADOS)
+    return ok
+
+def reparar_archivos():
+    """Comprueba todas las sumas (también las ya verificadas) y repone lo dañado: (reparados, sin respaldo válido)."""
+    reparados, danados = ALMACEN.reparar(completa=True)
+    invalidar_cache()
+    return reparados, danados
@@ -0,0 +1,88 @@
+"""
+Esquema de los datos de asistencia y su representación tipada en memoria.
+
+En disco todo es texto; al cargar, el historial se convierte una sola vez a tipos
+compactos: `Fecha` como datetime64, `Equipo`/`Nombre`/`Cedula`/`Estado` como
+Categorical (códigos enteros + vocabulario). Así los filtros del dashboard y el
+cálculo de pendientes comparan enteros en vez de cadenas, y cada copia cacheada
+ocupa varias veces menos memoria.
+"""
+import uuid
+import numpy as np
+import pandas as pd
+
+# "Registro" es el identificador estable de cada fila; va al final para que los archivos
+# antiguos (sin esa columna) se sigan leyendo por posición.
+COLS_ASISTENCIA = ["Fecha", "Equipo", "Nombre", "Cedula", "Estado", "Observacion", "Soporte", "Registro"]
+COLS_EMPLEADOS = ["Equipo", "Nombre", "Cedula"]
+# Columnas añadidas después al final: un archivo antiguo sin cabecera no las trae (se leen vacías)
+COLS_AGREGADAS = ["Registro"]
+
+# Vocabulario fijo del selector de estado en "Tomar asistencia"
+ESTADOS = ["Asiste", "Ausente", "Llegada tarde", "Incapacidad", "Vacaciones"]
+ESTADOS_NOVEDAD = ["Llegada tarde", "Ausente", "Incapacidad"]
+ESTADOS_FALTA = ["Ausente", "Incapacidad"]
+ESTADOS_CON_SOPORTE = ["Llegada tarde", "Incapacidad"]
+
+FORMATO_FECHA = "%Y-%m-%d"
+COLS_CATEGORICAS = ["Equipo", "Nombre", "Cedula"]
+
+def asignar_registros(df):
+    """Da un identificador nuevo a las filas que no lo tienen (lotes nuevos o historial anterior a la columna)."""
+    faltan = df['Registro'].isna() | (df['Registro'].astype(str).str.strip() == "")
+    if not faltan.any(): return df
+    df = df.copy()
+    df.loc[faltan, 'Registro'] = [uuid.uuid4().hex for _ in range(int(faltan.sum()))]
+    return df
+
+def categoria_estado(serie):
+    """Estado como Categorical con el vocabulario fijo primero; valores heredados se conservan al final."""
+    extras = sorted(set(serie.dropna().astype(str).unique()) - set(ESTADOS))
+    return pd.Categorical(serie, categories=ESTADOS + extras)
+
+def tipar_asistencia(df):
+    """Texto -> tipos compactos. Fechas ilegibles quedan como NaT en vez de romper la carga."""
+    df = df.copy()
+    if 'Fecha' in df.columns: df['Fecha'] = pd.to_datetime(df['Fecha'], format=FORMATO_FECHA, errors='coerce')
+    for col in COLS_CATEGORICAS:
+        if col in df.columns: df[col] = df[col].astype('category')
+    if 'Estado' in df.columns: df['Estado'] = categoria_estado(df['Estado'])
+    return df
+
+def a_texto(df):
+    """Tipos compactos -> texto, tal como se guarda en disco (para editores y exportaciones)."""
+    df = df.copy()
+    for col in df.columns:
+        if pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = df[col].dt.strftime(FORMATO_FECHA).fillna("")
+        elif isinstance(df[col].dtype, pd.CategoricalDtype):
+            df[col] = df[col].astype(str).where(df[col].notna(), "")
+    return df
+
+def fecha(valor):
+    """'YYYY-MM-DD', date o Timestamp -> Timestamp comparable con la columna tipada."""
+    return pd.Timestamp(valor) if valor else None
+
+def clave_empleado(df):
+    """
+    Identidad de un empleado dentro de su equipo: la cédula; el nombre solo si no hay cédula
+    (registros antiguos). Dos personas con el mismo nombre ya no se confunden.
+    """
+    cedula = df['Cedula'].astype(str).str.strip()
+    return cedula.where(cedula != "", "nombre:" + df['Nombre'].astype(str))
+
+def codigos_empleado(*dfs):
+    """Codifica (Equipo, clave_empleado) como un entero por fila, con el mismo diccionario para todos los frames."""
+    equipos = [df['Equipo'].astype(str) for df in dfs]
+    claves = [clave_empleado(df) for df in dfs]
+    _, cod_eq = np.unique(np.concatenate([e.to_numpy(dtype=object) for e in equipos] or [[]]), return_inverse=True)
+    _, cod_cl = np.unique(np.concatenate([c.to_numpy(dtype=object) for c in claves] or [[]]), return_inverse=True)
+    combinado = cod_eq.astype(np.int64) * (cod_cl.max(initial=0) + 1) + cod_cl
+    cortes = np.cumsum([len(df) for df in dfs])[:-1]
+    return np.split(combinado, cortes)
+
+def sin_registro(df_empleados, df_hechos):
+    """Empleados sin registro en `df_hechos`, emparejando por (Equipo, Cédula) sobre códigos enteros."""
+    if df_empleados.empty or df_hechos.empty: return df_empleados
+    cod_emp, cod_hechos = codigos_empleado(df_empleados, df_hechos)
+    return df_empleados[~np.isin(cod_emp, cod_hechos)]
@@ -0,0 +1,177 @@
+"""
+Prueba de carga multiproceso para las escrituras concurrentes.
+
+Simula el inicio de turno: varios procesos (y varios hilos por proceso, como las
+sesiones de Streamlit) guardan asistencia y personal a la vez sobre la misma
+carpeta de datos. Al final comprueba que no se perdió ni se duplicó ninguna fila.
+
+Después, la coherencia entre procesos: cada uno hace de servidor detrás del balanceador
+(su propia carpeta de trabajo, los datos por ASISTENCIA_DATOS) y comprueba, paso a paso,
+que ve lo que escribieron los demás sin reiniciar: ingreso con la configuración compartida,
+sesiones abiertas y cerradas en otro proceso, lotes de la cola, soportes y un cambio de
+contraseña.
+
+    python estres.py --procesos 8 --hilos 4 --lotes 25 --almacen csv
+    python estres.py --almacen sqlite
+
+Sale con código 1 si falta o sobra algún registro o algún proceso ve datos viejos. Las
+mismas invariantes, a menor escala y con los tres almacenes, están en tests/ (pytest).
+"""
+import argparse
+import multiprocessing
+import os
+import secrets
+import sys
+import tempfile
+import threading
+import time
+
+RAIZ = os.path.dirname(os.path.abspath(__file__))
+
+ESPERA_MAXIMA = 300  # segundos que un proceso espera a los demás en cada paso
+
+def _entorno(carpeta, almacen):
+    """Cada proceso trabaja en su propia carpeta, como otro servidor; los datos van por ASISTENCIA_DATOS."""
+    os.chdir(tempfile.mkdtemp(prefix="nodo_asistencia_"))
+    os.environ["ASISTENCIA_DATOS"] = carpeta
+    os.environ["ASISTENCIA_ALMACEN"] = almacen
+    sys.path.insert(0, RAIZ)
+
+def _trabajador(carpeta, almacen, proceso, hilos, lotes, filas):
+    _entorno(carpeta, almacen)
+    import pandas as pd
+    import almacen as mod_almacen
+    import datos
+
+    mod_almacen.MAX_SEGMENTOS_DIARIO = 10  # fuerza compactaciones en medio de la carga
+    mod_almacen.MAX_ARCHIVOS_PARTICION = 10
+    equipo = f"Equipo {proceso}"
+
+    def sesion(hilo):
+        for lote in range(lotes):
+            datos.guardar_asistencia(pd.DataFrame([
+                {"Fecha": "2026-01-01", "Equipo": equipo, "Nombre": f"Persona {hilo}-{fila}",
+                 "Cedula": f"{proceso}-{hilo}-{lote}-{fila}", "Estado": "Asiste"}
+                for fila in range(filas)]))
+            if hilo == 0:
+                datos.guardar_personal(pd.DataFrame(
+                    [{"Nombre": f"Persona {i}", "Cedula": f"{proceso}-{i}"} for i in range(lote + 1)]), equipo)
+
+    ts = [threading.Thread(target=sesion, args=(h,)) for h in range(hilos)]
+    for t in ts: t.start()
+    for t in ts: t.join()
+
+def ejecutar(procesos, hilos, lotes, filas, almacen, carpeta=None):
+    carpeta = os.path.abspath(carpeta or tempfile.mkdtemp(prefix="estres_asistencia_"))
+    _entorno(carpeta, almacen)
+    import datos
+    datos.asegurar_archivos()
+
+    ctx = multiprocessing.get_context("spawn")
+    ps = [ctx.Process(target=_trabajador, args=(carpeta, almacen, p, hilos, lotes, filas)) for p in range(procesos)]
+    t0 = time.perf_counter()
+    for p in ps: p.start()
+    for p in ps: p.join()
+    duracion = time.perf_counter() - t0
+
+    datos.invalidar_cache()
+    df_asis = datos.cargar_asistencia()
+    df_emp = datos.cargar_empleados()
+    esperadas = procesos * hilos * lotes * filas
+    errores = []
+    if any(p.exitcode != 0 for p in ps): errores.append("algún proceso terminó con error")
+    if len(df_asis) != esperadas: errores.append(f"asistencia: {len(df_asis)} filas, se esperaban {esperadas}")
+    if df_asis['Cedula'].duplicated().any(): errores.append("asistencia: filas duplicadas")
+    for p in range(procesos):
+        n = (df_emp['Equipo'] == f"Equipo {p}").sum()
+        if n != lotes: errores.append(f"empleados de 'Equipo {p}': {n}, se esperaban {lotes}")
+
+    print(f"[{almacen}] {procesos} procesos x {hilos} hilos x {lotes} lotes x {filas} filas "
+          f"= {esperadas} filas en {duracion:.2f}s ({esperadas / duracion:.0f} filas/s) -> {carpeta}")
+    for e in errores: print(f"  ❌ {e}")
+    if not errores: print("  ✅ Sin pérdidas ni duplicados.")
+    return not errores
+
+def _nodo(carpeta, almacen, nodo, nodos, filas, barrera, sesiones):
+    """Un servidor de la aplicación. Entre paso y paso espera a los demás y comprueba qué ve de lo que escribieron."""
+    _entorno(carpeta, almacen)
+    import io
+    import pandas as pd
+    import datos
+
+    errores = []
+    def comprobar(condicion, texto):
+        if not condicion: errores.append(f"proceso {nodo}: {texto}")
+    equipo, siguiente = f"Equipo {nodo}", (nodo + 1) % nodos
+    datos.asegurar_archivos()
+    base = len(datos.cargar_asistencia())  # caché caliente antes de que escriban los demás
+    barrera.wait(ESPERA_MAXIMA)
+
+    comprobar(datos.autenticar(f"clave {nodo}") == equipo, "no reconoce su contraseña")
+    sesiones[nodo] = datos.abrir_sesion(equipo)
+    datos.encolar_asistencia(pd.DataFrame([
+        {"Fecha": "2026-02-01", "Equipo": equipo, "Nombre": f"Persona {i}", "Cedula": f"{nodo}-{i}", "Estado": "Asiste"}
+        for i in range(filas)]))
+    datos.guardar_personal(pd.DataFrame([{"Nombre": f"Persona {i}", "Cedula": f"{nodo}-{i}"} for i in range(filas)]), equipo)
+    ruta = datos.guardar_soporte(io.BytesIO(b"el mismo soporte desde todos los procesos"), "Persona 0", "2026-02-01")
+    datos.COLA.esperar(ESPERA_MAXIMA)
+    barrera.wait(ESPERA_MAXIMA)
+
+    comprobar(len(datos.cargar_asistencia()) == base + nodos * filas, "no ve todos los lotes de los demás")
+    empleados = datos.cargar_empleados()
+    comprobar(all((empleados['Equipo'] == f"Equipo {n}").sum() == filas for n in range(nodos)), "no ve el personal de los demás")
+    comprobar(datos.reanudar_sesion(sesiones[siguiente]) == f"Equipo {siguiente}", "no reconoce una sesión abierta en otro proceso")
+    comprobar(ruta is not None and os.path.exists(datos.ubicar_soporte(ruta)), "no encuentra el soporte")
+    barrera.wait(ESPERA_MAXIMA)
+
+    if nodo == 0:
+        config = datos.cargar_configuracion()
+        config[equipo] = {"password": "clave nueva", "inicio": "00:00", "fin": "23:59"}
+        datos.guardar_configuracion(config)
+    if nodo == nodos - 1: datos.cerrar_sesion(sesiones[nodo])
+    barrera.wait(ESPERA_MAXIMA)
+
+    comprobar(datos.autenticar("clave nueva") == "Equipo 0" and datos.autenticar("clave 0") is None, "no ve el cambio de contraseña")
+    comprobar(datos.reanudar_sesion(sesiones[0]) is None, "la sesión del Equipo 0 sigue valiendo tras cambiar su contraseña")
+    comprobar(datos.reanudar_sesion(sesiones[nodos - 1]) is None, f"la sesión del Equipo {nodos - 1} sigue valiendo tras cerrarla")
+    for e in errores: print(f"  ❌ {e}")
+    sys.exit(1 if errores else 0)
+
+def coherencia(procesos, filas, almacen, carpeta):
+    """Lo que escribe un proceso lo ven los demás en su siguiente lectura, sin reiniciar ni vaciar cachés a mano."""
+    _entorno(carpeta, almacen)
+    import datos
+    datos.guardar_configuracion({f"Equipo {n}": {"password": f"clave {n}", "inicio": "00:00", "fin": "23:59"} for n in range(procesos)})
+
+    ctx = multiprocessing.get_context("spawn")
+    barrera, gestor = ctx.Barrier(procesos), ctx.Manager()
+    sesiones = gestor.dict()
+    ps = [ctx.Process(target=_nodo, args=(carpeta, almacen, n, procesos, filas, barrera, sesiones)) for n in range(procesos)]
+    t0 = time.perf_counter()
+    for p in ps: p.start()
+    for p in ps: p.join()
+    gestor.shutdown()
+
+    guardados = [n for _, _, archivos in os.walk(datos.CARPETA_SOPORTES) for n in archivos]
+    errores = []
+    if any(p.exitcode != 0 for p in ps): errores.append("algún proceso vio datos viejos o terminó con error")
+    if len(guardados) != 1: errores.append(f"soportes: {len(guardados)} archivos para un mismo contenido")
+    print(f"[{almacen}] coherencia entre {procesos} procesos en {time.perf_counter() - t0:.2f}s")
+    for e in errores: print(f"  ❌ {e}")
+    if not errores: print("  ✅ Cada proceso ve lo escrito por los demás.")
+    return not errores
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--procesos", type=int, default=5)
+    parser.add_argument("--hilos", type=int, default=4)
+    parser.add_argument("--lotes", type=int, default=25)
+    parser.add_argument("--filas", type=int, default=5)
+    parser.add_argument("--almacen", choices=["csv", "sqlite", "parquet"], default="csv")
+    parser.add_argument("--carpeta", help="Carpeta de datos (por defecto, una temporal nueva).")
+    args = parser.parse_args()
+    carpeta = os.path.abspath(args.carpeta or tempfile.mkdtemp(prefix="estres_asistencia_"))
+    os.environ.setdefault("ASISTENCIA_CLAVE", secrets.token_hex(32))  # la heredan los procesos hijos
+    ok = ejecutar(args.procesos, args.hilos, args.lotes, args.filas, args.almacen, carpeta)
+    ok = coherencia(args.procesos, args.filas, args.almacen, carpeta) and ok
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,70 @@
+"""
+Exportación del reporte de asistencia (CSV, CSV comprimido o Excel).
+
+El archivo se arma solo cuando alguien pulsa "Descargar" (st.download_button acepta una
+función) y se escribe por bloques a medida que llegan del almacén: nunca existen a la vez
+el DataFrame completo, el texto CSV y los bytes. La salida va a un temporal que pasa de
+memoria a disco por encima de MAX_EN_MEMORIA; al final se entrega como bytes, que es lo que
+st.download_button acepta de una función (un archivo temporal lo rechaza).
+"""
+import gzip
+import tempfile
+from esquema import COLS_ASISTENCIA
+from metricas import contar
+
+try:
+    import xlsxwriter
+except ImportError:
+    xlsxwriter = None
+
+COLS_REPORTE = [c for c in COLS_ASISTENCIA if c != "Registro"]
+FILAS_POR_BLOQUE = 50_000
+MAX_EN_MEMORIA = 8 * 1024 * 1024
+MAX_FILAS_HOJA = 1_048_575  # límite de Excel, sin contar la cabecera
+
+# formato -> (etiqueta, nombre de archivo, tipo MIME)
+FORMATOS = {
+    "csv": ("CSV", "reporte.csv", "text/csv"),
+    "csv.gz": ("CSV comprimido (.gz)", "reporte.csv.gz", "application/gzip"),
+    "xlsx": ("Excel (.xlsx)", "reporte.xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+def formatos_disponibles():
+    """Excel solo si está instalado xlsxwriter."""
+    return [f for f in FORMATOS if f != "xlsx" or xlsxwriter is not None]
+
+def _escribir_csv(bloques, salida):
+    cabecera = True
+    for df in bloques:
+        salida.write(df.to_csv(index=False, header=cabecera).encode('utf-8'))
+        contar(filas_escritas=len(df))
+        cabecera = False
+    if cabecera: salida.write((",".join(COLS_REPORTE) + "\n").encode('utf-8'))
+
+def _escribir_xlsx(bloques, salida):
+    # constant_memory: cada fila se vuelca a disco al escribirla, no se guarda la hoja entera
+    libro = xlsxwriter.Workbook(salida, {"constant_memory": True, "strings_to_numbers": False})
+    hoja, fila = None, MAX_FILAS_HOJA
+    for df in bloques:
+        contar(filas_escritas=len(df))
+        for valores in df.itertuples(index=False, name=None):
+            if fila >= MAX_FILAS_HOJA:
+                hoja, fila = libro.add_worksheet(), 0
+                hoja.write_row(0, 0, COLS_REPORTE)
+            fila += 1
+            hoja.write_row(fila, 0, valores)
+    if hoja is None: libro.add_worksheet().write_row(0, 0, COLS_REPORTE)
+    libro.close()
+
+def exportar(bloques, formato="csv"):
+    """Escribe los bloques (DataFrames de texto) en el formato pedido y devuelve los bytes del archivo."""
+    bloques = (df.reindex(columns=COLS_REPORTE, fill_value="") for df in bloques)
+    if formato == "xlsx" and xlsxwriter is None: raise ImportError("La exportación a Excel necesita xlsxwriter (pip install xlsxwriter).")
+    with tempfile.SpooledTemporaryFile(max_size=MAX_EN_MEMORIA) as salida:
+        if formato == "xlsx": _escribir_xlsx(bloques, salida)
+        elif formato == "csv.gz":
+            with gzip.GzipFile(fileobj=salida, mode="wb") as comprimido: _escribir_csv(bloques, comprimido)
+        else: _escribir_csv(bloques, salida)
+        contar(bytes_escritos=salida.tell())
+        salida.seek(0)
+        return salida.read()
@@ -0,0 +1,125 @@
+"""
+Importación masiva de asistencia (días y equipos atrasados) desde CSV, Excel o un DataFrame.
+
+Todas las filas se validan a la vez (operaciones vectorizadas, sin recorrerlas una por una)
+contra la base de empleados y los estados permitidos; se descartan las que ya tienen registro
+ese día y las válidas se guardan en una sola escritura (`datos.importar_asistencia`). Cada
+fila rechazada sale con su número de fila y el `Motivo`.
+
+    python importar.py atrasados.xlsx                 # valida e importa
+    python importar.py atrasados.csv --simular        # solo valida
+    python importar.py atrasados.csv --rechazos rechazos.csv
+
+Columnas: Fecha, Equipo, Estado y Cedula (o Nombre, si la persona no tiene cédula en la base);
+Observacion es opcional. Fechas como AAAA-MM-DD o DD/MM/AAAA.
+"""
+import pandas as pd
+from esquema import COLS_ASISTENCIA, ESTADOS, FORMATO_FECHA, clave_empleado
+
+try:
+    import openpyxl
+except ImportError:
+    openpyxl = None
+
+COLS_MINIMAS = ["Fecha", "Equipo", "Estado"]
+
+def formatos_disponibles():
+    """Excel solo si está instalado openpyxl."""
+    return ["csv", "xlsx"] if openpyxl is not None else ["csv"]
+
+def leer_archivo(archivo, nombre=None):
+    """CSV (con coma o punto y coma) o XLSX -> DataFrame de texto. `archivo` es una ruta o un archivo abierto."""
+    nombre = nombre or getattr(archivo, "name", str(archivo))
+    if nombre.lower().endswith(".xlsx"):
+        if openpyxl is None: raise ImportError("Importar Excel necesita openpyxl (pip install openpyxl).")
+        df = pd.read_excel(archivo, dtype=str)
+    else: df = pd.read_csv(archivo, dtype=str, keep_default_na=False, sep=None, engine="python", encoding="utf-8-sig")
+    df.columns = [str(c).strip() for c in df.columns]
+    return df.fillna("")
+
+def columnas_faltantes(df):
+    faltan = [c for c in COLS_MINIMAS if c not in df.columns]
+    if "Cedula" not in df.columns and "Nombre" not in df.columns: faltan.append("Cedula (o Nombre)")
+    return faltan
+
+def normalizar(df):
+    """Texto sin espacios sobrantes, fecha en FORMATO_FECHA (si se entiende) y estado con su escritura oficial."""
+    df = pd.DataFrame({c: df[c].astype(str).str.strip() if c in df.columns else "" for c in COLS_ASISTENCIA}, index=df.index)
+    df['Cedula'] = df['Cedula'].str.replace(r"\.0$", "", regex=True)  # Excel guarda las cédulas como número
+    fechas = pd.to_datetime(df['Fecha'], format="ISO8601", errors="coerce")
+    fechas = fechas.fillna(pd.to_datetime(df['Fecha'], format="%d/%m/%Y", errors="coerce"))
+    df['Fecha'] = fechas.dt.strftime(FORMATO_FECHA).fillna(df['Fecha'])
+    df['Estado'] = df['Estado'].str.lower().map({e.lower(): e for e in ESTADOS}).fillna(df['Estado'])
+    df['Registro'] = ""  # cada fila importada es un registro nuevo
+    return df
+
+def fecha_valida(df):
+    return pd.to_datetime(df['Fecha'], format=FORMATO_FECHA, errors="coerce").notna()
+
+def _llave(*columnas):
+    llave = columnas[0].astype(str)
+    for c in columnas[1:]: llave = llave + "|" + c.astype(str)
+    return llave
+
+def validar(df, df_empleados, df_existente):
+    """
+    Separa `df` (ya normalizado) en aceptadas y rechazadas (con `Fila` y `Motivo`; vale el primer
+    motivo). Nombre y cédula de las aceptadas se completan desde la base de empleados.
+    `df_existente`: lo ya registrado en las fechas y equipos del archivo (Fecha, Equipo, Nombre, Cedula).
+    """
+    df = df.copy()
+    motivo = pd.Series("", index=df.index)
+    def rechazar(mascara, texto): motivo.loc[mascara & (motivo == "")] = texto
+
+    rechazar(~fecha_valida(df), "Fecha inválida")
+    rechazar(~df['Estado'].isin(ESTADOS), "Estado no permitido")
+
+    # Empleado: por (Equipo, Cedula); sin cédula, por (Equipo, Nombre) si el nombre no se repite en el equipo
+    emp = df_empleados[["Equipo", "Nombre", "Cedula"]].astype(str).apply(lambda s: s.str.strip())
+    emp = emp.assign(por_cedula=_llave(emp['Equipo'], emp['Cedula']), por_nombre=_llave(emp['Equipo'], emp['Nombre']))
+    con_cedula = emp[emp['Cedula'] != ""].drop_duplicates("por_cedula").set_index("por_cedula")
+    repeticiones = emp['por_nombre'].value_counts()
+    unicos = emp[emp['por_nombre'].map(repeticiones) == 1].set_index("por_nombre")
+    por_cedula = _llave(df['Equipo'], df['Cedula'])
+    por_nombre = _llave(df['Equipo'], df['Nombre'])
+    usa_cedula = df['Cedula'] != ""
+
+    rechazar(~df['Equipo'].isin(emp['Equipo']), "Equipo desconocido")
+    rechazar(usa_cedula & ~por_cedula.isin(con_cedula.index), "Cédula no está en la base del equipo")
+    rechazar(~usa_cedula & por_nombre.isin(repeticiones.index[repeticiones > 1]), "Nombre repetido en el equipo: indique la cédula")
+    rechazar(~usa_cedula & ~por_nombre.isin(unicos.index), "Nombre no está en la base del equipo")
+
+    ok = motivo == ""
+    df.loc[ok & usa_cedula, 'Nombre'] = por_cedula[ok & usa_cedula].map(con_cedula['Nombre'])
+    df.loc[ok & ~usa_cedula, 'Cedula'] = por_nombre[ok & ~usa_cedula].map(unicos['Cedula'])
+
+    # Duplicados: dentro del archivo y contra lo ya guardado, por (Fecha, Equipo, empleado)
+    llave = _llave(df['Fecha'], df['Equipo'], clave_empleado(df))
+    rechazar(llave[ok].duplicated().reindex(df.index, fill_value=False), "Repetido en el archivo")
+    if not df_existente.empty:
+        existentes = _llave(df_existente['Fecha'], df_existente['Equipo'], clave_empleado(df_existente))
+        rechazar(llave.isin(existentes), "Ya tiene registro ese día")
+
+    rechazadas = df[motivo != ""].assign(Motivo=motivo[motivo != ""])
+    rechazadas.insert(0, "Fila", rechazadas.index + 2)  # +1 por la cabecera, +1 porque las hojas cuentan desde 1
+    return df.loc[motivo == "", COLS_ASISTENCIA].reset_index(drop=True), rechazadas.drop(columns="Registro").reset_index(drop=True)
+
+if __name__ == "__main__":
+    import argparse
+    import datos
+
+    parser = argparse.ArgumentParser(description="Importación masiva de asistencia desde CSV o Excel.")
+    parser.add_argument("archivo")
+    parser.add_argument("--simular", action="store_true", help="Solo valida; no guarda nada.")
+    parser.add_argument("--rechazos", help="Guarda las filas rechazadas, con su motivo, en este CSV.")
+    args = parser.parse_args()
+
+    df = leer_archivo(args.archivo)
+    faltan = columnas_faltantes(df)
+    if faltan: raise SystemExit(f"❌ Faltan columnas: {', '.join(faltan)}")
+    datos.asegurar_archivos()
+    aceptadas, rechazadas = datos.importar_asistencia(df, simular=args.simular)
+    datos.COLA.esperar()  # lotes recuperados de una ejecución anterior
+    print(f"{'🔎 Válidas' if args.simular else '✅ Importadas'}: {len(aceptadas)}   ❌ Rechazadas: {len(rechazadas)}")
+    for motivo, n in rechazadas['Motivo'].value_counts().items(): print(f"   {n:>6}  {motivo}")
+    if args.rechazos and not rechazadas.empty: rechazadas.to_csv(args.rechazos, index=False)
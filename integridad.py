@@ -0,0 +1,204 @@
+"""
+Sumas de verificación y respaldo por archivo, para reparar solo lo que se dañó.
+
+Cada archivo de datos se publica con su suma ("crc32-tamaño"): los segmentos del diario la
+llevan en el nombre y los demás en `archivo.suma`, que se escribe antes de publicar el archivo.
+Cada versión se respalda en una carpeta con la suma en el nombre, así que nunca se reescribe y
+se hace una sola vez, al escribir: un lote nuevo copia su segmento, no el historial. Una versión
+que sale de la anterior por un cambio que se puede repetir (compactar unos segmentos, reemplazar
+un equipo) no se copia entera: se guarda el cambio, y solo cada MAX_CADENA versiones una copia
+completa. Así escribir no cuesta una copia del archivo y reparar es, como mucho, copiar y repetir
+unos pocos cambios.
+
+Verificar es comparar el tamaño (un stat) y el CRC32 (leer bytes, sin parsear CSV); el CRC solo
+se recalcula si el archivo cambió desde la última comprobación del proceso. Reparar rehace desde
+su respaldo únicamente los archivos cuya suma no coincide.
+"""
+import json
+import os
+import re
+import shutil
+import time
+import zlib
+from archivos import firma_archivo, ruta_temporal
+
+BLOQUE = 1 << 20
+MAX_CADENA = 8  # versiones seguidas guardadas como cambio antes de volver a copiar el archivo entero
+PATRON_SUMA = re.compile(r"[0-9a-f]{8}-[0-9]+")
+
+def suma_archivo(ruta):
+    """"crc32-tamaño" del contenido, leído por bloques."""
+    crc, tamano = 0, 0
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(BLOQUE), b""):
+            crc, tamano = zlib.crc32(bloque, crc), tamano + len(bloque)
+    return f"{crc:08x}-{tamano}"
+
+def tamano_de(suma):
+    return int(suma.rsplit("-", 1)[1])
+
+def ruta_suma(archivo):
+    return f"{archivo}.suma"
+
+def leer_suma(archivo):
+    """Suma esperada de `archivo`, o None si se escribió antes de existir las sumas."""
+    try:
+        with open(ruta_suma(archivo), 'r') as f: suma = f.read().strip()
+    except OSError: return None
+    return suma if PATRON_SUMA.fullmatch(suma) else None
+
+def escribir_suma(destino, suma):
+    tmp = ruta_temporal(destino)
+    with open(tmp, 'w') as f: f.write(suma)
+    os.replace(tmp, destino)
+
+class Respaldo:
+    """
+    Respaldo de cada versión de un archivo: una copia (`carpeta/<nombre>.<suma>`) o un cambio sobre
+    la versión anterior (`<nombre>.<suma>.cambio`, JSON con "desde" y lo que `rehacer` necesita).
+    Como la suma va en el nombre, nada de esto se reescribe y sirve mientras esa siga siendo la
+    esperada. `rehacer(anterior, cambio, destino)` escribe en `destino` el resultado de aplicar el
+    cambio al archivo `anterior`; sin él solo se guardan copias. Quien escribe en el archivo original
+    tiene su bloqueo; `revisar` y `reparar` lo necesitan también.
+    """
+
+    def __init__(self, carpeta, rehacer=None):
+        self.carpeta = carpeta
+        self.rehacer = rehacer
+        self._comprobados = {}  # ruta -> (firma, suma) ya verificada en este proceso
+
+    def copia(self, nombre, suma):
+        return os.path.join(self.carpeta, f"{nombre}.{suma}")
+
+    def ruta_cambio(self, nombre, suma):
+        return f"{self.copia(nombre, suma)}.cambio"
+
+    def leer_cambio(self, nombre, suma):
+        try:
+            with open(self.ruta_cambio(nombre, suma), 'r') as f: cambio = json.load(f)
+        except (OSError, ValueError): return None
+        return cambio if isinstance(cambio, dict) and PATRON_SUMA.fullmatch(str(cambio.get("desde"))) else None
+
+    def cadena(self, nombre, suma):
+        """
+        Versiones de las que depende la de `suma`, empezando por ella: [(suma, cambio)], donde el
+        último eslabón es el que tiene copia (cambio None). None si la cadena está rota.
+        """
+        eslabones = []
+        for _ in range(MAX_CADENA + 1):
+            if os.path.exists(self.copia(nombre, suma)): return eslabones + [(suma, None)]
+            cambio = self.leer_cambio(nombre, suma)
+            if cambio is None: return None
+            eslabones.append((suma, cambio))
+            suma = cambio["desde"]
+        return None
+
+    def cambios(self):
+        """Todos los cambios guardados (para saber qué archivos auxiliares siguen haciendo falta)."""
+        try: nombres = os.listdir(self.carpeta)
+        except OSError: return []
+        cambios = []
+        for n in nombres:
+            if not n.endswith(".cambio"): continue
+            try:
+                with open(os.path.join(self.carpeta, n), 'r') as f: cambios.append(json.load(f))
+            except (OSError, ValueError): pass
+        return cambios
+
+    def guardar(self, ruta, nombre, suma, cambio=None):
+        """
+        Respalda `ruta`, cuyo contenido tiene `suma`, como esa versión de `nombre`. Con `cambio`
+        ({"desde": suma anterior, ...}) se guarda solo el cambio, salvo que la versión anterior no
+        tenga respaldo o la cadena ya tenga MAX_CADENA eslabones: entonces se copia el archivo.
+        """
+        destino = self.copia(nombre, suma)
+        if os.path.exists(destino) or os.path.exists(self.ruta_cambio(nombre, suma)): return
+        os.makedirs(self.carpeta, exist_ok=True)
+        if cambio is not None and self.rehacer is not None:
+            anteriores = self.cadena(nombre, cambio["desde"])
+            if anteriores is not None and len(anteriores) <= MAX_CADENA:  # la anterior y sus cambios
+                destino = self.ruta_cambio(nombre, suma)
+                tmp = ruta_temporal(destino)
+                with open(tmp, 'w') as f: json.dump(cambio, f)
+                os.replace(tmp, destino)
+                return
+        tmp = ruta_temporal(destino)
+        shutil.copyfile(ruta, tmp)
+        os.replace(tmp, destino)  # sin fsync: una copia a medias no pasa la verificación y no se usa
+
+    def reconstruir(self, nombre, suma, destino):
+        """Escribe en `destino` la versión `suma`: desde su copia o rehaciendo su cambio sobre la anterior. True si coincide la suma."""
+        copia = self.copia(nombre, suma)
+        if self.comprobar(copia, suma, completa=True):
+            shutil.copyfile(copia, destino)
+            return True
+        cambio = self.leer_cambio(nombre, suma)
+        if cambio is None or self.rehacer is None: return False
+        anterior = ruta_temporal(f"{destino}.{cambio['desde']}")
+        try:
+            if not self.reconstruir(nombre, cambio["desde"], anterior): return False
+            self.rehacer(anterior, cambio, destino)
+        finally:
+            if os.path.exists(anterior): os.remove(anterior)
+        return suma_archivo(destino) == suma
+
+    def comprobar(self, ruta, suma, completa=False):
+        """
+        True si `ruta` tiene la suma esperada. El tamaño se mira siempre; el CRC32, si el archivo
+        cambió desde la última comprobación de este proceso o con `completa`.
+        """
+        firma = firma_archivo(ruta)
+        if firma is None or firma[1] != tamano_de(suma): return False
+        if not completa and self._comprobados.get(ruta) == (firma, suma): return True
+        if suma_archivo(ruta) != suma: return False
+        self._comprobados[ruta] = (firma, suma)
+        return True
+
+    def reparar(self, ruta, nombre, suma):
+        """
+        Repone `ruta` con su versión reconstruida (ver `reconstruir`) si se obtiene con la suma
+        esperada. Lo que había se deja como `ruta.dañado` (un enlace, sin copiarlo) por si era una
+        edición hecha a mano.
+        """
+        nuevo = ruta_temporal(ruta)
+        try: ok = self.reconstruir(nombre, suma, nuevo)
+        except Exception: ok = False  # un cambio que ya no se puede rehacer: no hay respaldo válido
+        if not ok:
+            if os.path.exists(nuevo): os.remove(nuevo)
+            return False
+        if os.path.exists(ruta):
+            tmp = ruta_temporal(f"{ruta}.dañado")
+            try:
+                os.link(ruta, tmp)
+                os.replace(tmp, f"{ruta}.dañado")
+            except OSError: pass
+        os.replace(nuevo, ruta)
+        return True
+
+    def revisar(self, ruta, nombre, suma, completa=False):
+        """"bien", "reparado" o "dañado" (la suma no coincide y no hay respaldo válido)."""
+        if self.comprobar(ruta, suma, completa): return "bien"
+        return "reparado" if self.reparar(ruta, nombre, suma) else "dañado"
+
+    def olvidar(self, nombre, suma):
+        for ruta in (self.copia(nombre, suma), self.ruta_cambio(nombre, suma)):
+            try: os.remove(ruta)
+            except OSError: pass
+
+    def podar(self, vigentes, antiguedad=0):
+        """
+        Borra los respaldos que no hacen falta para ninguna versión vigente ({(nombre, suma)}), contando
+        la cadena de cada una. Los de menos de `antiguedad` segundos se respetan: pueden ser de un
+        archivo que otro proceso está publicando.
+        """
+        conservar = set()
+        for n, s in vigentes:
+            for suma, _ in self.cadena(n, s) or [(s, None)]: conservar |= {f"{n}.{suma}", f"{n}.{suma}.cambio"}
+        try: nombres = os.listdir(self.carpeta)
+        except OSError: return
+        limite = time.time() - antiguedad
+        for n in nombres:
+            ruta = os.path.join(self.carpeta, n)
+            try:
+                if n not in conservar and os.path.getmtime(ruta) <= limite: os.remove(ruta)
+            except OSError: pass
@@ -0,0 +1,125 @@
+"""
+Métricas ligeras de rendimiento: tiempo, llamadas, filas y bytes por operación.
+
+    with medir("cargar_empleados"):
+        ...
+        contar(filas_leidas=len(df), bytes_leidos=tamaño)
+
+    @instrumentar("guardar_asistencia")
+    def guardar_asistencia(df): ...
+
+Cada medida se acumula en el agregado del proceso y, si la app lo activó con
+`usar_sesion`, en el de la sesión de Streamlit en curso. Las medidas anidadas suman
+sus filas y bytes también a las que las contienen. Exportable como JSON o como texto
+de Prometheus para el monitoreo.
+"""
+import contextvars
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from functools import wraps
+
+MUESTRAS_POR_OPERACION = 1000  # para los percentiles; los totales no se truncan
+CONTADORES = ["filas_leidas", "filas_escritas", "bytes_leidos", "bytes_escritos"]
+
+class Metricas:
+    """Agregado por operación, seguro entre hilos."""
+
+    def __init__(self):
+        self._ops = {}
+        self._lock = threading.Lock()
+        self.desde = time.time()
+
+    def registrar(self, nombre, segundos, cantidades):
+        with self._lock:
+            op = self._ops.get(nombre)
+            if op is None:
+                op = self._ops[nombre] = {"llamadas": 0, "segundos": 0.0, "max": 0.0,
+                                          "muestras": deque(maxlen=MUESTRAS_POR_OPERACION), **dict.fromkeys(CONTADORES, 0)}
+            op["llamadas"] += 1
+            op["segundos"] += segundos
+            op["max"] = max(op["max"], segundos)
+            op["muestras"].append(segundos)
+            for k, v in cantidades.items(): op[k] += v
+
+    def reiniciar(self):
+        with self._lock: self._ops.clear()
+        self.desde = time.time()
+
+    def resumen(self):
+        """Una fila por operación, de la que más tiempo acumula a la que menos."""
+        with self._lock: ops = {n: {**o, "muestras": sorted(o["muestras"])} for n, o in self._ops.items()}
+        filas = []
+        for nombre, o in ops.items():
+            m = o["muestras"]
+            filas.append({"operacion": nombre, "llamadas": o["llamadas"], "total_ms": o["segundos"] * 1000,
+                          "media_ms": o["segundos"] * 1000 / o["llamadas"],
+                          "p50_ms": m[len(m) // 2] * 1000, "p95_ms": m[min(len(m) - 1, int(len(m) * 0.95))] * 1000,
+                          "max_ms": o["max"] * 1000, **{k: o[k] for k in CONTADORES}})
+        return sorted(filas, key=lambda f: f["total_ms"], reverse=True)
+
+PROCESO = Metricas()
+_SESION = contextvars.ContextVar("metricas_sesion", default=None)
+_ABIERTAS = contextvars.ContextVar("metricas_abiertas", default=())
+
+def usar_sesion(metricas):
+    """Las medidas de este hilo (el rerun de una sesión) también se acumulan en `metricas`."""
+    _SESION.set(metricas)
+
+@contextmanager
+def medir(nombre):
+    cantidades = dict.fromkeys(CONTADORES, 0)
+    token = _ABIERTAS.set(_ABIERTAS.get() + (cantidades,))
+    t0 = time.perf_counter()
+    try: yield cantidades
+    finally:
+        segundos = time.perf_counter() - t0
+        _ABIERTAS.reset(token)
+        PROCESO.registrar(nombre, segundos, cantidades)
+        sesion = _SESION.get()
+        if sesion is not None: sesion.registrar(nombre, segundos, cantidades)
+
+def contar(**cantidades):
+    """Suma filas/bytes a todas las medidas abiertas en este contexto."""
+    for abierta in _ABIERTAS.get():
+        for k, v in cantidades.items(): abierta[k] += int(v)
+
+def instrumentar(nombre):
+    """Decorador: mide cada llamada; si devuelve un DataFrame, cuenta sus filas como leídas."""
+    def decorador(funcion):
+        @wraps(funcion)
+        def envoltura(*args, **kwargs):
+            with medir(nombre):
+                resultado = funcion(*args, **kwargs)
+                if hasattr(resultado, "columns"): contar(filas_leidas=len(resultado))
+                return resultado
+        return envoltura
+    return decorador
+
+# --- EXPORTACIÓN ---
+
+def a_json(metricas_proceso=PROCESO, metricas_sesion=None):
+    datos = {"generado": time.time(), "proceso": {"desde": metricas_proceso.desde, "operaciones": metricas_proceso.resumen()}}
+    if metricas_sesion is not None:
+        datos["sesion"] = {"desde": metricas_sesion.desde, "operaciones": metricas_sesion.resumen()}
+    return json.dumps(datos, ensure_ascii=False, indent=2)
+
+def a_prometheus(metricas=PROCESO, prefijo="asistencia"):
+    """Formato de exposición de texto de Prometheus (contadores + summary de latencia)."""
+    filas = metricas.resumen()
+    lineas = []
+    def serie(nombre, tipo, ayuda, valores):
+        lineas.append(f"# HELP {prefijo}_{nombre} {ayuda}")
+        lineas.append(f"# TYPE {prefijo}_{nombre} {tipo}")
+        lineas.extend(f"{prefijo}_{nombre}{{{etiquetas}}} {valor}" for etiquetas, valor in valores)
+    etiqueta = lambda f: 'operacion="' + f["operacion"].replace("\\", "\\\\").replace('"', '\\"') + '"'
+    serie("operacion_segundos", "summary", "Duración de cada operación.",
+          [(f'{etiqueta(f)},quantile="{q}"', f[c] / 1000) for f in filas for q, c in [("0.5", "p50_ms"), ("0.95", "p95_ms")]])
+    lineas.extend(f"{prefijo}_operacion_segundos_sum{{{etiqueta(f)}}} {f['total_ms'] / 1000}" for f in filas)
+    lineas.extend(f"{prefijo}_operacion_segundos_count{{{etiqueta(f)}}} {f['llamadas']}" for f in filas)
+    for contador in CONTADORES:
+        serie(f"{contador}_total", "counter", f"{contador.replace('_', ' ').capitalize()} por operación.",
+              [(etiqueta(f), f[contador]) for f in filas])
+    return "\n".join(lineas) + "\n"
@@ -0,0 +1,98 @@
+"""
+Almacén de soportes (fotos o PDF que acompañan una llegada tarde o una incapacidad).
+
+Cada archivo se guarda con el SHA-256 de su contenido como nombre
+(`soportes_img/ab/ab12….jpg`): subir dos veces la misma foto no ocupa el doble y dos
+personas con el mismo nombre y fecha ya no se pisan. La subida se copia a disco por
+bloques mientras se calcula el hash y se publica con os.replace, así nunca queda un
+soporte a medias.
+
+Para previsualizar se usa una miniatura JPEG que se genera la primera vez y queda en
+`soportes_img/miniaturas/`; el original solo se lee al pulsar "Descargar". Las
+miniaturas necesitan Pillow; sin él se muestra el original como antes.
+"""
+import hashlib
+import mimetypes
+import os
+from almacen import firma_archivo, ruta_temporal
+from metricas import medir, contar
+
+try:
+    from PIL import Image, ImageOps
+except ImportError:
+    Image = None
+
+TAMAÑO_BLOQUE = 1024 * 1024
+ANCHO_MINIATURA = 300
+CALIDAD_MINIATURA = 80
+EXTENSIONES_IMAGEN = {"png", "jpg", "jpeg", "gif", "webp", "bmp"}
+
+def extension(nombre):
+    return nombre.rsplit('.', 1)[-1].lower() if '.' in os.path.basename(nombre) else "bin"
+
+def ruta_soporte(carpeta, huella, ext):
+    """Subcarpeta por los dos primeros caracteres del hash para no acumular miles de archivos en una."""
+    return os.path.join(carpeta, huella[:2], f"{huella}.{ext}")
+
+def guardar(archivo, carpeta):
+    """
+    Copia un archivo subido (cualquier objeto con .read, como el de st.file_uploader) al
+    almacén y devuelve su ruta. Si ya había uno con el mismo contenido, se reutiliza.
+    """
+    ext = extension(getattr(archivo, "name", ""))
+    os.makedirs(carpeta, exist_ok=True)
+    tmp = ruta_temporal(os.path.join(carpeta, "subida"))
+    huella, total = hashlib.sha256(), 0
+    if hasattr(archivo, "seek"): archivo.seek(0)
+    try:
+        with open(tmp, "wb") as f:
+            while bloque := archivo.read(TAMAÑO_BLOQUE):
+                huella.update(bloque)
+                f.write(bloque)
+                total += len(bloque)
+            f.flush()
+            os.fsync(f.fileno())
+        destino = ruta_soporte(carpeta, huella.hexdigest(), ext)
+        if os.path.exists(destino): os.remove(tmp)  # mismo contenido ya guardado
+        else:
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            os.replace(tmp, destino)
+            contar(bytes_escritos=total)
+        return destino
+    except BaseException:
+        try: os.remove(tmp)
+        except OSError: pass
+        raise
+
+def miniatura(ruta, carpeta, ancho=ANCHO_MINIATURA):
+    """
+    Ruta de una versión reducida de la imagen `ruta`, generada la primera vez y reutilizada
+    mientras el original no cambie. None si no es imagen, no existe o falta Pillow.
+    """
+    if Image is None or extension(ruta) not in EXTENSIONES_IMAGEN: return None
+    firma = firma_archivo(ruta)
+    if firma is None: return None
+    clave = hashlib.sha1(f"{os.path.normpath(ruta)}|{firma}|{ancho}".encode()).hexdigest()
+    destino = os.path.join(carpeta, "miniaturas", f"{clave}.jpg")
+    if os.path.exists(destino): return destino
+    try:
+        with medir("generar_miniatura"), Image.open(ruta) as original:
+            original.draft("RGB", (ancho, ancho))  # JPEG: decodifica ya reducido, no a resolución completa
+            img = ImageOps.exif_transpose(original)  # fotos de celular giradas
+            img.thumbnail((ancho, ancho * 4))
+            os.makedirs(os.path.dirname(destino), exist_ok=True)
+            tmp = ruta_temporal(destino)
+            img.convert("RGB").save(tmp, "JPEG", quality=CALIDAD_MINIATURA, optimize=True)
+            contar(bytes_leidos=firma[1], bytes_escritos=os.path.getsize(tmp))
+            os.replace(tmp, destino)
+        return destino
+    except Exception: return None
+
+def leer(ruta):
+    """Contenido completo del soporte. Pensado para pasarse como función a st.download_button."""
+    with open(ruta, "rb") as f: contenido = f.read()
+    contar(bytes_leidos=len(contenido))
+    return contenido
+
+def tipo_mime(ruta):
+    return mimetypes.guess_type(ruta)[0] or "application/octet-stream"
@@ -0,0 +1,49 @@
+"""
+Pruebas de los almacenes: cada una trabaja en una carpeta temporal propia y se repite con
+CSV, SQLite y Parquet (este último solo si pyarrow está instalado).
+
+    python -m pytest -q tests
+"""
+import os
+import sys
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if RAIZ not in sys.path: sys.path.insert(0, RAIZ)
+
+ALMACENES = ["csv", "sqlite", "parquet"]
+
+def crear(tipo, carpeta):
+    """Almacén `tipo` con sus archivos dentro de `carpeta`, como lo arma datos.py."""
+    from almacen import crear_almacen
+    return crear_almacen(tipo, os.path.join(carpeta, "asistencia_historica.csv"), os.path.join(carpeta, "base_datos_empleados.csv"),
+                         os.path.join(carpeta, "asistencia.db"), os.path.join(carpeta, "asistencia_historica.parquet"))
+
+def lote(equipo, filas, prefijo="", fecha="2026-01-01", estado="Asiste"):
+    """Lote como lo deja datos.py antes de guardarlo: todas las columnas, `Registro` vacío."""
+    import pandas as pd
+    return pd.DataFrame([{"Fecha": fecha, "Equipo": equipo, "Nombre": f"Persona {prefijo}{i}", "Cedula": f"{prefijo}{i}",
+                          "Estado": estado, "Observacion": "", "Soporte": "", "Registro": ""} for i in range(filas)])
+
+@pytest.fixture(params=ALMACENES)
+def tipo(request):
+    if request.param == "parquet": pytest.importorskip("pyarrow")
+    return request.param
+
+@pytest.fixture
+def almacen(tipo, tmp_path):
+    a = crear(tipo, str(tmp_path))
+    a.preparar()
+    return a
+
+@pytest.fixture
+def conf(tmp_path, monkeypatch):
+    """configuracion.py con sus archivos en `tmp_path`, la clave de huellas en el entorno y un solo equipo (sin ADMIN)."""
+    import json
+    import configuracion
+    monkeypatch.setenv(configuracion.VARIABLE_CLAVE, "ab" * 32)
+    monkeypatch.setattr(configuracion, "ARCHIVO_PASSWORDS", str(tmp_path / "config_passwords_v4.json"))
+    monkeypatch.setattr(configuracion, "ARCHIVO_CLAVE_ANTERIOR", str(tmp_path / "config_clave.key"))
+    monkeypatch.setattr(configuracion, "CARPETA_SESIONES", str(tmp_path / "sesiones"))
+    with open(configuracion.ARCHIVO_PASSWORDS, "w") as f: json.dump({"A": {"password": "clave-a", "inicio": "00:00", "fin": "23:59"}}, f)
+    return configuracion
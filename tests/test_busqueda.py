@@ -0,0 +1,26 @@
+"""Búsqueda por nombre en el editor: mismo resultado en los tres almacenes, con tildes, eñes y comodines de SQL."""
+import pytest
+from conftest import lote
+
+NOMBRES = ["María Núñez", "MARÍA NÚÑEZ", "Maria Nunez", "Ana_Luz", "AnaXLuz", "100% Pérez", "100 Pérez", "Ñoño"]
+
+@pytest.fixture
+def buscar(almacen, tmp_path, monkeypatch):
+    import datos
+    monkeypatch.setattr(datos, "ALMACEN", almacen)
+    monkeypatch.setattr(datos, "ARCHIVO_ASISTENCIA", str(tmp_path / "asistencia_historica.csv"))
+    almacen.agregar_asistencia(lote("A", len(NOMBRES)).assign(Nombre=NOMBRES))
+    return lambda texto: sorted(datos.consultar_pagina(contiene=texto)[0]['Nombre'])
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("núñez", ["MARÍA NÚÑEZ", "María Núñez"]),   # SQLite solo pliega ASCII: Ú/ú y Ñ/ñ también deben coincidir
+    ("NÚÑEZ", ["MARÍA NÚÑEZ", "María Núñez"]),
+    ("ñoÑ", ["Ñoño"]),
+    ("_", ["Ana_Luz"]),                          # no es comodín
+    ("a_l", ["Ana_Luz"]),
+    ("%", ["100% Pérez"]),
+    ("0% p", ["100% Pérez"]),
+    ("\\", []),
+])
+def test_misma_busqueda_en_todos_los_almacenes(buscar, texto, esperado):
+    assert buscar(texto) == sorted(esperado)
@@ -0,0 +1,73 @@
+"""Cola de escritura: estados de un lote, reintentos y lo que queda en la carpeta tras una caída."""
+import os
+import threading
+import time
+import pytest
+import cola
+from almacen import escribir_csv_atomico
+from esquema import COLS_ASISTENCIA, asignar_registros
+from conftest import lote
+
+@pytest.fixture
+def carpeta(tmp_path):
+    return str(tmp_path / "cola_asistencia")
+
+def _cola(almacen, carpeta, escribir=None):
+    guardados = lambda registros: set(almacen.cargar_asistencia()["Registro"]) & set(registros)
+    return cola.ColaEscritura(carpeta, escribir or almacen.agregar_asistencia, guardados)
+
+def _dejar_en_carpeta(carpeta, df, ticket):
+    """Lo que deja un proceso que murió entre `encolar` y el final de la escritura."""
+    os.makedirs(carpeta, exist_ok=True)
+    escribir_csv_atomico(df, os.path.join(carpeta, ticket + cola.SUFIJO_LOTE))
+
+def _hasta(condicion, timeout=5):
+    limite = time.monotonic() + timeout
+    while not condicion() and time.monotonic() < limite: time.sleep(0.01)
+    return condicion()
+
+def test_encolar_y_esperar(almacen, carpeta):
+    seguir, intentos = threading.Event(), []
+    def escribir(df):
+        intentos.append(len(df))
+        seguir.wait(5)  # el almacén tarda: el lote sigue en la cola
+        almacen.agregar_asistencia(df)
+    c = _cola(almacen, carpeta, escribir)
+    ticket = c.encolar(lote("A", 3))
+    assert c.estado(ticket)[0] == "pendiente" and len(c.en_cola()) == 1
+    assert not c.esperar(timeout=0.05)
+    seguir.set()
+    assert c.esperar(timeout=10)
+    assert c.estado(ticket) == ("guardado", "") and not c.en_cola() and intentos == [3]
+    assert len(almacen.cargar_asistencia()) == 3 and not os.listdir(carpeta)
+
+def test_reintentando(almacen, carpeta, monkeypatch):
+    monkeypatch.setattr(cola, "ESPERA_REINTENTO", 0.2)
+    intentos = []
+    def escribir(df):
+        intentos.append(len(df))
+        if len(intentos) == 1: raise OSError("disco lleno")
+        almacen.agregar_asistencia(df)
+    c = _cola(almacen, carpeta, escribir)
+    ticket = c.encolar(lote("A", 2))
+    assert _hasta(lambda: c.estado(ticket) == ("reintentando", "disco lleno"))
+    assert c.esperar(timeout=10) and c.estado(ticket)[0] == "guardado"
+
+def test_recuperar_tras_caida(almacen, carpeta):
+    _dejar_en_carpeta(carpeta, asignar_registros(lote("A", 2, "x")[COLS_ASISTENCIA]), "00000000000000000002_b")
+    _dejar_en_carpeta(carpeta, asignar_registros(lote("B", 3, "y")[COLS_ASISTENCIA]), "00000000000000000001_a")
+    orden = []
+    c = _cola(almacen, carpeta, lambda df: (orden.append(df["Equipo"].iloc[0]), almacen.agregar_asistencia(df)))
+    assert c.recuperar() == 2 and c.recuperar() == 0  # la segunda llamada no los duplica
+    assert c.esperar(timeout=10)
+    assert orden == ["B", "A"] and len(almacen.cargar_asistencia()) == 5 and not os.listdir(carpeta)
+
+def test_recuperado_ya_escrito_no_se_duplica(almacen, carpeta):
+    df = asignar_registros(lote("A", 4)[COLS_ASISTENCIA])
+    almacen.agregar_asistencia(df.head(3))  # la caída llegó tras escribir parte del lote
+    _dejar_en_carpeta(carpeta, df, "00000000000000000001_a")
+    c = _cola(almacen, carpeta)
+    c.recuperar()
+    assert c.esperar(timeout=10)
+    guardado = almacen.cargar_asistencia()
+    assert sorted(guardado["Registro"]) == sorted(df["Registro"]) and guardado["Registro"].is_unique
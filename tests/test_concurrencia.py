@@ -0,0 +1,40 @@
+"""Varios procesos con varios hilos guardando a la vez: no se pierde ni se duplica ninguna fila (ver también estres.py)."""
+import multiprocessing
+import threading
+from conftest import crear, lote
+
+PROCESOS, HILOS, LOTES, FILAS = 3, 3, 8, 3
+
+def _trabajador(tipo, carpeta, proceso):
+    import almacen as mod_almacen
+    mod_almacen.MAX_SEGMENTOS_DIARIO = 5  # fuerza compactaciones en medio de la carga
+    mod_almacen.MAX_ARCHIVOS_PARTICION = 5
+    a = crear(tipo, carpeta)
+    a.preparar()
+    equipo = f"Equipo {proceso}"
+
+    def sesion(hilo):
+        for n in range(LOTES):
+            a.agregar_asistencia(lote(equipo, FILAS, prefijo=f"{proceso}-{hilo}-{n}-"))
+            if hilo == 0: a.reemplazar_equipo(equipo, lote(equipo, n + 1, prefijo=f"{proceso}-"))
+
+    hilos = [threading.Thread(target=sesion, args=(h,)) for h in range(HILOS)]
+    for h in hilos: h.start()
+    for h in hilos: h.join()
+
+def test_escrituras_concurrentes(tipo, tmp_path):
+    carpeta = str(tmp_path)
+    crear(tipo, carpeta).preparar()
+    ctx = multiprocessing.get_context("spawn")
+    procesos = [ctx.Process(target=_trabajador, args=(tipo, carpeta, p)) for p in range(PROCESOS)]
+    for p in procesos: p.start()
+    for p in procesos: p.join(300)
+    assert all(p.exitcode == 0 for p in procesos)
+
+    a = crear(tipo, carpeta)
+    df = a.cargar_asistencia()
+    assert len(df) == PROCESOS * HILOS * LOTES * FILAS
+    assert not df['Cedula'].duplicated().any()
+    assert df['Registro'].ne("").all() and not df['Registro'].duplicated().any()
+    empleados = a.cargar_empleados()
+    for p in range(PROCESOS): assert (empleados['Equipo'] == f"Equipo {p}").sum() == LOTES
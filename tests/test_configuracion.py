@@ -0,0 +1,50 @@
+"""Configuración: contraseñas cifradas al leerlas, ingreso por huella, franjas y contraseñas repetidas."""
+import json
+from datetime import time
+import pytest
+
+def _escribir(conf, datos):
+    with open(conf.ARCHIVO_PASSWORDS, "w") as f: json.dump(datos, f)
+
+def _archivo(conf):
+    with open(conf.ARCHIVO_PASSWORDS) as f: return json.load(f)
+
+def test_texto_plano_se_cifra(conf):
+    _escribir(conf, {"A": "clave-a", "B": {"password": "clave-b", "inicio": "06:00", "fin": "14:00"}})  # formato antiguo y plano
+    assert conf.autenticar("clave-a") == "A" and conf.autenticar("clave-b") == "B"
+    guardado = _archivo(conf)
+    assert all(conf.es_cifrada(d["password"]) and d["huella"] for d in guardado.values())
+    assert "clave-a" not in json.dumps(guardado) and guardado["A"]["inicio"] == "00:00"
+
+def test_autenticar(conf):
+    assert conf.autenticar("clave-a") == "A"
+    assert conf.autenticar("otra") is None and conf.autenticar("") is None
+    assert conf.autenticar(conf.CLAVE_MAESTRA) == "ADMIN"
+
+def test_en_horario(conf):
+    _escribir(conf, {"A": {"password": "a", "inicio": "06:00", "fin": "14:00"}, "B": {"password": "b", "inicio": "??", "fin": "14:00"}})
+    c = conf.configuracion()
+    assert c.en_horario("A", time(6, 0)) and c.en_horario("A", time(14, 0))
+    assert not c.en_horario("A", time(5, 59)) and not c.en_horario("A", time(14, 1))
+    assert c.en_horario("B", time(23, 0)) and c.en_horario("ADMIN", time(3, 0)) and c.en_horario("X", time(3, 0))
+
+def test_guardar_rechaza_repetidas(conf):
+    antes = _archivo(conf)
+    with pytest.raises(ValueError, match="repetida"):
+        conf.guardar_configuracion({"A": {"password": "igual"}, "B": {"password": "igual"}})
+    assert _archivo(conf) == antes
+    conf.guardar_configuracion({"A": {"password": "clave-a2"}, "B": {"password": "clave-b"}})
+    assert conf.autenticar("clave-a2") == "A" and conf.autenticar("clave-a") is None
+
+def test_huella_repetida_no_entra(conf):
+    _escribir(conf, {"A": "igual", "B": "igual", "C": "clave-c"})  # a mano, sin pasar por guardar_configuracion
+    with pytest.warns(UserWarning, match="A, B"):
+        assert list(conf.configuracion().ambiguas.values()) == [["A", "B"]]
+        assert conf.autenticar("igual") is None and conf.autenticar("clave-c") == "C"
+
+def test_sin_clave_no_entra_nadie(conf, monkeypatch):
+    monkeypatch.delenv(conf.VARIABLE_CLAVE)
+    monkeypatch.setattr(conf, "st", None)
+    with pytest.raises(conf.ClaveNoConfigurada): conf.autenticar("clave-a")
+    monkeypatch.setenv(conf.VARIABLE_CLAVE, "no es hex")
+    with pytest.raises(conf.ClaveNoConfigurada): conf.autenticar("clave-a")
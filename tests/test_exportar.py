@@ -0,0 +1,40 @@
+"""Exportación: lo que recibe st.download_button se convierte a bytes y vuelve a leerse igual."""
+import gzip
+import io
+import pandas as pd
+import pytest
+from conftest import lote
+
+FORMATOS = ["csv", "csv.gz", "xlsx"]
+
+@pytest.fixture
+def exportar_asistencia(almacen, tmp_path, monkeypatch):
+    import datos
+    monkeypatch.setattr(datos, "ALMACEN", almacen)
+    monkeypatch.setattr(datos, "ARCHIVO_ASISTENCIA", str(tmp_path / "asistencia_historica.csv"))
+    almacen.agregar_asistencia(pd.concat([lote("A", 3, "a", fecha="2026-01-01"), lote("B", 2, "b", fecha="2026-01-02", estado="Ausente")]))
+    return datos.exportar_asistencia
+
+def _leer(contenido, formato):
+    if formato == "xlsx": return pd.read_excel(io.BytesIO(contenido), dtype=str).fillna("")
+    if formato == "csv.gz": contenido = gzip.decompress(contenido)
+    return pd.read_csv(io.BytesIO(contenido), dtype=str, keep_default_na=False)
+
+@pytest.mark.parametrize("formato", FORMATOS)
+def test_ida_y_vuelta(exportar_asistencia, formato):
+    if formato == "xlsx":
+        pytest.importorskip("xlsxwriter")
+        pytest.importorskip("openpyxl")
+    from streamlit.runtime.download_data_util import convert_data_to_bytes_and_infer_mime
+    from exportar import COLS_REPORTE
+    contenido, _ = convert_data_to_bytes_and_infer_mime(exportar_asistencia(None, None, None, formato), RuntimeError("tipo no admitido"))
+    df = _leer(contenido, formato)
+    assert list(df.columns) == COLS_REPORTE
+    assert sorted(df['Cedula']) == ["a0", "a1", "a2", "b0", "b1"]
+    assert set(df.loc[df['Equipo'] == "B", 'Estado']) == {"Ausente"}
+
+def test_filtros_y_reporte_vacio(exportar_asistencia):
+    assert sorted(_leer(exportar_asistencia("2026-01-02", None, None, "csv"), "csv")['Cedula']) == ["b0", "b1"]
+    assert sorted(_leer(exportar_asistencia(None, None, ["A"], "csv"), "csv")['Cedula']) == ["a0", "a1", "a2"]
+    vacio = _leer(exportar_asistencia("2030-01-01", None, None, "csv"), "csv")
+    assert vacio.empty and "Fecha" in vacio.columns
@@ -0,0 +1,37 @@
+"""Importación masiva: fechas en los dos formatos, homónimos sin cédula y filas repetidas."""
+import io
+import pandas as pd
+from importar import leer_archivo, normalizar, validar
+
+EMPLEADOS = pd.DataFrame({"Equipo": ["A", "A", "A", "B"], "Nombre": ["Ana", "Luis", "Luis", "Ana"], "Cedula": ["1", "2", "3", "4"]})
+SIN_REGISTROS = pd.DataFrame(columns=["Fecha", "Equipo", "Nombre", "Cedula"])
+
+def _validar(texto, existente=SIN_REGISTROS):
+    df = normalizar(leer_archivo(io.StringIO(texto), "atrasados.csv"))
+    return validar(df, EMPLEADOS, existente)
+
+def _motivos(rechazadas):
+    return dict(zip(rechazadas['Fila'], rechazadas['Motivo']))
+
+def test_formatos_de_fecha():
+    aceptadas, rechazadas = _validar("Fecha;Equipo;Cedula;Estado\n2026-01-05;A;1;asiste\n06/01/2026;A;1;Asiste\n2026-13-01;A;1;Asiste\nayer;A;1;Asiste\n")
+    assert aceptadas['Fecha'].tolist() == ["2026-01-05", "2026-01-06"] and set(aceptadas['Estado']) == {"Asiste"}
+    assert _motivos(rechazadas) == {4: "Fecha inválida", 5: "Fecha inválida"}
+
+def test_homonimos_sin_cedula():
+    aceptadas, rechazadas = _validar("Fecha,Equipo,Nombre,Cedula,Estado\n"
+                                     "2026-01-05,A,Luis,,Asiste\n"   # dos Luis en A: no se adivina
+                                     "2026-01-05,A,Luis,3,Asiste\n"  # con cédula, sí
+                                     "2026-01-05,A,Ana,,Asiste\n"    # Ana es única en A (la otra está en B)
+                                     "2026-01-05,A,Pedro,,Asiste\n")
+    assert aceptadas[['Nombre', 'Cedula']].values.tolist() == [["Luis", "3"], ["Ana", "1"]]
+    assert _motivos(rechazadas) == {2: "Nombre repetido en el equipo: indique la cédula", 5: "Nombre no está en la base del equipo"}
+
+def test_repetidas_en_archivo_y_ya_guardadas():
+    existente = pd.DataFrame({"Fecha": ["2026-01-05"], "Equipo": ["B"], "Nombre": ["Ana"], "Cedula": ["4"]})
+    aceptadas, rechazadas = _validar("Fecha,Equipo,Nombre,Cedula,Estado\n"
+                                     "2026-01-05,A,,1,Asiste\n"
+                                     "05/01/2026,A,Ana,,Ausente\n"  # la misma persona y día, escrita de otra forma
+                                     "2026-01-05,B,,4,Asiste\n", existente)
+    assert aceptadas[['Cedula', 'Estado']].values.tolist() == [["1", "Asiste"]]
+    assert _motivos(rechazadas) == {3: "Repetido en el archivo", 4: "Ya tiene registro ese día"}
@@ -0,0 +1,44 @@
+"""Archivos de versiones anteriores: se leen por posición y se numeran sin perder filas."""
+import os
+from conftest import crear
+
+LEGADO = "2020-01-01,A,Ana,1,Asiste,,\n2020-01-02,A,Beto,2,Ausente,gripa,\n"  # 7 columnas, sin cabecera ni Registro
+
+def _escribir(carpeta, contenido):
+    with open(os.path.join(carpeta, "asistencia_historica.csv"), "w", encoding="utf-8") as f: f.write(contenido)
+    with open(os.path.join(carpeta, "base_datos_empleados.csv"), "w", encoding="utf-8") as f: f.write("A,Ana,1\nA,Beto,2\n")
+
+def _abrir(tipo, carpeta):
+    """Como al estrenar un almacén: el CSV antiguo se migra (SQLite, Parquet) o se prepara en su sitio."""
+    from almacen import migrar_csv_a_sqlite, convertir_csv_a_parquet
+    csv, empleados = os.path.join(carpeta, "asistencia_historica.csv"), os.path.join(carpeta, "base_datos_empleados.csv")
+    if tipo == "sqlite": migrar_csv_a_sqlite(csv, empleados, os.path.join(carpeta, "asistencia.db"))
+    if tipo == "parquet": convertir_csv_a_parquet(csv, empleados, os.path.join(carpeta, "asistencia_historica.parquet"))
+    a = crear(tipo, carpeta)
+    a.preparar()
+    return a
+
+def test_historial_sin_cabecera_ni_registro(tipo, tmp_path):
+    _escribir(str(tmp_path), LEGADO)
+    df = _abrir(tipo, str(tmp_path)).cargar_asistencia().sort_values("Fecha")
+    assert df[["Nombre", "Estado", "Observacion"]].values.tolist() == [["Ana", "Asiste", ""], ["Beto", "Ausente", "gripa"]]
+    assert df['Registro'].ne("").all() and df['Registro'].is_unique
+
+def test_historial_con_cabecera_sin_registro(tipo, tmp_path):
+    _escribir(str(tmp_path), "Fecha,Equipo,Nombre,Cedula,Estado,Observacion,Soporte\n" + LEGADO)
+    df = _abrir(tipo, str(tmp_path)).cargar_asistencia()
+    assert sorted(df['Nombre']) == ["Ana", "Beto"] and df['Registro'].ne("").all()
+
+def test_numerar_conserva_la_copia_original(tmp_path):
+    from integridad import suma_archivo
+    _escribir(str(tmp_path), LEGADO)
+    suma = suma_archivo(os.path.join(str(tmp_path), "asistencia_historica.csv"))
+    a = _abrir("csv", str(tmp_path))
+    assert a.tiene_registro()
+    with open(a.respaldo.copia("asistencia_historica.csv", suma), encoding="utf-8") as f: assert f.read() == LEGADO
+
+def test_estructura_desconocida_no_se_reescribe(tmp_path):
+    _escribir(str(tmp_path), "x;y;z\n1;2;3\n")
+    a = _abrir("csv", str(tmp_path))
+    a.compactar(minimo=0)
+    with open(a.archivo_asistencia, encoding="utf-8") as f: assert f.read() == "x;y;z\n1;2;3\n"
@@ -0,0 +1,53 @@
+"""Ediciones y borrados por `Registro`: tocan solo la fila indicada, aunque haya nombres repetidos."""
+from conftest import lote
+
+def _por_registro(a):
+    return a.cargar_asistencia().set_index('Registro')
+
+def test_registros_unicos(almacen):
+    almacen.agregar_asistencia(lote("A", 3))
+    df = almacen.cargar_asistencia()
+    assert len(df) == 3 and df['Registro'].ne("").all() and df['Registro'].is_unique
+
+def test_editar_y_borrar_por_registro(almacen):
+    df = lote("A", 3)
+    df['Nombre'] = "Homónimo"  # mismo nombre: solo el Registro distingue las filas
+    almacen.agregar_asistencia(df)
+    actual = almacen.cargar_asistencia()
+    editado, borrado, intacto = actual['Registro'].tolist()
+    cambios = actual[actual['Registro'] == editado].assign(Estado="Ausente", Observacion="médico")
+    assert almacen.modificar_asistencia(cambios, [borrado]) == 2
+
+    despues = _por_registro(almacen)
+    assert list(despues.index.sort_values()) == sorted([editado, intacto])
+    assert despues.loc[editado, 'Estado'] == "Ausente" and despues.loc[editado, 'Observacion'] == "médico"
+    assert despues.loc[intacto, 'Estado'] == "Asiste"
+
+def test_cambios_sobreviven_a_la_compactacion(almacen):
+    almacen.agregar_asistencia(lote("A", 2))
+    registro = almacen.cargar_asistencia()['Registro'].iloc[0]
+    almacen.modificar_asistencia(almacen.cargar_asistencia().head(1).assign(Estado="Vacaciones"), [])
+    if hasattr(almacen, "compactar"): almacen.compactar(minimo=0)
+    despues = _por_registro(almacen)
+    assert len(despues) == 2 and despues.loc[registro, 'Estado'] == "Vacaciones"
+
+def test_registro_borrado_por_otra_sesion(almacen):
+    almacen.agregar_asistencia(lote("A", 2))
+    actual = almacen.cargar_asistencia()
+    almacen.modificar_asistencia(actual.head(0), [actual['Registro'].iloc[0]])
+    # la otra sesión edita la fila que ya no existe: se ignora, no reaparece
+    assert almacen.modificar_asistencia(actual.head(1).assign(Estado="Ausente"), []) == 0
+    assert len(almacen.cargar_asistencia()) == 1
+
+def test_pendientes_por_cedula_con_homonimos(almacen, tmp_path, monkeypatch):
+    import datos
+    from esquema import sin_registro
+    monkeypatch.setattr(datos, "ALMACEN", almacen)
+    monkeypatch.setattr(datos, "ARCHIVO_ASISTENCIA", str(tmp_path / "asistencia_historica.csv"))
+    monkeypatch.setattr(datos, "ARCHIVO_EMPLEADOS", str(tmp_path / "base_datos_empleados.csv"))
+    empleados = lote("A", 2).assign(Nombre="Homónimo")[["Equipo", "Nombre", "Cedula"]]  # mismo nombre, cédulas 0 y 1
+    almacen.reemplazar_equipo("A", empleados)
+    almacen.agregar_asistencia(lote("A", 1).assign(Nombre="Homónimo"))  # solo la cédula 0 reportó
+    assert sin_registro(empleados, almacen.cargar_asistencia())['Cedula'].tolist() == ["1"]
+    assert datos.pendientes_del_dia("2026-01-01")['Cedula'].tolist() == ["1"]
+    assert sorted(datos.pendientes_del_dia("2026-01-02")['Cedula']) == ["0", "1"]
@@ -0,0 +1,68 @@
+"""Respaldo del CSV: las compactaciones y los cambios de personal se guardan como cambio, no como copia, y reparan."""
+import os
+import pytest
+import integridad
+from conftest import crear, lote
+
+BASE = "asistencia_historica.csv"
+
+@pytest.fixture
+def csv(tmp_path):
+    a = crear("csv", str(tmp_path))
+    a.preparar()
+    return a
+
+def _compactar_lotes(a, veces):
+    for i in range(veces):
+        a.agregar_asistencia(lote("A", 2, f"{i}-"))
+        a.compactar(minimo=0)
+
+def _respaldos(a, nombre=BASE):
+    nombres = [n for n in os.listdir(a.respaldo.carpeta) if n.startswith(f"{nombre}.")]
+    return [n for n in nombres if not n.endswith(".cambio")], [n for n in nombres if n.endswith(".cambio")]
+
+def _dañar(ruta):
+    with open(ruta, "r+b") as f: f.write(b"#")  # mismo tamaño: solo el CRC lo nota
+
+def test_compactar_no_copia_la_base(csv):
+    _compactar_lotes(csv, 3)
+    copias, cambios = _respaldos(csv)
+    assert len(copias) == 1 and len(cambios) == 3  # la base vacía inicial y tres cambios
+    assert not [n for n in os.listdir(csv.respaldo.carpeta) if ".resumen" in n]
+
+def test_base_dañada_se_rehace(csv):
+    _compactar_lotes(csv, 2)
+    actual = csv.cargar_asistencia()
+    csv.modificar_asistencia(actual.head(1).assign(Estado="Ausente"), [actual['Registro'].iloc[-1]])
+    csv.compactar(minimo=0)
+    with open(csv.archivo_asistencia, "rb") as f: esperado = f.read()
+    _dañar(csv.archivo_asistencia)
+    assert csv.reparar(completa=True) == ([BASE], [])
+    with open(csv.archivo_asistencia, "rb") as f: assert f.read() == esperado
+
+def test_cadena_limitada(csv, monkeypatch):
+    monkeypatch.setattr(integridad, "MAX_CADENA", 2)
+    _compactar_lotes(csv, 5)
+    copias, cambios = _respaldos(csv)
+    assert len(cambios) <= 2 and len(copias) <= 2
+    with open(csv.archivo_asistencia, "rb") as f: esperado = f.read()
+    _dañar(csv.archivo_asistencia)
+    assert csv.reparar(completa=True) == ([BASE], [])
+    with open(csv.archivo_asistencia, "rb") as f: assert f.read() == esperado
+
+def test_empleados_por_equipo(csv):
+    csv.reemplazar_equipo("A", lote("A", 3)[["Equipo", "Nombre", "Cedula"]])
+    csv.reemplazar_equipo("B", lote("B", 2)[["Equipo", "Nombre", "Cedula"]])
+    nombre = os.path.basename(csv.archivo_empleados)
+    assert [n for n in os.listdir(csv.respaldo_empleados.carpeta) if n.endswith(".cambio")]
+    with open(csv.archivo_empleados, "rb") as f: esperado = f.read()
+    _dañar(csv.archivo_empleados)
+    assert csv.reparar(completa=True) == ([nombre], [])
+    with open(csv.archivo_empleados, "rb") as f: assert f.read() == esperado
+
+def test_resumen_dañado_se_recalcula(csv):
+    _compactar_lotes(csv, 1)
+    antes = csv.cargar_resumen()
+    _dañar(csv.archivos_resumen[False])
+    assert csv.reparar(completa=True) == ([os.path.basename(csv.archivos_resumen[False])], [])
+    assert csv.cargar_resumen().equals(antes)
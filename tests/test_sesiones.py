@@ -0,0 +1,57 @@
+"""Sesiones: se reanudan en otro proceso por poco tiempo, pero una en curso solo termina al cerrarla o al cambiar la contraseña."""
+import os
+
+T0 = 1_800_000_000
+
+def _usar(conf, token, cuando):
+    os.utime(conf.ruta_sesion(token), (cuando, cuando))
+
+def test_abrir_y_reanudar(conf):
+    token = conf.abrir_sesion("A", ahora=T0)
+    assert token and conf.reanudar_sesion(token, ahora=T0 + 60) == "A"
+    assert conf.reanudar_sesion("otro", ahora=T0) is None
+
+def test_reanudar_vence(conf):
+    token = conf.abrir_sesion("A", ahora=T0)
+    _usar(conf, token, T0)
+    assert conf.reanudar_sesion(token, ahora=T0 + conf.DURACION_SESION + 1) is None  # sin uso
+    for minuto in range(0, conf.DURACION_MAXIMA_SESION + 60, conf.DURACION_SESION // 2):
+        _usar(conf, token, T0 + minuto)  # en uso todo el turno
+    assert conf.reanudar_sesion(token, ahora=T0 + conf.DURACION_MAXIMA_SESION + 60) is None
+
+def test_en_curso_no_vence(conf):
+    token = conf.abrir_sesion("A", ahora=T0)
+    version = conf.version_sesion("A")
+    _usar(conf, token, T0)
+    assert conf.continuar_sesion(token, "A", version, ahora=T0 + conf.DURACION_MAXIMA_SESION + 3600)
+    conf.podar_sesiones(ahora=T0 + 10 * conf.DURACION_MAXIMA_SESION)
+    assert not os.path.exists(conf.ruta_sesion(token))
+    assert conf.continuar_sesion(token, "A", version)  # el registro podado se vuelve a escribir
+    assert os.path.exists(conf.ruta_sesion(token))
+
+def test_cerrar(conf):
+    token = conf.abrir_sesion("A", ahora=T0)
+    version = conf.version_sesion("A")
+    conf.cerrar_sesion(token)
+    assert conf.reanudar_sesion(token, ahora=T0) is None
+    assert not conf.continuar_sesion(token, "A", version, ahora=T0)
+
+def test_cambio_de_contraseña_revoca(conf):
+    reanudar, en_curso = conf.abrir_sesion("A", ahora=T0), conf.abrir_sesion("A", ahora=T0)
+    version = conf.version_sesion("A")
+    conf.guardar_configuracion({"A": {"password": "nueva-a", "inicio": "00:00", "fin": "23:59"}})
+    assert conf.reanudar_sesion(reanudar, ahora=T0) is None
+    assert not conf.continuar_sesion(en_curso, "A", version, ahora=T0)
+
+def test_podar(conf):
+    vieja, nueva = conf.abrir_sesion("A", ahora=T0), conf.abrir_sesion("A", ahora=T0)
+    _usar(conf, vieja, T0)
+    _usar(conf, nueva, T0 + conf.DURACION_MAXIMA_SESION)
+    conf.podar_sesiones(ahora=T0 + conf.DURACION_MAXIMA_SESION + 1)
+    assert not os.path.exists(conf.ruta_sesion(vieja)) and os.path.exists(conf.ruta_sesion(nueva))
+
+def test_clave_maestra_sin_admin_configurado(conf):
+    assert conf.autenticar(conf.CLAVE_MAESTRA) == "ADMIN"
+    token = conf.abrir_sesion("ADMIN", ahora=T0)
+    assert token and conf.reanudar_sesion(token, ahora=T0 + 60) == "ADMIN"
+    assert conf.continuar_sesion(token, "ADMIN", conf.version_sesion("ADMIN"), ahora=T0 + 60)
@@ -0,0 +1,38 @@
+"""Soportes: se guardan por contenido, se ubican desde la ruta del historial y la miniatura se genera una vez."""
+import io
+import os
+import pytest
+
+@pytest.fixture
+def datos(tmp_path, monkeypatch):
+    import datos
+    monkeypatch.setattr(datos, "CARPETA_DATOS", str(tmp_path))
+    monkeypatch.setattr(datos, "CARPETA_SOPORTES", str(tmp_path / "soportes_img"))
+    return datos
+
+def _foto(nombre="foto.png"):
+    Image = pytest.importorskip("PIL.Image")
+    contenido = io.BytesIO()
+    Image.new("RGB", (1200, 800), (200, 30, 30)).save(contenido, "PNG")
+    contenido.seek(0)
+    contenido.name = nombre
+    return contenido
+
+def _blobs(datos):
+    return [n for c, _, nombres in os.walk(datos.CARPETA_SOPORTES) if "miniaturas" not in c for n in nombres]
+
+def test_mismo_archivo_un_solo_blob(datos):
+    primera = datos.guardar_soporte(_foto(), "Ana", "2026-01-01")
+    segunda = datos.guardar_soporte(_foto(), "Ana", "2026-01-02")  # otra persona u otro día, el mismo contenido
+    assert primera == segunda and not os.path.isabs(primera)
+    assert len(_blobs(datos)) == 1
+    with open(datos.ubicar_soporte(primera), "rb") as f: assert f.read() == _foto().getvalue()
+
+def test_miniatura(datos):
+    from PIL import Image
+    ruta = datos.ubicar_soporte(datos.guardar_soporte(_foto(), "Ana", "2026-01-01"))
+    mini = datos.miniatura_soporte(ruta)
+    assert mini and os.path.exists(mini)
+    with Image.open(mini) as img: assert img.format == "JPEG" and img.width <= 300
+    assert datos.miniatura_soporte(ruta) == mini and len(os.listdir(os.path.dirname(mini))) == 1  # se reutiliza
+    assert datos.miniatura_soporte(datos.ubicar_soporte(datos.guardar_soporte(io.BytesIO(b"%PDF"), "Ana", "2026-01-01"))) is None